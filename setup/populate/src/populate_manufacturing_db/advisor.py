@@ -0,0 +1,283 @@
+"""Workload-driven index advisor for the sample and agent queries.
+
+Every query in WORKLOAD is run with PROFILE. Label scans whose rows are
+then filtered on a property are turned into index proposals: a RANGE index
+for equality, IN, range and IS NOT NULL predicates (composite when one
+filter tests several properties of the same node), a TEXT index for
+STARTS WITH / ENDS WITH / CONTAINS. With --apply the indexes are created
+and the workload is profiled again to compare db hits.
+
+The vector queries in samples.py and test_queries.py start from a vector
+index and only filter the k nodes it returns, so they are not part of the
+workload.
+
+Run via:  uv run populate-manufacturing-db advise-indexes [--apply]
+"""
+
+from __future__ import annotations
+
+import re
+from typing import NamedTuple
+
+from neo4j import Driver
+
+from .formatting import banner, table, val
+from .samples import _CHANGE_Q, _COVERAGE_Q, _DEFECT_Q, _MILESTONE_Q, _PRODUCT_Q, _TRACE_Q
+from .schema import _schema_key, await_indexes, show_indexes
+
+
+class WorkloadQuery(NamedTuple):
+    name: str
+    cypher: str
+
+
+# Copies of the tool queries in solutions_openai/src/manufacturing_agent/agent.py.
+_AGENT_COMPONENT_OVERVIEW_Q = """\
+MATCH (comp:Component {name: $component_name})
+OPTIONAL MATCH (td:TechnologyDomain)-[:DOMAIN_HAS_COMPONENT]->(comp)
+OPTIONAL MATCH (comp)-[:COMPONENT_HAS_REQ]->(req:Requirement)
+OPTIONAL MATCH (req)-[:TESTED_WITH]->(ts:TestSet)-[:CONTAINS_TEST_CASE]->(tc:TestCase)
+      -[:DETECTED]->(d:Defect)
+WITH comp, td,
+     collect(DISTINCT req.name)[0..10] AS requirements,
+     collect(DISTINCT d.description)[0..5] AS defects
+RETURN
+    comp.name AS component,
+    comp.description AS description,
+    td.name AS technology_domain,
+    requirements AS top_requirements,
+    defects AS detected_defects"""
+
+_AGENT_TEST_COVERAGE_Q = """\
+MATCH (comp:Component {name: $component_name})-[:COMPONENT_HAS_REQ]->(req:Requirement)
+OPTIONAL MATCH (req)-[:TESTED_WITH]->(ts:TestSet)
+RETURN req.name AS requirement,
+       req.description AS requirement_description,
+       COLLECT(ts.name) AS test_sets,
+       CASE WHEN COUNT(ts) > 0 THEN 'Covered' ELSE 'Not Covered' END AS coverage_status
+ORDER BY coverage_status DESC, req.name"""
+
+_AGENT_MILESTONE_READINESS_Q = """\
+MATCH (m:Milestone {milestone_id: $milestone_id})-[:REQUIRES_ML]->(ml:MaturityLevel)
+      -[:REQUIRES_FLAWLESS_TEST_SET]->(ts:TestSet)
+OPTIONAL MATCH (ts)-[:CONTAINS_TEST_CASE]->(tc:TestCase)
+WHERE tc.status IN ['Planned', 'In Progress', 'Failed']
+OPTIONAL MATCH (d:Defect)-[:DETECTED]->(tc2:TestCase)<-[:CONTAINS_TEST_CASE]-(ts)
+WHERE d.status IN ['New', 'In Progress']
+WITH m, ts,
+     COLLECT(DISTINCT {name: tc.name, status: tc.status, effort_hours: tc.duration_hours})
+       AS open_test_cases,
+     COLLECT(DISTINCT {defect_id: d.defect_id, description: d.description,
+                       severity: d.severity, status: d.status}) AS open_defects
+RETURN
+    m.milestone_id AS milestone,
+    m.deadline AS deadline,
+    ts.name AS test_set,
+    [t IN open_test_cases WHERE t.name IS NOT NULL] AS open_test_cases,
+    REDUCE(s = 0.0, t IN open_test_cases | s + COALESCE(t.effort_hours, 0.0))
+      AS test_effort_hours,
+    [d IN open_defects WHERE d.defect_id IS NOT NULL] AS open_defects
+ORDER BY ts.name"""
+
+WORKLOAD: list[WorkloadQuery] = [
+    WorkloadQuery("samples: product overview", _PRODUCT_Q),
+    WorkloadQuery("samples: requirement traceability", _TRACE_Q),
+    WorkloadQuery("samples: change impact", _CHANGE_Q),
+    WorkloadQuery("samples: milestone timeline", _MILESTONE_Q),
+    WorkloadQuery("samples: defect summary", _DEFECT_Q),
+    WorkloadQuery("samples: test coverage", _COVERAGE_Q),
+    WorkloadQuery("agent: component overview", _AGENT_COMPONENT_OVERVIEW_Q),
+    WorkloadQuery("agent: test coverage", _AGENT_TEST_COVERAGE_Q),
+    WorkloadQuery("agent: milestone readiness", _AGENT_MILESTONE_READINESS_Q),
+]
+
+# Parameter values for the workload, taken from the loaded graph.
+_PARAMS_Q = """\
+MATCH (c:Component) WITH c.name AS component_name LIMIT 1
+MATCH (m:Milestone)
+RETURN component_name, m.milestone_id AS milestone_id LIMIT 1"""
+
+# Rows per section for the samples queries, as in `samples`.
+_LIMIT = 10
+
+# Filters reported as expensive from this many db hits.
+EXPENSIVE_FILTER_DB_HITS = 1_000
+
+
+# ---------------------------------------------------------------------------
+# Plan analysis
+# ---------------------------------------------------------------------------
+
+# `n.prop OP ...` in an operator's details; cached reads print as cache[n.prop].
+_PREDICATE = re.compile(
+    r"(?:cache\[)?\b(?P<var>\w+)\.(?P<prop>\w+)\]?\s+"
+    r"(?P<op>IS NOT NULL|STARTS WITH|ENDS WITH|CONTAINS|IN\b|<=|>=|<>|=|<|>)"
+)
+_TEXT_OPS = {"STARTS WITH", "ENDS WITH", "CONTAINS"}
+_SCAN = re.compile(r"^(?P<var>\w+):(?P<label>\w+)")
+
+
+class IndexCandidate(NamedTuple):
+    kind: str  # "RANGE" or "TEXT"
+    label: str
+    props: tuple[str, ...]
+
+    @property
+    def name(self) -> str:
+        suffix = "_text" if self.kind == "TEXT" else ""
+        return f"adv_{self.label.lower()}_{'_'.join(self.props).lower()}{suffix}"
+
+    def ddl(self) -> str:
+        kind = "TEXT INDEX" if self.kind == "TEXT" else "INDEX"
+        on = ", ".join(f"n.{p}" for p in self.props)
+        return f"CREATE {kind} {self.name} IF NOT EXISTS FOR (n:{self.label}) ON ({on})"
+
+
+class Finding(NamedTuple):
+    query: str
+    operator: str
+    details: str
+    db_hits: int
+
+
+def _operators(plan: dict):
+    """Every operator in a profiled plan, parents before children."""
+    yield plan
+    for child in plan.get("children", []):
+        yield from _operators(child)
+
+
+def _operator_type(op: dict) -> str:
+    return op.get("operatorType", "").split("@")[0]
+
+
+def _details(op: dict) -> str:
+    return str(op.get("args", {}).get("Details", ""))
+
+
+def _candidates(filter_op: dict, var: str, label: str) -> list[IndexCandidate]:
+    """Indexes that would let the planner seek instead of filtering a label scan."""
+    range_props: list[str] = []
+    candidates = []
+    for m in _PREDICATE.finditer(_details(filter_op)):
+        if m["var"] != var:
+            continue
+        if m["op"] in _TEXT_OPS:
+            candidates.append(IndexCandidate("TEXT", label, (m["prop"],)))
+        elif m["op"] != "<>" and m["prop"] not in range_props:
+            range_props.append(m["prop"])
+    if range_props:
+        candidates.insert(0, IndexCandidate("RANGE", label, tuple(range_props)))
+    return candidates
+
+
+def analyze(name: str, plan: dict) -> tuple[list[Finding], list[IndexCandidate]]:
+    """Label scans and expensive filters in a profiled plan, and the indexes to propose."""
+    findings: list[Finding] = []
+    candidates: list[IndexCandidate] = []
+    for op in _operators(plan):
+        kind = _operator_type(op)
+        hits = op.get("dbHits", 0)
+        if kind in ("NodeByLabelScan", "AllNodesScan"):
+            findings.append(Finding(name, kind, _details(op), hits))
+        elif kind == "Filter":
+            if hits >= EXPENSIVE_FILTER_DB_HITS:
+                findings.append(Finding(name, kind, _details(op), hits))
+            for child in op.get("children", []):
+                scan = _SCAN.match(_details(child))
+                if _operator_type(child) == "NodeByLabelScan" and scan:
+                    candidates += _candidates(op, scan["var"], scan["label"])
+    return findings, candidates
+
+
+def _covered(candidate: IndexCandidate, existing: list) -> bool:
+    """True if an existing index already serves candidate's leading property."""
+    for record in existing:
+        key = _schema_key(record)
+        if record["type"] != candidate.kind or key[0] != candidate.label:
+            continue
+        if key[1:] == candidate.props or key[1:2] == candidate.props[:1]:
+            return True
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Profiling
+# ---------------------------------------------------------------------------
+
+
+def _db_hits(plan: dict) -> int:
+    return sum(op.get("dbHits", 0) for op in _operators(plan))
+
+
+def _profile(driver: Driver, params: dict) -> dict[str, dict]:
+    """PROFILE every workload query; return its plan by query name."""
+    plans = {}
+    for q in WORKLOAD:
+        _, summary, _ = driver.execute_query(f"PROFILE {q.cypher}", **params)
+        plans[q.name] = summary.profile or {}
+    return plans
+
+
+def _workload_params(driver: Driver) -> dict:
+    records, _, _ = driver.execute_query(_PARAMS_Q)
+    if not records:
+        raise ValueError("No Component or Milestone nodes to profile with; run 'load' first.")
+    r = records[0]
+    return {
+        "component_name": r["component_name"],
+        "milestone_id": r["milestone_id"],
+        "limit": _LIMIT,
+    }
+
+
+def advise_indexes(driver: Driver, apply: bool = False, timeout: int = 300) -> None:
+    """Profile the workload, propose indexes for its label scans, and optionally apply them."""
+    banner("Index Advisor — samples and agent queries")
+    params = _workload_params(driver)
+    before = _profile(driver, params)
+
+    findings: list[Finding] = []
+    proposals: list[IndexCandidate] = []
+    existing = show_indexes(driver)
+    for name, plan in before.items():
+        found, candidates = analyze(name, plan)
+        findings += found
+        for c in candidates:
+            if c not in proposals and not _covered(c, existing):
+                proposals.append(c)
+
+    print()
+    if findings:
+        table(
+            ["Query", "Operator", "Details", "DB hits"],
+            [[f.query, f.operator, val(f.details, 40), f"{f.db_hits:,}"] for f in findings],
+        )
+    else:
+        print("  [OK] No label scans or expensive filters.\n")
+
+    if not proposals:
+        print("  [OK] No indexes to propose.\n")
+        return
+    print("  Proposed indexes:")
+    for c in proposals:
+        print(f"    {c.ddl()}")
+    print()
+    if not apply:
+        print("  Re-run with --apply to create them and compare db hits.\n")
+        return
+
+    for c in proposals:
+        driver.execute_query(c.ddl())
+        print(f"  [OK] {c.kind.title()} index: {c.label}({', '.join(c.props)})")
+    await_indexes(driver, timeout)
+    driver.execute_query("CALL db.clearQueryCaches()")
+    after = _profile(driver, params)
+
+    rows = []
+    for name in before:
+        hits_before, hits_after = _db_hits(before[name]), _db_hits(after[name])
+        change = (hits_after - hits_before) / hits_before if hits_before else 0.0
+        rows.append([name, f"{hits_before:,}", f"{hits_after:,}", f"{change:+.0%}"])
+    print()
+    table(["Query", "DB hits before", "DB hits after", "Change"], rows)
@@ -0,0 +1,182 @@
+"""Adaptive batch sizing for UNWIND writes.
+
+Rows differ a lot in width: a requirement carries two long descriptions,
+a link row two ids, an embedding update 1,536 floats. Instead of a fixed
+batch size, each write measures how long its transaction took and resizes
+the next batch toward a target transaction time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterable, Callable, Iterable
+from itertools import chain, islice
+
+from neo4j import AsyncDriver, Driver
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+from .vectors import Vector
+
+# Aim for transactions of about this many seconds.
+TARGET_SECONDS = 0.5
+
+# Upper bound on the estimated payload of one transaction, in bytes.
+MAX_PAYLOAD_BYTES = 8 * 1024 * 1024
+
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 20_000
+
+# Consecutive transient failures tolerated before giving up.
+MAX_RETRIES = 6
+
+_RETRYABLE = (TransientError, ServiceUnavailable, SessionExpired)
+
+# A lost connection may hide a commit that went through; only errors that
+# roll the transaction back are safe to resubmit a non-idempotent query for.
+_RETRYABLE_ONCE = (TransientError,)
+
+# Each resize moves at most this factor up or down.
+_MAX_STEP = 2.0
+
+
+def _payload_bytes(batch: list[dict]) -> int:
+    """Rough size of a batch on the wire: string lengths, packed vector bytes, 8 per other value."""
+    total = 0
+    for row in batch:
+        for v in row.values():
+            if isinstance(v, str):
+                total += len(v)
+            elif isinstance(v, (list, tuple)):
+                total += 8 * len(v)
+            elif Vector is not None and isinstance(v, Vector):
+                total += len(v.raw())
+            else:
+                total += 8
+    return total
+
+
+class AdaptiveBatcher:
+    """Writes rows in batches whose size tracks a target transaction time.
+
+    After every transaction the observed seconds per row and bytes per row
+    give the batch size that would have hit target_seconds (capped by
+    MAX_PAYLOAD_BYTES); the next batch moves toward it by at most a factor
+    of two. On a transient error the failed batch is retried at half the
+    size after an exponential, jittered pause. Pass idempotent=False for
+    queries that must not run twice (CREATE): they are only retried after
+    a TransientError, which guarantees the transaction was rolled back.
+
+    One batcher adapts to one kind of row, so use a new one per load step.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        target_seconds: float = TARGET_SECONDS,
+        min_size: int = MIN_BATCH_SIZE,
+        max_size: int = MAX_BATCH_SIZE,
+        idempotent: bool = True,
+    ) -> None:
+        self.size = max(min_size, min(initial, max_size))
+        self.target_seconds = target_seconds
+        self.min_size = min_size
+        self.max_size = max_size
+        self.transactions = 0
+        self.retries = 0
+        self._retryable = _RETRYABLE if idempotent else _RETRYABLE_ONCE
+
+    def _clamp(self, size: float) -> int:
+        return max(self.min_size, min(int(size), self.max_size))
+
+    def _observe(self, rows: int, payload: int, elapsed: float) -> None:
+        ideal = rows * self.target_seconds / max(elapsed, 1e-3)
+        if payload:
+            ideal = min(ideal, rows * MAX_PAYLOAD_BYTES / payload)
+        # Only grow when the batch was full; a short tail says nothing about capacity.
+        if rows < self.size:
+            ideal = min(ideal, self.size)
+        ideal = max(self.size / _MAX_STEP, min(ideal, self.size * _MAX_STEP))
+        self.size = self._clamp(ideal)
+
+    def _backoff(self, batch: list[dict], failures: int) -> float | None:
+        """Shrink after a transient failure; return the seconds to wait, or None to give up."""
+        self.retries += 1
+        if failures > MAX_RETRIES:
+            return None
+        self.size = self._clamp(min(self.size, len(batch)) / 2)
+        return min(0.2 * 2**failures, 10.0) * random.uniform(0.5, 1.5)
+
+    def run(
+        self,
+        driver: Driver,
+        query: str,
+        records: Iterable[dict],
+        on_batch: Callable[[int], None] | None = None,
+    ) -> int:
+        """Execute query with $batch bound to successive batches of records.
+
+        on_batch, if given, is called with the running row count after each
+        committed batch. Returns the number of rows written.
+        """
+        it = iter(records)
+        done = 0
+        failures = 0
+        while batch := list(islice(it, self.size)):
+            start = time.monotonic()
+            try:
+                driver.execute_query(query, batch=batch)
+            except self._retryable:
+                failures += 1
+                if (delay := self._backoff(batch, failures)) is None:
+                    raise
+                time.sleep(delay)
+                it = chain(batch, it)
+                continue
+            failures = 0
+            self.transactions += 1
+            self._observe(len(batch), _payload_bytes(batch), time.monotonic() - start)
+            done += len(batch)
+            if on_batch is not None:
+                on_batch(done)
+        return done
+
+    async def arun(
+        self,
+        driver: AsyncDriver,
+        query: str,
+        records: AsyncIterable[dict],
+        on_batch: Callable[[int], None] | None = None,
+    ) -> int:
+        """Async variant of run() for the async driver and an async row source."""
+        it = aiter(records)
+        pending: list[dict] = []
+        exhausted = False
+        done = 0
+        failures = 0
+        while True:
+            while len(pending) < self.size and not exhausted:
+                try:
+                    pending.append(await anext(it))
+                except StopAsyncIteration:
+                    exhausted = True
+            if not pending:
+                return done
+            batch, pending = pending[: self.size], pending[self.size :]
+            start = time.monotonic()
+            try:
+                await driver.execute_query(query, batch=batch)
+            except self._retryable:
+                failures += 1
+                if (delay := self._backoff(batch, failures)) is None:
+                    raise
+                await asyncio.sleep(delay)
+                pending = batch + pending
+                continue
+            failures = 0
+            self.transactions += 1
+            self._observe(len(batch), _payload_bytes(batch), time.monotonic() - start)
+            done += len(batch)
+            if on_batch is not None:
+                on_batch(done)
@@ -0,0 +1,323 @@
+"""Benchmarks for the loading pipeline.
+
+Run via:  uv run populate-manufacturing-db bench-memory
+          uv run populate-manufacturing-db bench-load
+          uv run populate-manufacturing-db bench-vectors
+"""
+
+from __future__ import annotations
+
+import csv
+import math
+import random
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from neo4j import Driver
+
+from .dataset import iter_csv, read_csv
+from .formatting import banner, table
+from .loader import (
+    _NODE_DEFINITIONS,
+    _REL_DEFINITIONS,
+    BATCH_SIZE,
+    _create_variant,
+    _run_in_batches,
+    iter_batches,
+)
+from .vectors import (
+    FLOAT32_BYTES,
+    FLOAT64_BYTES,
+    encode,
+    packed_supported,
+    wire_bytes,
+    write_query,
+)
+
+# Header of requirements.csv — the widest file in TransformedData/.
+_REQ_HEADER = [
+    "requirement_id", "Anforderung", "Requirement", "Beschreibung", "Description",
+    "Vehicle Project", "Technology Cluster", "Component", "Type",
+]
+
+_MB = 1024 * 1024
+
+
+def _write_synthetic_requirements(path: Path, rows: int) -> None:
+    """Write a requirements-shaped CSV with rows bilingual, padded records."""
+    desc = "The housing must withstand operating loads up to 20g in any direction. " * 4
+    desc_de = "Das Gehäuse muss für Betriebslasten bis 20g ausgelegt sein. " * 4
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(_REQ_HEADER)
+        for i in range(rows):
+            writer.writerow([
+                f" {i}_1 ", f" Anforderung {i} ", f" Requirement {i} ", f" {desc_de} ",
+                f" {desc} ", " R2D2 ", " Electric Powertrain ", " HVB_3900 ", " HW ",
+            ])
+
+
+def _measure(fn: Callable[[], int]) -> tuple[int, float, int]:
+    """Run fn under tracemalloc; return (rows, seconds, peak bytes)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        rows = fn()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def _consume_materialized(data_dir: Path, filename: str) -> int:
+    """Previous ingestion path: read the whole file, then slice into batches."""
+    records = read_csv(data_dir, filename)
+    done = 0
+    for i in range(0, len(records), BATCH_SIZE):
+        done += len(records[i : i + BATCH_SIZE])
+    return done
+
+
+def _consume_streaming(data_dir: Path, filename: str) -> int:
+    """Current ingestion path: lazily decoded rows grouped into batches."""
+    done = 0
+    for batch in iter_batches(iter_csv(data_dir, filename)):
+        done += len(batch)
+    return done
+
+
+def bench_csv_memory(max_rows: int) -> None:
+    """Compare peak memory of list-based and streaming CSV ingestion.
+
+    Generates synthetic requirement exports of increasing size and feeds
+    each through both paths without touching Neo4j. The streaming peak
+    should stay flat while the list-based peak grows with the file.
+    """
+    banner("CSV Ingestion Memory Benchmark")
+    print(f"\n  Batch size: {BATCH_SIZE} rows\n")
+
+    sizes = sorted({max(max_rows // d, 1) for d in (8, 4, 2, 1)})
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        for n in sizes:
+            filename = f"requirements_{n}.csv"
+            _write_synthetic_requirements(data_dir / filename, n)
+            file_mb = (data_dir / filename).stat().st_size / _MB
+            _, list_s, list_peak = _measure(lambda: _consume_materialized(data_dir, filename))
+            _, stream_s, stream_peak = _measure(lambda: _consume_streaming(data_dir, filename))
+            results.append([
+                f"{n:,}", f"{file_mb:.1f}",
+                f"{list_peak / _MB:.1f}", f"{list_s:.2f}",
+                f"{stream_peak / _MB:.1f}", f"{stream_s:.2f}",
+            ])
+            print(f"  Measured {n:,} rows.", end="\r")
+    print()
+
+    table(
+        ["Rows", "File MB", "List peak MB", "List s", "Stream peak MB", "Stream s"],
+        results,
+    )
+
+
+# ---------------------------------------------------------------------------
+# MERGE vs CREATE load throughput (live database, scratch labels)
+# ---------------------------------------------------------------------------
+
+# Real loader queries are re-pointed at scratch labels so the benchmark never
+# touches the loaded graph.
+_BENCH_RENAMES = {
+    ":Requirement ": ":BenchRequirement ",
+    ":TestSet ": ":BenchTestSet ",
+    ":TESTED_WITH]": ":BENCH_TESTED_WITH]",
+}
+
+_BENCH_CONSTRAINTS = {
+    "bench_requirement_id": ("BenchRequirement", "requirement_id"),
+    "bench_test_set_id": ("BenchTestSet", "test_set_id"),
+}
+
+
+def _bench_query(query: str) -> str:
+    for old, new in _BENCH_RENAMES.items():
+        query = query.replace(old, new)
+    return query
+
+
+def _bench_requirements(rows: int) -> Iterator[dict]:
+    desc = "The housing must withstand operating loads up to 20g in any direction. " * 4
+    for i in range(rows):
+        yield {
+            "requirement_id": f"{i}_1", "Requirement": f"Requirement {i}",
+            "Description": desc, "Anforderung": f"Anforderung {i}", "Beschreibung": desc,
+            "Vehicle Project": "R2D2", "Technology Cluster": "Electric Powertrain",
+            "Component": "HVB_3900", "Type": "HW",
+        }
+
+
+def _bench_test_sets(rows: int) -> Iterator[dict]:
+    for i in range(rows):
+        yield {"test_set_id": f"TS_{i}", "Test Set": f"Test Set {i}"}
+
+
+def _bench_links(rows: int) -> Iterator[dict]:
+    """Two TESTED_WITH links per requirement."""
+    for i in range(rows):
+        yield {"requirement_id": f"{i}_1", "test_set_id": f"TS_{i}"}
+        yield {"requirement_id": f"{i}_1", "test_set_id": f"TS_{(i + 1) % rows}"}
+
+
+def _clear_bench(driver: Driver) -> None:
+    while True:
+        records, _, _ = driver.execute_query(
+            "MATCH (n) WHERE n:BenchRequirement OR n:BenchTestSet "
+            "WITH n LIMIT 5000 DETACH DELETE n RETURN count(*) AS deleted"
+        )
+        if records[0]["deleted"] == 0:
+            break
+
+
+def bench_merge_vs_create(driver: Driver, rows: int) -> None:
+    """Time the MERGE and CREATE variants of the Requirement/TestSet loads.
+
+    Each mode starts from empty scratch labels that carry the same uniqueness
+    constraints as the real schema. Scratch data and constraints are removed
+    afterwards.
+    """
+    banner("MERGE vs CREATE Load Benchmark")
+    print(f"\n  {rows:,} requirements, {rows:,} test sets, {2 * rows:,} links\n")
+
+    node_defs = {d.label: d for d in _NODE_DEFINITIONS}
+    rel_def = next(d for d in _REL_DEFINITIONS if d.rel_type == "TESTED_WITH")
+    for name, (label, prop) in _BENCH_CONSTRAINTS.items():
+        driver.execute_query(
+            f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+        )
+
+    results = []
+    timings: dict[str, float] = {}
+    try:
+        for mode in ("MERGE", "CREATE"):
+            variant = _create_variant if mode == "CREATE" else (lambda q: q)
+            idempotent = mode == "MERGE"
+            _clear_bench(driver)
+            print(f"  Running {mode}...")
+
+            start = time.perf_counter()
+            _run_in_batches(
+                driver, _bench_requirements(rows),
+                variant(_bench_query(node_defs["Requirement"].query)), progress=False,
+                idempotent=idempotent,
+            )
+            _run_in_batches(
+                driver, _bench_test_sets(rows),
+                variant(_bench_query(node_defs["TestSet"].query)), progress=False,
+                idempotent=idempotent,
+            )
+            node_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            _run_in_batches(
+                driver, _bench_links(rows), variant(_bench_query(rel_def.query)), progress=False,
+                idempotent=idempotent,
+            )
+            rel_s = time.perf_counter() - start
+
+            timings[mode] = node_s + rel_s
+            results.append([
+                mode, f"{2 * rows / node_s:,.0f}", f"{2 * rows / rel_s:,.0f}",
+                f"{node_s + rel_s:.1f}",
+            ])
+    finally:
+        _clear_bench(driver)
+        for name in _BENCH_CONSTRAINTS:
+            driver.execute_query(f"DROP CONSTRAINT {name} IF EXISTS")
+
+    print()
+    table(["Mode", "Nodes/s", "Rels/s", "Total s"], results)
+    print(f"  CREATE speedup: {timings['MERGE'] / timings['CREATE']:.2f}x\n")
+
+
+# ---------------------------------------------------------------------------
+# Embedding storage size (live database, scratch label)
+# ---------------------------------------------------------------------------
+
+
+def _random_unit_vector(rng: random.Random, dims: int) -> list[float]:
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dims)]
+    norm = math.sqrt(sum(v * v for v in vec))
+    return [v / norm for v in vec]
+
+
+def _clear_bench_vectors(driver: Driver) -> None:
+    while True:
+        records, _, _ = driver.execute_query(
+            "MATCH (n:BenchVector) WITH n LIMIT 5000 DELETE n RETURN count(*) AS deleted"
+        )
+        if records[0]["deleted"] == 0:
+            break
+
+
+def bench_vector_storage(driver: Driver, rows: int, dims: int) -> None:
+    """Compare writing embeddings as float64 lists and as float32 vectors.
+
+    Writes the same random unit vectors to a scratch BenchVector label with a
+    plain SET (float64), with setNodeVectorProperty (float32) and, when the
+    driver and server support it, as packed float32 VECTOR values. Storage
+    sizes are the expected element width times dims, not measured from the
+    store. The scratch label is removed afterwards.
+    """
+    banner("Embedding Storage Benchmark")
+    packed = packed_supported(driver)
+    print(f"\n  {rows:,} vectors of {dims:,} dims, packed transfer supported: {packed}\n")
+
+    rng = random.Random(0)
+    vectors = [_random_unit_vector(rng, dims) for _ in range(rows)]
+    modes = [
+        ("SET list (float64)", False, FLOAT64_BYTES,
+         "UNWIND $batch AS row MATCH (n:BenchVector {id: row.id}) "
+         "SET n.embedding = row.embedding"),
+        ("setNodeVectorProperty (float32)", False, FLOAT32_BYTES,
+         write_query("BenchVector", "id", packed=False)),
+    ]
+    if packed:
+        modes.append(
+            ("packed VECTOR (float32)", True, FLOAT32_BYTES,
+             write_query("BenchVector", "id", packed=True))
+        )
+
+    driver.execute_query(
+        "CREATE CONSTRAINT bench_vector_id IF NOT EXISTS "
+        "FOR (n:BenchVector) REQUIRE n.id IS UNIQUE"
+    )
+    results = []
+    try:
+        for name, as_packed, width, query in modes:
+            _clear_bench_vectors(driver)
+            _run_in_batches(
+                driver, ({"id": i} for i in range(rows)),
+                "UNWIND $batch AS row CREATE (:BenchVector {id: row.id})", progress=False,
+                idempotent=False,
+            )
+            print(f"  Running {name}...")
+            updates = (
+                {"id": i, "embedding": encode(v, as_packed)} for i, v in enumerate(vectors)
+            )
+            start = time.perf_counter()
+            _run_in_batches(driver, updates, query, progress=False)
+            elapsed = time.perf_counter() - start
+            expected = width * dims
+            results.append([
+                name, f"{wire_bytes(dims, as_packed):,}", f"{expected:,}",
+                f"{expected * rows / _MB:.1f}", f"{rows / elapsed:,.0f}",
+            ])
+    finally:
+        _clear_bench_vectors(driver)
+        driver.execute_query("DROP CONSTRAINT bench_vector_id IF EXISTS")
+
+    print()
+    table(["Mode", "Wire B/vector", "Expected B/vector", "Expected MB", "Vectors/s"], results)
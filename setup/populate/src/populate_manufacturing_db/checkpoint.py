@@ -0,0 +1,92 @@
+"""Checkpoints of committed load batches, used by `load --resume`.
+
+For every load step the checkpoint records how many of the step's input
+rows are already committed, and whether the step finished. A resumed load
+skips finished steps, skips the committed prefix of the interrupted ones
+and carries on from there.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+
+CHECKPOINT_FILENAME = "load_checkpoint.json"
+_VERSION = 1
+
+
+class LoadCheckpoint:
+    """Committed row offsets per load step, persisted as JSON in the cache directory.
+
+    A checkpoint belongs to one run configuration, identified by the
+    database URI, the load mode and a fingerprint of the CSV files. Offsets
+    are saved after every committed batch. Safe to update from several
+    worker threads.
+    """
+
+    def __init__(self, cache_dir: Path, run_id: dict[str, str]) -> None:
+        self.path = cache_dir / CHECKPOINT_FILENAME
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        self._offsets: dict[str, int] = {}
+        self._done: dict[str, int] = {}
+
+    def resume(self) -> bool:
+        """Load the saved checkpoint; return False if none matches this run."""
+        if not self.path.is_file():
+            return False
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if data.get("version") != _VERSION or data.get("run") != self.run_id:
+            return False
+        with self._lock:
+            self._offsets = data.get("offsets", {})
+            self._done = data.get("done", {})
+        return True
+
+    def offset(self, step: str) -> int:
+        """Return how many input rows of a step are already committed."""
+        with self._lock:
+            return self._offsets.get(step, 0)
+
+    def finished(self, step: str) -> int | None:
+        """Return the rows written by a finished step, or None if it did not finish."""
+        with self._lock:
+            return self._done.get(step)
+
+    def advance(self, step: str, offset: int) -> None:
+        """Record that the first offset input rows of a step are committed."""
+        with self._lock:
+            self._offsets[step] = offset
+            self._save()
+
+    def finish(self, step: str, rows: int) -> None:
+        """Mark a step as finished after writing rows in total."""
+        with self._lock:
+            self._offsets.pop(step, None)
+            self._done[step] = rows
+            self._save()
+
+    @property
+    def pending(self) -> dict[str, int]:
+        """Offsets of steps that were interrupted partway."""
+        with self._lock:
+            return {s: n for s, n in self._offsets.items() if n}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({
+                "version": _VERSION, "run": self.run_id,
+                "offsets": self._offsets, "done": self._done,
+            }),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def discard(cache_dir: Path) -> None:
+        """Delete the checkpoint, e.g. after a load completed."""
+        (cache_dir / CHECKPOINT_FILENAME).unlink(missing_ok=True)
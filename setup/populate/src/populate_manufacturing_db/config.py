@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Literal
+
 from pydantic import DirectoryPath, SecretStr, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,6 +13,7 @@ _PKG_DIR = Path(__file__).resolve().parent
 _ENV_FILE = _PKG_DIR.parent.parent / ".env"
 _CONFIG_TXT = _PKG_DIR.parent.parent.parent.parent / "CONFIG.txt"
 _DATA_DIR = _PKG_DIR.parent.parent.parent.parent / "TransformedData"
+_CACHE_DIR = _PKG_DIR.parent.parent / ".cache"
 
 
 def _find_env_file() -> Path:
@@ -23,7 +26,7 @@ def _find_env_file() -> Path:
 
 
 class Settings(BaseSettings):
-    """Neo4j connection and OpenAI settings loaded from .env."""
+    """Neo4j connection and embedding settings loaded from .env."""
 
     model_config = SettingsConfigDict(
         env_file=_find_env_file(),
@@ -36,8 +39,47 @@ class Settings(BaseSettings):
 
     data_dir: DirectoryPath = _DATA_DIR  # type: ignore[assignment]
 
-    # OpenAI — used during the embedding phase of `load`.
-    openai_api_key: SecretStr
+    # Local state kept between runs (load manifest for incremental loads,
+    # parsed CSV tables).
+    cache_dir: Path = _CACHE_DIR
+
+    # Embedding provider used by `load`, `samples` and `test-queries`:
+    # openai, bedrock (Titan), local (sentence-transformers on CPU) or hashing
+    # (deterministic, offline). Model and dimensions default per provider.
+    embedding_provider: Literal["openai", "bedrock", "local", "hashing"] = "openai"
+    embedding_model: str | None = None
+    embedding_dims: int | None = None
+
+    # Vector index tuning; unset means the server default. Changed values
+    # make `load` recreate the vector indexes.
+    vector_quantization: bool | None = None
+    vector_hnsw_m: int | None = None
+    vector_hnsw_ef_construction: int | None = None
+
+    # Seconds `load` and `import-embeddings` wait for new or populating
+    # indexes to come online before writing.
+    schema_await_timeout: int = 300
+
+    # Where `samples` and `test-queries` find nearest neighbours: the Neo4j
+    # vector indexes, or an in-process mirror of them kept under cache_dir
+    # (numpy brute force; hnsw for large sets, or auto to choose).
+    vector_search: Literal["neo4j", "local"] = "neo4j"
+    local_index_backend: Literal["auto", "numpy", "hnsw"] = "auto"
+
+    # OpenAI — required when embedding_provider is openai.
+    openai_api_key: SecretStr | None = None
+
+    # Amazon Bedrock — credentials come from the standard AWS chain.
+    aws_region: str = "us-east-1"
+
+    # Remote embedding throughput: requests in flight and the account's rate limits.
+    embed_concurrency: int = 4
+    openai_rpm: int = 3_000
+    openai_tpm: int = 1_000_000
+
+    # Upper bounds for one embeddings request: total tokens and number of texts.
+    embed_batch_tokens: int = 100_000
+    embed_batch_items: int = 512
 
     # Number of rows to show per section in the `samples` command.
     sample_size: int = 10
@@ -51,3 +93,9 @@ class Settings(BaseSettings):
                 f"got: {self.neo4j_uri}"
             )
         return self
+
+    @model_validator(mode="after")
+    def _check_provider_credentials(self) -> Settings:
+        if self.embedding_provider == "openai" and self.openai_api_key is None:
+            raise ValueError("OPENAI_API_KEY is required when EMBEDDING_PROVIDER is openai")
+        return self
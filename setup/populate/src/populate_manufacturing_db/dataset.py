@@ -0,0 +1,244 @@
+"""CSV parsing and the shared in-memory Dataset for one run.
+
+A Dataset parses every file in TransformedData/ at most once and keeps it
+as a column-oriented Table, so the loader, embedder and verification all
+read the same decoded rows instead of re-reading and re-decoding files.
+Key indexes are built on first use and then answer lookups in constant time.
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import hashlib
+import sys
+import threading
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .tablecache import TableCache
+
+# Bytes read per chunk while sniffing the file encoding.
+_DETECT_CHUNK = 1 << 16
+
+# Cell values up to this length are interned, so repeated statuses, project
+# names and ids share one string object across rows and tables.
+_INTERN_MAX = 64
+
+# ---------------------------------------------------------------------------
+# CSV helpers
+# ---------------------------------------------------------------------------
+
+
+def _detect_encoding(path: Path) -> str:
+    """Return "utf-8" if the whole file decodes as utf-8, otherwise "latin-1".
+
+    The raw bytes are fed through an incremental decoder chunk by chunk, so
+    detection runs in constant memory and a late decode error can never
+    surface after some batches of the file have already been written.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f:
+        try:
+            while chunk := f.read(_DETECT_CHUNK):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return "latin-1"
+    return "utf-8"
+
+
+def _iter_records(path: Path) -> Iterator[list[str]]:
+    """Yield the stripped header, then each non-empty data row as stripped values.
+
+    Uses utf-8 when the file decodes cleanly, latin-1 otherwise (German umlauts).
+    """
+    encoding = _detect_encoding(path)
+    with open(path, newline="", encoding=encoding) as f:
+        for values in csv.reader(f):
+            if values:
+                yield [v.strip() for v in values]
+
+
+def iter_csv(data_dir: Path, filename: str) -> Iterator[dict[str, str]]:
+    """Yield row dicts with stripped keys and values, one row at a time.
+
+    Rows are padded or truncated to the header as in Table.parse, so stream
+    mode yields the same rows as a parsed table.
+    """
+    records = _iter_records(data_dir / filename)
+    keys = next(records, None)
+    if keys is None:
+        return
+    width = len(keys)
+    for values in records:
+        yield dict(zip(keys, (values + [""] * width)[:width]))
+
+
+def read_csv(data_dir: Path, filename: str) -> list[dict[str, Any]]:
+    """Read a whole CSV file into a list of row dicts with stripped values."""
+    return list(iter_csv(data_dir, filename))
+
+
+# ---------------------------------------------------------------------------
+# Column-oriented tables
+# ---------------------------------------------------------------------------
+
+
+class Table:
+    """One parsed CSV file, stored as a tuple of values per column.
+
+    Rows shorter than the header are padded with "" and surplus values are
+    dropped, so every column has exactly len(table) entries.
+    """
+
+    def __init__(
+        self, name: str, columns: list[str], data: Mapping[str, tuple[str, ...]], length: int
+    ) -> None:
+        self.name = name
+        self.columns = tuple(columns)
+        self._data = data
+        self._len = length
+        self._lock = threading.Lock()
+        self._unique: dict[str, dict[str, int]] = {}
+        self._multi: dict[str, dict[str, list[int]]] = {}
+
+    @classmethod
+    def parse(cls, path: Path) -> Table:
+        records = _iter_records(path)
+        header = next(records, [])
+        width = len(header)
+        cols: list[list[str]] = [[] for _ in range(width)]
+        for values in records:
+            values = (values + [""] * width)[:width]
+            for col, v in zip(cols, values):
+                col.append(sys.intern(v) if len(v) <= _INTERN_MAX else v)
+        rows = len(cols[0]) if cols else 0
+        return cls(path.name, header, dict(zip(header, map(tuple, cols))), rows)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def column(self, name: str) -> tuple[str, ...]:
+        return self._data[name]
+
+    def row(self, i: int) -> dict[str, str]:
+        return {c: self._data[c][i] for c in self.columns}
+
+    def rows(self) -> Iterator[dict[str, str]]:
+        """Yield each row as a fresh dict, in file order."""
+        cols = [self._data[c] for c in self.columns]
+        for values in zip(*cols):
+            yield dict(zip(self.columns, values))
+
+    def key_index(self, column: str) -> dict[str, int]:
+        """Primary-key index: value -> position of the last row with that value.
+
+        The last row wins, as it does when rows are written with MERGE + SET.
+        """
+        with self._lock:
+            if column not in self._unique:
+                self._unique[column] = {v: i for i, v in enumerate(self._data[column])}
+            return self._unique[column]
+
+    def ref_index(self, column: str) -> dict[str, list[int]]:
+        """Foreign-key index: value -> positions of every row with that value."""
+        with self._lock:
+            if column not in self._multi:
+                index: dict[str, list[int]] = {}
+                for i, v in enumerate(self._data[column]):
+                    index.setdefault(v, []).append(i)
+                self._multi[column] = index
+            return self._multi[column]
+
+    def lookup(self, column: str, value: str) -> dict[str, str] | None:
+        """Return the row whose key column equals value, or None."""
+        i = self.key_index(column).get(value)
+        return None if i is None else self.row(i)
+
+    def find(self, column: str, value: str) -> list[dict[str, str]]:
+        """Return every row whose column equals value."""
+        return [self.row(i) for i in self.ref_index(column).get(value, [])]
+
+
+# ---------------------------------------------------------------------------
+# Dataset
+# ---------------------------------------------------------------------------
+
+
+class Dataset:
+    """All CSV files of one run, each parsed at most once.
+
+    Tables are parsed lazily on first access and shared between threads.
+    With stream=True nothing is kept in memory: rows() and last_rows()
+    re-read the file each time, in constant memory, and table() is
+    unavailable. Pass a TableCache to reuse tables parsed by earlier runs.
+    """
+
+    def __init__(
+        self, data_dir: Path, stream: bool = False, cache: TableCache | None = None
+    ) -> None:
+        self.data_dir = data_dir
+        self.stream = stream
+        self.cache = cache
+        self._tables: dict[str, Table] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def table(self, filename: str) -> Table:
+        """Return the parsed table for filename, parsing or loading it on first use.
+
+        Each file has its own lock, so threads asking for different files
+        parse them concurrently and only threads asking for the same file wait.
+        """
+        if self.stream:
+            raise RuntimeError("Dataset was opened with stream=True; tables are not kept.")
+        with self._lock:
+            lock = self._locks.setdefault(filename, threading.Lock())
+        with lock:
+            if filename not in self._tables:
+                path = self.data_dir / filename
+                self._tables[filename] = (
+                    self.cache.load(path) if self.cache is not None else Table.parse(path)
+                )
+            return self._tables[filename]
+
+    def fingerprint(self) -> str:
+        """Return a short hash of the names, sizes and mtimes of all CSV files."""
+        h = hashlib.blake2b(digest_size=12)
+        for path in sorted(self.data_dir.glob("*.csv")):
+            st = path.stat()
+            h.update(f"{path.name}\x1f{st.st_size}\x1f{st.st_mtime_ns}\x1e".encode())
+        return h.hexdigest()
+
+    def load_all(self) -> Dataset:
+        """Parse every CSV file in data_dir up front."""
+        if not self.stream:
+            for path in sorted(self.data_dir.glob("*.csv")):
+                self.table(path.name)
+        return self
+
+    def rows(self, filename: str) -> Iterator[dict[str, str]]:
+        """Yield the rows of a file as dicts."""
+        if self.stream:
+            return iter_csv(self.data_dir, filename)
+        return self.table(filename).rows()
+
+    def last_rows(self, filename: str, key: str) -> Iterator[dict[str, str]]:
+        """Yield only the last row for each distinct key, in file order.
+
+        Matches MERGE + SET semantics (the last duplicate row wins). In
+        stream mode a first pass records each key's last row number and a
+        second pass keeps those rows, holding only the keys in memory.
+        """
+        if self.stream:
+            last = {row[key]: i for i, row in enumerate(iter_csv(self.data_dir, filename))}
+            keep = set(last.values())
+            del last
+            return (
+                row for i, row in enumerate(iter_csv(self.data_dir, filename)) if i in keep
+            )
+        table = self.table(filename)
+        return (table.row(i) for i in sorted(table.key_index(key).values()))
@@ -0,0 +1,96 @@
+"""Persistent embedding cache, so identical texts are embedded only once.
+
+Vectors are stored in a local SQLite database keyed by model, dimensions and
+the sha256 of the text, as packed float32. The cache survives `clean`, so a
+clean + load re-embeds nothing that was embedded before.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+
+EMBED_CACHE_FILENAME = "embeddings.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    dims INTEGER NOT NULL,
+    text_sha256 BLOB NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (model, dims, text_sha256)
+) WITHOUT ROWID
+"""
+
+# SQLite limits the number of host parameters per statement.
+_LOOKUP_CHUNK = 500
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode()).digest()
+
+
+class EmbeddingCache:
+    """Embedding vectors by (model, dims, sha256(text)), persisted in SQLite.
+
+    Safe to use from several threads. hits and misses count lookups since
+    the cache was opened.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = cache_dir / EMBED_CACHE_FILENAME
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, dims: int, texts: list[str]) -> list[list[float] | None]:
+        """Return the cached vector for each text, or None where there is none."""
+        keys = [text_key(t) for t in texts]
+        found: dict[bytes, list[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = list(dict.fromkeys(keys[i : i + _LOOKUP_CHUNK]))
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT text_sha256, vector FROM embeddings "
+                    f"WHERE model = ? AND dims = ? AND text_sha256 IN ({marks})",
+                    (model, dims, *chunk),
+                )
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            vectors = [found.get(k) for k in keys]
+            hits = sum(v is not None for v in vectors)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model: str, dims: int, texts: list[str], vectors: list[list[float]]) -> None:
+        """Store vectors for texts, replacing any existing entries."""
+        rows = [
+            (model, dims, text_key(t), array("f", v).tobytes()) for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0.0
+        return f"{self.hits:,} cached, {self.misses:,} embedded ({rate:.0f}% hit rate)"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
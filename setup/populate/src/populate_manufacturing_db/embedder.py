@@ -1,118 +1,513 @@
-"""OpenAI embedding integration: embed Requirement and Defect descriptions."""
+"""Embedding integration: embed Requirement and Defect descriptions."""
 
 from __future__ import annotations
 
+import asyncio
+import random
+import threading
 import time
+import unicodedata
+from collections import Counter, deque
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from openai import OpenAI
 from neo4j import Driver
 
+from .batching import AdaptiveBatcher
+from .checkpoint import LoadCheckpoint
 from .config import Settings
+from .dataset import Dataset
+from .embedcache import EmbeddingCache, text_key
+from .providers import (
+    EmbeddingProvider,
+    EmbeddingRateLimited,
+    EmbeddingUnavailable,
+    get_provider,
+)
+from .ratelimit import RateLimiter
+from .tokenizer import BatchPacker, count_tokens, tokenizer_name
+from .vectors import encode, packed_supported, write_query
 
-# OpenAI supports up to ~8k inputs per batch; we use a smaller size
-# to keep Neo4j write transactions manageable.
+# Initial batch size for writing embeddings to Neo4j (AdaptiveBatcher resizes
+# it). Requests to the provider are packed by token count instead (BatchPacker).
 EMBED_BATCH_SIZE = 100
 
-# Default model and dimensions.
-OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
-OPENAI_EMBEDDING_DIMS = 1536
+# Attempts per request on 429s, timeouts, connection errors and 5xx responses.
+EMBED_MAX_ATTEMPTS = 6
 
+# Where each embedded label's text comes from in TransformedData/:
+# (file, key column, text column).
+_CSV_SOURCES: dict[str, tuple[str, str, str]] = {
+    "Requirement": ("requirements.csv", "requirement_id", "Description"),
+    "Defect": ("defects.csv", "defect_id", "Description"),
+}
 
-def get_openai_client(settings: Settings) -> OpenAI:
-    """Create an OpenAI client."""
-    return OpenAI(api_key=settings.openai_api_key.get_secret_value())
 
+def _split_cached(
+    provider: EmbeddingProvider, cache: EmbeddingCache | None, texts: list[str]
+) -> tuple[list[list[float] | None], list[int]]:
+    """Return cached vectors (None where missing) and the indexes still to embed."""
+    if cache is None:
+        return [None] * len(texts), list(range(len(texts)))
+    vectors = cache.get_many(provider.model, provider.dims, texts)
+    return vectors, [i for i, v in enumerate(vectors) if v is None]
 
-def embed_texts(client: OpenAI, texts: list[str]) -> list[list[float]]:
-    """Embed a batch of texts using the OpenAI embeddings API."""
-    response = client.embeddings.create(
-        model=OPENAI_EMBEDDING_MODEL,
-        input=texts,
+
+def _merge_fresh(
+    provider: EmbeddingProvider,
+    cache: EmbeddingCache | None,
+    texts: list[str],
+    vectors: list[list[float] | None],
+    missing: list[int],
+    fresh: list[list[float]],
+) -> list[list[float]]:
+    """Fill freshly embedded vectors into place and add them to the cache."""
+    for i, v in zip(missing, fresh):
+        vectors[i] = v
+    if cache is not None and missing:
+        cache.put_many(provider.model, provider.dims, [texts[i] for i in missing], fresh)
+    return vectors  # type: ignore[return-value]
+
+
+def _retry_delay(exc: Exception, attempt: int, limiter: RateLimiter | None) -> float | None:
+    """Return seconds to wait before retrying a failed request, or None to give up.
+
+    Rate limits honour the provider's Retry-After (and pause every caller
+    sharing the limiter); other transient failures back off exponentially
+    with jitter.
+    """
+    if attempt >= EMBED_MAX_ATTEMPTS:
+        return None
+    if isinstance(exc, EmbeddingRateLimited):
+        delay = exc.retry_after or min(2.0**attempt, 60.0)
+        if limiter is not None:
+            limiter.pause(delay)
+            return 0.0  # the limiter makes everyone wait, this caller included
+        return delay
+    if isinstance(exc, EmbeddingUnavailable):
+        return min(0.5 * 2**attempt, 30.0) * random.uniform(0.5, 1.5)
+    return None
+
+
+def embed_texts(
+    provider: EmbeddingProvider,
+    texts: list[str],
+    cache: EmbeddingCache | None = None,
+    limiter: RateLimiter | None = None,
+) -> list[list[float]]:
+    """Embed a batch of texts with the given provider.
+
+    With a cache, only texts that are not cached yet are sent to the provider.
+    With a limiter, the request waits for its share of the requests/min and
+    tokens/min budget and is retried on rate limits and transient errors.
+    """
+    vectors, missing = _split_cached(provider, cache, texts)
+    fresh = []
+    if missing:
+        batch = [texts[i] for i in missing]
+        tokens = sum(count_tokens(t, provider.model) for t in batch)
+        attempt = 0
+        while True:
+            if limiter is not None:
+                time.sleep(limiter.reserve(tokens))
+            try:
+                fresh = provider.embed(batch)
+                break
+            except Exception as exc:
+                attempt += 1
+                if limiter is None or (delay := _retry_delay(exc, attempt, limiter)) is None:
+                    raise
+                time.sleep(delay)
+    return _merge_fresh(provider, cache, texts, vectors, missing, fresh)
+
+
+async def embed_texts_async(
+    provider: EmbeddingProvider,
+    texts: list[str],
+    cache: EmbeddingCache | None = None,
+    limiter: RateLimiter | None = None,
+) -> list[list[float]]:
+    """Async variant of embed_texts."""
+    vectors, missing = _split_cached(provider, cache, texts)
+    fresh = []
+    if missing:
+        batch = [texts[i] for i in missing]
+        tokens = sum(count_tokens(t, provider.model) for t in batch)
+        attempt = 0
+        while True:
+            if limiter is not None:
+                await asyncio.sleep(limiter.reserve(tokens))
+            try:
+                fresh = await provider.aembed(batch)
+                break
+            except Exception as exc:
+                attempt += 1
+                if limiter is None or (delay := _retry_delay(exc, attempt, limiter)) is None:
+                    raise
+                await asyncio.sleep(delay)
+    return _merge_fresh(provider, cache, texts, vectors, missing, fresh)
+
+
+class EmbeddingExecutor:
+    """Runs embedding requests on a thread pool under a shared rate limit.
+
+    Throughput scales with concurrency up to what the requests/min and
+    tokens/min budgets allow, instead of being bound by per-call latency.
+    Retries go through the limiter so a 429 slows every worker down, not
+    just the one that hit it. Local providers run without a limiter, one
+    batch at a time. The packer decides how texts are grouped into requests.
+    """
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        limiter: RateLimiter | None,
+        concurrency: int = 4,
+        cache: EmbeddingCache | None = None,
+        packer: BatchPacker | None = None,
+    ) -> None:
+        self.provider = provider
+        self.limiter = limiter
+        self.concurrency = max(concurrency, 1)
+        self.cache = cache
+        self.packer = packer or BatchPacker(provider.model)
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return embed_texts(self.provider, texts, self.cache, self.limiter)
+
+    def map(self, batches: Iterable[list[str]]) -> Iterator[list[list[float]]]:
+        """Embed batches concurrently, yielding results in input order.
+
+        At most twice the concurrency is in flight, so batches are pulled
+        from the iterable lazily.
+        """
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="embed") as pool:
+            pending: deque[Future[list[list[float]]]] = deque()
+            for batch in batches:
+                pending.append(pool.submit(self.embed, batch))
+                if len(pending) >= 2 * self.concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+def embed_text(provider: EmbeddingProvider, text: str) -> list[float]:
+    """Embed a single text with the given provider."""
+    return embed_texts(provider, [text])[0]
+
+
+def make_packer(provider: EmbeddingProvider, settings: Settings) -> BatchPacker:
+    """Request packer for provider, capped by EMBED_BATCH_TOKENS / EMBED_BATCH_ITEMS."""
+    items = settings.embed_batch_items
+    if provider.max_batch_items is not None:
+        items = min(items, provider.max_batch_items)
+    return BatchPacker(provider.model, settings.embed_batch_tokens, items)
+
+
+def make_limiter(provider: EmbeddingProvider, settings: Settings) -> RateLimiter | None:
+    """Shared rate limiter for a remote provider; local providers need none."""
+    if not provider.remote:
+        return None
+    return RateLimiter(settings.openai_rpm, settings.openai_tpm)
+
+
+# ---------------------------------------------------------------------------
+# Deduplication
+# ---------------------------------------------------------------------------
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for embedding: NFC, whitespace runs collapsed, stripped."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_fingerprint(text: str) -> str:
+    """Fingerprint stored next to an embedding: sha256 of the normalized text."""
+    return text_key(normalize_text(text)).hex()
+
+
+def stale_reason(node: Mapping, text: str, model_id: str) -> str | None:
+    """Why a node's embedding must be (re)computed, or None if it is current.
+
+    node carries `embedded`, `fingerprint` and `model` as returned by the
+    pending queries. Embeddings written before models and fingerprints
+    were stored count as from another model.
+    """
+    if not node["embedded"]:
+        return "new"
+    if node["model"] != model_id:
+        return "other model"
+    if node["fingerprint"] != text_fingerprint(text):
+        return "changed text"
+    return None
+
+
+class DedupStats:
+    """Counts texts seen, unique texts embedded and requests saved, across labels and threads."""
+
+    def __init__(self) -> None:
+        self.texts = 0
+        self.unique = 0
+        self.requests_avoided = 0
+        self._lock = threading.Lock()
+
+    def group(self, items: list[tuple[str, str]], packer: BatchPacker) -> dict[str, list[str]]:
+        """Group node ids by normalized text, in first-seen order.
+
+        requests_avoided grows by the requests packer would have needed for
+        every text minus those it needs for the unique ones.
+        """
+        groups: dict[str, list[str]] = {}
+        keys = [normalize_text(text) for _, text in items]
+        for (node_id, _), key in zip(items, keys):
+            groups.setdefault(key, []).append(node_id)
+        tokens = {key: packer.input_tokens(key) for key in groups}
+        every = packer.count_requests(tokens[key] for key in keys)
+        avoided = every - packer.count_requests(tokens.values())
+        with self._lock:
+            self.texts += len(items)
+            self.unique += len(groups)
+            self.requests_avoided += avoided
+        return groups
+
+    def summary(self) -> str:
+        dupes = self.texts - self.unique
+        return (
+            f"{self.texts:,} texts, {self.unique:,} unique ({dupes:,} duplicate(s) not sent, "
+            f"{self.requests_avoided:,} request(s) avoided)"
+        )
+
+
+def fan_out(
+    groups: dict[str, list[str]],
+    batch: list[tuple[str, str]],
+    vectors: list[list[float]],
+    model_id: str,
+    packed: bool = False,
+) -> Iterator[dict]:
+    """Yield an embedding update for every node sharing each embedded text.
+
+    Keys are normalized texts; each update carries the text's fingerprint
+    and model_id so later runs can tell whether the embedding is current.
+    """
+    for (key, _), vector in zip(batch, vectors):
+        value = encode(vector, packed)
+        fingerprint = text_key(key).hex()
+        for node_id in groups[key]:
+            yield {"id": node_id, "embedding": value, "fingerprint": fingerprint, "model": model_id}
+
+
+# Embedding state returned for every node with text by the pending queries.
+_NODE_STATE = (
+    "n.embedding IS NOT NULL AS embedded, "
+    "n.embedding_fingerprint AS fingerprint, n.embedding_model AS model"
+)
+
+
+def _fetch_pending(
+    driver: Driver,
+    label: str,
+    id_prop: str,
+    text_prop: str,
+    data: Dataset | None,
+    model_id: str,
+    reasons: Counter | None = None,
+) -> list[tuple[str, str]]:
+    """Return (id, text) for nodes with a non-empty text property and no current embedding.
+
+    An embedding is current when it was made by model_id from the node's
+    present text (see stale_reason); reasons counts why the others are
+    pending. With an in-memory dataset texts are looked up in the parsed
+    CSV; ids the CSV does not know fall back to the text stored on the node.
+    """
+    nodes = f"MATCH (n:{label}) WHERE n.{text_prop} IS NOT NULL AND n.{text_prop} <> '' "
+    source = _CSV_SOURCES.get(label)
+    if data is None or data.stream or source is None:
+        records, _, _ = driver.execute_query(
+            nodes + f"RETURN n.{id_prop} AS id, n.{text_prop} AS text, " + _NODE_STATE
+        )
+        texts = {r["id"]: r["text"] for r in records}
+    else:
+        filename, key_col, text_col = source
+        table = data.table(filename)
+        index, column = table.key_index(key_col), table.column(text_col)
+        records, _, _ = driver.execute_query(nodes + f"RETURN n.{id_prop} AS id, " + _NODE_STATE)
+        texts, unknown = {}, []
+        for r in records:
+            i = index.get(r["id"])
+            if i is not None and column[i]:
+                texts[r["id"]] = column[i]
+            else:
+                unknown.append(r["id"])
+        if unknown:
+            found, _, _ = driver.execute_query(
+                f"UNWIND $ids AS id MATCH (n:{label} {{{id_prop}: id}}) "
+                f"RETURN n.{id_prop} AS id, n.{text_prop} AS text",
+                ids=unknown,
+            )
+            texts.update((r["id"], r["text"]) for r in found)
+
+    items = []
+    for r in records:
+        text = texts.get(r["id"])
+        if text and (reason := stale_reason(r, text, model_id)) is not None:
+            items.append((r["id"], text))
+            if reasons is not None:
+                reasons[reason] += 1
+    return items
+
+
+def orphaned_embeddings_query(label: str, text_prop: str) -> str:
+    """Query removing embeddings from nodes whose text is now empty, returning `removed`."""
+    return (
+        f"MATCH (n:{label}) "
+        f"WHERE (n.{text_prop} IS NULL OR n.{text_prop} = '') AND n.embedding IS NOT NULL "
+        f"REMOVE n.embedding, n.embedding_fingerprint, n.embedding_model "
+        f"RETURN count(n) AS removed"
     )
-    return [item.embedding for item in response.data]
 
 
-def embed_text(client: OpenAI, text: str) -> list[float]:
-    """Embed a single text using the OpenAI embeddings API."""
-    return embed_texts(client, [text])[0]
+def clear_orphaned_embeddings(driver: Driver, label: str, text_prop: str) -> int:
+    """Remove embeddings from nodes whose text is now empty; return how many."""
+    records, _, _ = driver.execute_query(orphaned_embeddings_query(label, text_prop))
+    return records[0]["removed"] if records else 0
 
 
 def _embed_and_store(
     driver: Driver,
-    client: OpenAI,
+    executor: EmbeddingExecutor,
     label: str,
     id_prop: str,
     text_prop: str,
+    data: Dataset | None = None,
+    checkpoint: LoadCheckpoint | None = None,
+    dedup: DedupStats | None = None,
+    packed: bool = False,
 ) -> int:
-    """Fetch nodes, embed their text property, and store embeddings back.
+    """Fetch nodes, embed their text property, and store embeddings back as float32.
 
-    Returns the number of nodes embedded.
+    Returns the number of nodes embedded. Only nodes without a current
+    embedding are fetched, so edited descriptions are re-embedded and an
+    interrupted run picks up where it stopped; with a checkpoint, a label
+    that already finished is skipped entirely. packed sends vectors as
+    native float32 VECTOR values (see vectors.py).
     """
-    # Fetch all nodes that have a non-empty text property and no embedding yet.
-    records, _, _ = driver.execute_query(
-        f"MATCH (n:{label}) "
-        f"WHERE n.{text_prop} IS NOT NULL AND n.{text_prop} <> '' "
-        f"AND n.embedding IS NULL "
-        f"RETURN n.{id_prop} AS id, n.{text_prop} AS text"
-    )
+    step = f"embed:{label}"
+    if checkpoint is not None and checkpoint.finished(step) is not None:
+        print(f"  {label} embeddings already committed (resumed).")
+        return 0
+
+    removed = clear_orphaned_embeddings(driver, label, text_prop)
+    if removed:
+        print(f"  Removed {removed} {label} embedding(s) whose text is now empty.")
+
+    # Fetch nodes with text whose embedding is missing, outdated or from another model.
+    model_id = executor.provider.model_id
+    reasons: Counter = Counter()
+    records = _fetch_pending(driver, label, id_prop, text_prop, data, model_id, reasons)
 
     if not records:
-        print(f"  No {label} nodes need embedding (already embedded or no text).")
+        print(f"  No {label} nodes need embedding (embeddings current or no text).")
         return 0
 
     total = len(records)
-    print(f"  Embedding {total} {label} descriptions...")
-
-    # Process in batches.
-    for i in range(0, total, EMBED_BATCH_SIZE):
-        batch = records[i : i + EMBED_BATCH_SIZE]
-        texts = [row["text"] for row in batch]
-        embeddings = embed_texts(client, texts)
-
-        updates = [
-            {"id": row["id"], "embedding": emb}
-            for row, emb in zip(batch, embeddings)
-        ]
-
-        # Write batch back to Neo4j.
-        driver.execute_query(
-            f"UNWIND $batch AS row "
-            f"MATCH (n:{label} {{{id_prop}: row.id}}) "
-            f"SET n.embedding = row.embedding",
-            batch=updates,
-        )
+    detail = ", ".join(f"{n} {reason}" for reason, n in reasons.most_common())
+    print(f"  Embedding {total} {label} descriptions ({detail})...")
+
+    # Embed each distinct (normalized) text once; batches are keyed by that text.
+    groups = (dedup or DedupStats()).group(records, executor.packer)
+    batches = list(executor.packer.pack((text, text) for text in groups))
 
-        progress = min(i + EMBED_BATCH_SIZE, total)
-        print(f"  Progress: {progress}/{total} ({100 * progress // total}%)", end="\r")
+    def _updates() -> Iterator[dict]:
+        texts = ([text for _, text in batch] for batch in batches)
+        for batch, embeddings in zip(batches, executor.map(texts)):
+            yield from fan_out(groups, batch, embeddings, model_id, packed)
+
+    def _progress(done: int) -> None:
+        if checkpoint is not None:
+            checkpoint.advance(step, done)
+        print(f"  Progress: {done}/{total} ({100 * done // total}%)", end="\r")
+
+    # Write embeddings back to Neo4j in adaptively sized batches.
+    AdaptiveBatcher(EMBED_BATCH_SIZE).run(
+        driver, write_query(label, id_prop, packed), _updates(), on_batch=_progress
+    )
 
     print()
+    if checkpoint is not None:
+        checkpoint.finish(step, total)
     return total
 
 
-def embed_descriptions(driver: Driver, settings: Settings) -> None:
-    """Generate embeddings for Requirement and Defect description fields."""
-    client = get_openai_client(settings)
+def embed_descriptions(
+    driver: Driver,
+    settings: Settings,
+    data: Dataset | None = None,
+    checkpoint: LoadCheckpoint | None = None,
+    provider: EmbeddingProvider | None = None,
+) -> None:
+    """Generate embeddings for Requirement and Defect description fields.
 
-    print(f"Using model: {OPENAI_EMBEDDING_MODEL} ({OPENAI_EMBEDDING_DIMS} dims)\n")
+    Pass the run's dataset to read description texts from the parsed CSVs,
+    and the load checkpoint to record finished labels. The provider defaults
+    to the one selected in settings.
+    """
+    provider = provider or get_provider(settings)
+    cache = EmbeddingCache(settings.cache_dir)
+    limiter = make_limiter(provider, settings)
+    packer = make_packer(provider, settings)
+    concurrency = settings.embed_concurrency if provider.remote else 1
+    executor = EmbeddingExecutor(provider, limiter, concurrency, cache, packer)
+    dedup = DedupStats()
+    packed = packed_supported(driver)
+
+    print(f"Using provider: {provider.describe()}")
+    print(f"  Vectors stored as float32, sent as {'packed float32' if packed else 'lists'}")
+    if limiter is not None:
+        print(
+            f"  {executor.concurrency} concurrent requests, "
+            f"limits {settings.openai_rpm:,} requests/min and {settings.openai_tpm:,} tokens/min"
+        )
+    print(
+        f"  Requests packed up to {packer.max_tokens:,} tokens / {packer.max_items} texts "
+        f"({tokenizer_name(provider.model)})\n"
+    )
 
     start = time.monotonic()
 
     req_count = _embed_and_store(
-        driver, client,
+        driver, executor,
         label="Requirement",
         id_prop="requirement_id",
         text_prop="description",
+        data=data,
+        checkpoint=checkpoint,
+        dedup=dedup,
+        packed=packed,
     )
     print(f"  [OK] Embedded {req_count} Requirement descriptions.\n")
 
     defect_count = _embed_and_store(
-        driver, client,
+        driver, executor,
         label="Defect",
         id_prop="defect_id",
         text_prop="description",
+        data=data,
+        checkpoint=checkpoint,
+        dedup=dedup,
+        packed=packed,
     )
     print(f"  [OK] Embedded {defect_count} Defect descriptions.\n")
 
     elapsed = time.monotonic() - start
     total = req_count + defect_count
     print(f"Embedding complete: {total} nodes in {elapsed:.1f}s.")
+    print(f"  Deduplicated: {dedup.summary()}")
+    print(f"  Embedding cache: {cache.summary()}")
+    print(f"  Requests: {packer.requests:,} packed, {packer.truncated:,} text(s) truncated")
+    if limiter is not None and limiter.throttled:
+        print(
+            f"  [WARN] Rate limited {limiter.throttled} time(s); "
+            f"consider lowering OPENAI_RPM / OPENAI_TPM."
+        )
+    cache.close()
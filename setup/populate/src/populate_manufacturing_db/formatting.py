@@ -2,32 +2,43 @@
 
 from __future__ import annotations
 
+import io
+import sys
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TextIO
+
 _W = 70
 
 
-def header(title: str, description: str) -> None:
+def header(title: str, description: str, out: TextIO | None = None) -> None:
     """Print a section header with title and description."""
-    print(f"\n{'=' * _W}")
-    print(f"  {title}")
-    print(f"{'=' * _W}")
-    print(f"\n  {description}\n")
+    print(f"\n{'=' * _W}", file=out)
+    print(f"  {title}", file=out)
+    print(f"{'=' * _W}", file=out)
+    print(f"\n  {description}\n", file=out)
 
 
-def cypher(query: str) -> None:
+def cypher(query: str, out: TextIO | None = None) -> None:
     """Pretty-print a Cypher query with consistent indentation."""
     lines = query.strip().splitlines()
     indents = [len(ln) - len(ln.lstrip()) for ln in lines if ln.strip()]
     base = min(indents) if indents else 0
-    print("  Cypher:")
+    print("  Cypher:", file=out)
     for ln in lines:
-        print(f"    {ln[base:]}")
-    print()
+        print(f"    {ln[base:]}", file=out)
+    print(file=out)
 
 
-def table(headers: list[str], rows: list[list], widths: list[int] | None = None) -> None:
+def table(
+    headers: list[str],
+    rows: list[list],
+    widths: list[int] | None = None,
+    out: TextIO | None = None,
+) -> None:
     """Print a formatted table with auto-calculated column widths."""
     if not rows:
-        print("  (no results)\n")
+        print("  (no results)\n", file=out)
         return
     if widths is None:
         widths = []
@@ -36,8 +47,8 @@ def table(headers: list[str], rows: list[list], widths: list[int] | None = None)
             for row in rows:
                 col_max = max(col_max, len(str(row[i] if i < len(row) else "")))
             widths.append(min(col_max + 1, 50))
-    print("  " + "  ".join(h.ljust(w) for h, w in zip(headers, widths)))
-    print("  " + "  ".join("\u2500" * w for w in widths))
+    print("  " + "  ".join(h.ljust(w) for h, w in zip(headers, widths)), file=out)
+    print("  " + "  ".join("\u2500" * w for w in widths), file=out)
     for row in rows:
         cells = []
         for v_item, w in zip(row, widths):
@@ -45,8 +56,8 @@ def table(headers: list[str], rows: list[list], widths: list[int] | None = None)
             if len(s) > w:
                 s = s[: w - 1] + "\u2026"
             cells.append(s.ljust(w))
-        print("  " + "  ".join(cells))
-    print()
+        print("  " + "  ".join(cells), file=out)
+    print(file=out)
 
 
 def val(v, max_len: int = 0) -> str:
@@ -62,3 +73,40 @@ def banner(text: str) -> None:
     print(f"\n{'#' * _W}")
     print(f"  {text}")
     print(f"{'#' * _W}")
+
+
+def run_sections(sections: list[Callable[[TextIO], None]], workers: int) -> None:
+    """Run printing sections on a thread pool and print their output in list order.
+
+    Each section is called with the stream to print to: its own buffer, so
+    the report reads exactly as a sequential run would. A section's output
+    appears as soon as it and every section before it have finished. Every
+    section runs even if another one fails; the first exception is raised
+    after all output has been printed. workers=1 runs the sections in order,
+    printing straight to stdout.
+    """
+    errors: list[Exception] = []
+    if workers <= 1:
+        for section in sections:
+            try:
+                section(sys.stdout)
+            except Exception as exc:
+                errors.append(exc)
+    else:
+
+        def _run(section: Callable[[TextIO], None]) -> tuple[str, Exception | None]:
+            buffer = io.StringIO()
+            try:
+                section(buffer)
+            except Exception as exc:
+                return buffer.getvalue(), exc
+            return buffer.getvalue(), None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(_run, section) for section in sections]:
+                output, error = future.result()
+                sys.stdout.write(output)
+                if error is not None:
+                    errors.append(error)
+    if errors:
+        raise errors[0]
@@ -1,58 +1,135 @@
-"""CSV reading, batched loading, database clearing, and verification."""
+"""Batched loading, database clearing, and verification."""
 
 from __future__ import annotations
 
-import csv
-from pathlib import Path
-from typing import Any
+import re
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import islice
+from typing import NamedTuple
 
 from neo4j import Driver
 
+from .batching import AdaptiveBatcher
+from .checkpoint import LoadCheckpoint
+from .dataset import Dataset
+from .manifest import KEY_SEP, LoadManifest, row_hash
+from .scheduler import Task, print_timings, run_dag
+from .schema import CONSTRAINTS
+
+# Initial batch size; AdaptiveBatcher resizes batches from there.
 BATCH_SIZE = 1000
 
 # ---------------------------------------------------------------------------
-# CSV helpers
+# Batching
 # ---------------------------------------------------------------------------
 
 
-def read_csv(data_dir: Path, filename: str) -> list[dict[str, Any]]:
-    """Read a CSV file and return a list of row dicts with stripped values.
-
-    Tries utf-8 first, falls back to latin-1 for files with German umlauts.
+def iter_batches(records: Iterable[dict], size: int = BATCH_SIZE) -> Iterator[list[dict]]:
+    """Group records into lists of at most size items, lazily."""
+    it = iter(records)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _run_in_batches(
+    driver: Driver,
+    records: Iterable[dict],
+    query: str,
+    progress: bool = True,
+    on_commit: Callable[[int], None] | None = None,
+    idempotent: bool = True,
+) -> int:
+    """Execute a Cypher query over records in adaptively sized batches.
+
+    Records may be any iterable (typically a Dataset.rows generator); only one
+    batch is held in memory at a time. Returns the number of records written.
+    Pass progress=False when several loads share the terminal. on_commit is
+    called with the running row count after each committed batch. Pass
+    idempotent=False for CREATE queries (see AdaptiveBatcher).
     """
-    path = data_dir / filename
-    for encoding in ("utf-8", "latin-1"):
-        try:
-            with open(path, newline="", encoding=encoding) as f:
-                reader = csv.DictReader(f)
-                rows = []
-                for row in reader:
-                    rows.append({k.strip(): v.strip() for k, v in row.items() if k is not None})
-                return rows
-        except UnicodeDecodeError:
-            continue
-    raise UnicodeDecodeError("utf-8", b"", 0, 1, f"Cannot decode {filename} with utf-8 or latin-1")
-
-
-def _run_in_batches(driver: Driver, records: list[dict], query: str) -> None:
-    """Execute a Cypher query over records in batches of BATCH_SIZE."""
-    total = len(records)
-    for i in range(0, total, BATCH_SIZE):
-        batch = records[i : i + BATCH_SIZE]
-        driver.execute_query(query, batch=batch)
-        progress = min(i + BATCH_SIZE, total)
-        print(f"  Progress: {progress}/{total} ({100 * progress // total}%)", end="\r")
-    print()
+    batcher = AdaptiveBatcher(BATCH_SIZE, idempotent=idempotent)
+
+    def _on_batch(done: int) -> None:
+        if on_commit is not None:
+            on_commit(done)
+        if progress:
+            print(f"  Progress: {done:,} rows (batch size {batcher.size:,})", end="\r")
+
+    done = batcher.run(driver, query, records, on_batch=_on_batch)
+    if progress:
+        print()
+    return done
+
+
+# ---------------------------------------------------------------------------
+# Row filters
+# ---------------------------------------------------------------------------
+
+
+def _unique_by(records: Iterable[dict], key: str) -> Iterator[dict]:
+    """Yield the first record seen for each distinct value of key."""
+    seen: set[str] = set()
+    for row in records:
+        value = row[key]
+        if value not in seen:
+            seen.add(value)
+            yield row
+
+
+def _unique_pairs(records: Iterable[dict], keys: tuple[str, str]) -> Iterator[dict]:
+    """Yield the first record seen for each distinct (source, target) key pair."""
+    seen: set[tuple[str, str]] = set()
+    for row in records:
+        pair = (row[keys[0]], row[keys[1]])
+        if pair not in seen:
+            seen.add(pair)
+            yield row
 
 
 # ---------------------------------------------------------------------------
 # Node loading
 # ---------------------------------------------------------------------------
 
-_NODE_DEFINITIONS: list[tuple[str, str, str]] = [
-    (
+
+class NodeDefinition(NamedTuple):
+    """A node label loaded from one CSV file, keyed by one CSV column.
+
+    Derived labels supply rows(data), computed from the source file,
+    in place of the file's raw rows.
+    """
+
+    label: str
+    filename: str
+    key: str
+    query: str
+    rows: Callable[[Dataset], Iterable[dict]] | None = None
+
+
+class RelDefinition(NamedTuple):
+    """A relationship type loaded from one CSV file between two node labels.
+
+    keys names the CSV columns identifying the source and target nodes.
+    Derived types supply rows(data) in place of the file's raw rows.
+    """
+
+    rel_type: str
+    filename: str
+    source: str
+    target: str
+    keys: tuple[str, str]
+    query: str
+    rows: Callable[[Dataset], Iterable[dict]] | None = None
+
+
+_NODE_DEFINITIONS: list[NodeDefinition] = [
+    NodeDefinition(
         "Product",
         "products.csv",
+        "product_id",
         """
         UNWIND $batch AS row
         MERGE (p:Product {product_id: row['product_id']})
@@ -60,18 +137,20 @@ _NODE_DEFINITIONS: list[tuple[str, str, str]] = [
             p.description = row['Description']
         """,
     ),
-    (
+    NodeDefinition(
         "TechnologyDomain",
         "technology_domains.csv",
+        "technology_domain_id",
         """
         UNWIND $batch AS row
         MERGE (td:TechnologyDomain {technology_domain_id: row['technology_domain_id']})
         SET td.name = row['Technology Domain']
         """,
     ),
-    (
+    NodeDefinition(
         "Component",
         "components.csv",
+        "component_id",
         """
         UNWIND $batch AS row
         MERGE (c:Component {component_id: row['component_id']})
@@ -79,9 +158,10 @@ _NODE_DEFINITIONS: list[tuple[str, str, str]] = [
             c.description = row['Component Description']
         """,
     ),
-    (
+    NodeDefinition(
         "Requirement",
         "requirements.csv",
+        "requirement_id",
         """
         UNWIND $batch AS row
         MERGE (r:Requirement {requirement_id: row['requirement_id']})
@@ -95,18 +175,20 @@ _NODE_DEFINITIONS: list[tuple[str, str, str]] = [
             r.type = row['Type']
         """,
     ),
-    (
+    NodeDefinition(
         "TestSet",
         "test_sets.csv",
+        "test_set_id",
         """
         UNWIND $batch AS row
         MERGE (ts:TestSet {test_set_id: row['test_set_id']})
         SET ts.name = row['Test Set']
         """,
     ),
-    (
+    NodeDefinition(
         "TestCase",
         "test_cases.csv",
+        "Test Case ID",
         """
         UNWIND $batch AS row
         MERGE (tc:TestCase {test_case_id: row['Test Case ID']})
@@ -120,9 +202,10 @@ _NODE_DEFINITIONS: list[tuple[str, str, str]] = [
             tc.i_stage = row['I-Stage']
         """,
     ),
-    (
+    NodeDefinition(
         "Defect",
         "defects.csv",
+        "defect_id",
         """
         UNWIND $batch AS row
         MERGE (d:Defect {defect_id: row['defect_id']})
@@ -137,9 +220,10 @@ _NODE_DEFINITIONS: list[tuple[str, str, str]] = [
             d.comments = row['Comments']
         """,
     ),
-    (
+    NodeDefinition(
         "Change",
         "changes.csv",
+        "change_proposal_id",
         """
         UNWIND $batch AS row
         MERGE (ch:Change {change_proposal_id: row['change_proposal_id']})
@@ -152,9 +236,10 @@ _NODE_DEFINITIONS: list[tuple[str, str, str]] = [
             ch.risk = row['Risk']
         """,
     ),
-    (
+    NodeDefinition(
         "Milestone",
         "milestones.csv",
+        "milestone_id",
         """
         UNWIND $batch AS row
         MERGE (m:Milestone {milestone_id: row['milestone_id']})
@@ -167,34 +252,72 @@ _NODE_DEFINITIONS: list[tuple[str, str, str]] = [
 # Derived node loading (MaturityLevel from milestone data, Resource from TestCase)
 # ---------------------------------------------------------------------------
 
-# MaturityLevel is derived from the ternary requirements_test_sets_milestone.csv
-# Each unique milestone_id becomes a MaturityLevel node
-_DERIVED_MATURITY_LEVEL_QUERY = """
-UNWIND $batch AS row
-MERGE (ml:MaturityLevel {name: row['milestone_id']})
-"""
-
-_COUNT_MATURITY_LEVELS = """
-MATCH (ml:MaturityLevel)
-RETURN count(ml) AS created
-"""
-
-_DERIVED_RESOURCE = """
-MATCH (tc:TestCase)
-WHERE tc.resources IS NOT NULL AND tc.resources <> ''
-WITH DISTINCT tc.resources AS res
-MERGE (r:Resource {name: res})
-RETURN count(r) AS created
-"""
+# Derived nodes and relationships are computed from the parsed CSV rows and
+# sent as UNWIND batches like any other file, instead of scanning labels on
+# the server after the load.
+
+_MILESTONE_FILE = "requirements_test_sets_milestone.csv"
+
+
+def _maturity_level_rows(data: Dataset) -> Iterator[dict]:
+    """One row per distinct milestone_id in the ternary milestone file."""
+    for row in _unique_by(data.rows(_MILESTONE_FILE), "milestone_id"):
+        yield {"milestone_id": row["milestone_id"]}
+
+
+def _test_case_resources(data: Dataset) -> Iterator[dict]:
+    """(test case, resources) for every TestCase with a non-empty Resources value.
+
+    Uses the last row per test case id, the row whose values MERGE + SET keeps.
+    """
+    for row in data.last_rows("test_cases.csv", "Test Case ID"):
+        if row["Resources"]:
+            yield {"test_case_id": row["Test Case ID"], "name": row["Resources"]}
+
+
+def _resource_rows(data: Dataset) -> Iterator[dict]:
+    """One row per distinct TestCase resources string."""
+    for row in _unique_by(_test_case_resources(data), "name"):
+        yield {"name": row["name"]}
+
+
+_DERIVED_NODE_DEFINITIONS: list[NodeDefinition] = [
+    # Each unique milestone_id in requirements_test_sets_milestone.csv
+    # becomes a MaturityLevel node
+    NodeDefinition(
+        "MaturityLevel",
+        _MILESTONE_FILE,
+        "milestone_id",
+        """
+        UNWIND $batch AS row
+        MERGE (ml:MaturityLevel {name: row['milestone_id']})
+        """,
+        _maturity_level_rows,
+    ),
+    # Each distinct TestCase resources string becomes a Resource node
+    NodeDefinition(
+        "Resource",
+        "test_cases.csv",
+        "name",
+        """
+        UNWIND $batch AS row
+        MERGE (r:Resource {name: row['name']})
+        """,
+        _resource_rows,
+    ),
+]
 
 # ---------------------------------------------------------------------------
 # Relationship loading
 # ---------------------------------------------------------------------------
 
-_REL_DEFINITIONS: list[tuple[str, str, str]] = [
-    (
+_REL_DEFINITIONS: list[RelDefinition] = [
+    RelDefinition(
         "PRODUCT_HAS_DOMAIN",
         "product_technology_domains.csv",
+        "Product",
+        "TechnologyDomain",
+        ("product_id", "technology_domain_id"),
         """
         UNWIND $batch AS row
         MATCH (p:Product {product_id: row['product_id']})
@@ -202,9 +325,12 @@ _REL_DEFINITIONS: list[tuple[str, str, str]] = [
         MERGE (p)-[:PRODUCT_HAS_DOMAIN]->(td)
         """,
     ),
-    (
+    RelDefinition(
         "DOMAIN_HAS_COMPONENT",
         "technology_domains_components.csv",
+        "TechnologyDomain",
+        "Component",
+        ("technology_domain_id", "component_id"),
         """
         UNWIND $batch AS row
         MATCH (td:TechnologyDomain {technology_domain_id: row['technology_domain_id']})
@@ -212,9 +338,12 @@ _REL_DEFINITIONS: list[tuple[str, str, str]] = [
         MERGE (td)-[:DOMAIN_HAS_COMPONENT]->(c)
         """,
     ),
-    (
+    RelDefinition(
         "COMPONENT_HAS_REQ",
         "components_requirements.csv",
+        "Component",
+        "Requirement",
+        ("component_id", "requirement_id"),
         """
         UNWIND $batch AS row
         MATCH (c:Component {component_id: row['component_id']})
@@ -222,9 +351,12 @@ _REL_DEFINITIONS: list[tuple[str, str, str]] = [
         MERGE (c)-[:COMPONENT_HAS_REQ]->(r)
         """,
     ),
-    (
+    RelDefinition(
         "TESTED_WITH",
         "requirements_test_sets.csv",
+        "Requirement",
+        "TestSet",
+        ("requirement_id", "test_set_id"),
         """
         UNWIND $batch AS row
         MATCH (r:Requirement {requirement_id: row['requirement_id']})
@@ -232,9 +364,12 @@ _REL_DEFINITIONS: list[tuple[str, str, str]] = [
         MERGE (r)-[:TESTED_WITH]->(ts)
         """,
     ),
-    (
+    RelDefinition(
         "CONTAINS_TEST_CASE",
         "test_sets_test_cases.csv",
+        "TestSet",
+        "TestCase",
+        ("test_set_id", "test_case_id"),
         """
         UNWIND $batch AS row
         MATCH (ts:TestSet {test_set_id: row['test_set_id']})
@@ -242,9 +377,12 @@ _REL_DEFINITIONS: list[tuple[str, str, str]] = [
         MERGE (ts)-[:CONTAINS_TEST_CASE]->(tc)
         """,
     ),
-    (
+    RelDefinition(
         "DETECTED",
         "test_case_defect.csv",
+        "Defect",
+        "TestCase",
+        ("defect_id", "test_case_id"),
         """
         UNWIND $batch AS row
         MATCH (d:Defect {defect_id: row['defect_id']})
@@ -252,9 +390,12 @@ _REL_DEFINITIONS: list[tuple[str, str, str]] = [
         MERGE (d)-[:DETECTED]->(tc)
         """,
     ),
-    (
+    RelDefinition(
         "CHANGE_AFFECTS_REQ",
         "changes_requirements.csv",
+        "Change",
+        "Requirement",
+        ("change_proposal_id", "requirement_id"),
         """
         UNWIND $batch AS row
         MATCH (ch:Change {change_proposal_id: row['change_proposal_id']})
@@ -266,109 +407,417 @@ _REL_DEFINITIONS: list[tuple[str, str, str]] = [
 
 # Derived relationships
 
-# (Milestone)-[:REQUIRES_ML]->(MaturityLevel)
-# Each Milestone links to the MaturityLevel with the same name (derived from milestone_id)
-_MILESTONE_MATURITY = """
-MATCH (m:Milestone)
-MATCH (ml:MaturityLevel {name: m.milestone_id})
-MERGE (m)-[:REQUIRES_ML]->(ml)
-"""
-
-# (MaturityLevel)-[:REQUIRES_FLAWLESS_TEST_SET]->(TestSet)
-# Derived from requirements_test_sets_milestone.csv: MaturityLevel (milestone_id) -> TestSet
-_MATURITY_TESTSET_QUERY = """
-UNWIND $batch AS row
-MATCH (ml:MaturityLevel {name: row['milestone_id']})
-MATCH (ts:TestSet {test_set_id: row['test_set_id']})
-MERGE (ml)-[:REQUIRES_FLAWLESS_TEST_SET]->(ts)
-"""
-
-# (MaturityLevel)-[:ML_FOR_REQ]->(Requirement)
-# Derived from requirements_test_sets_milestone.csv: MaturityLevel (milestone_id) -> Requirement
-_MATURITY_REQUIREMENT_QUERY = """
-UNWIND $batch AS row
-MATCH (ml:MaturityLevel {name: row['milestone_id']})
-MATCH (r:Requirement {requirement_id: row['requirement_id']})
-MERGE (ml)-[:ML_FOR_REQ]->(r)
-"""
-
-_TESTCASE_RESOURCE = """
-MATCH (tc:TestCase)
-WHERE tc.resources IS NOT NULL AND tc.resources <> ''
-MATCH (r:Resource {name: tc.resources})
-MERGE (tc)-[:REQUIRES]->(r)
-"""
-
-# Milestone NEXT chain — sort by milestone_id (m_100, m_200, ...) which is
-# already in chronological order. The deadline strings (M/D/YY) don't sort
-# correctly as strings.
-_MILESTONE_NEXT = """
-MATCH (m:Milestone)
-WHERE m.milestone_id IS NOT NULL
-WITH m ORDER BY m.milestone_id
-WITH collect(m) AS milestones
-UNWIND range(0, size(milestones)-2) AS i
-WITH milestones[i] AS current, milestones[i+1] AS next
-MERGE (current)-[:NEXT]->(next)
-"""
+
+def _milestone_rows(data: Dataset) -> Iterator[dict]:
+    for row in data.rows("milestones.csv"):
+        if row["milestone_id"]:
+            yield {"milestone_id": row["milestone_id"]}
+
+
+def _milestone_next_rows(data: Dataset) -> Iterator[dict]:
+    """Consecutive (milestone, next milestone) pairs.
+
+    Sorted by milestone_id (m_100, m_200, ...) which is already in
+    chronological order. The deadline strings (M/D/YY) don't sort
+    correctly as strings.
+    """
+    ids = sorted({row["milestone_id"] for row in _milestone_rows(data)})
+    for current, nxt in zip(ids, ids[1:]):
+        yield {"milestone_id": current, "next_id": nxt}
+
+
+_DERIVED_REL_DEFINITIONS: list[RelDefinition] = [
+    # (Milestone)-[:REQUIRES_ML]->(MaturityLevel)
+    # Each Milestone links to the MaturityLevel with the same name (derived from milestone_id)
+    RelDefinition(
+        "REQUIRES_ML",
+        "milestones.csv",
+        "Milestone",
+        "MaturityLevel",
+        ("milestone_id", "milestone_id"),
+        """
+        UNWIND $batch AS row
+        MATCH (m:Milestone {milestone_id: row['milestone_id']})
+        MATCH (ml:MaturityLevel {name: row['milestone_id']})
+        MERGE (m)-[:REQUIRES_ML]->(ml)
+        """,
+        _milestone_rows,
+    ),
+    # (MaturityLevel)-[:REQUIRES_FLAWLESS_TEST_SET]->(TestSet)
+    # Derived from requirements_test_sets_milestone.csv: MaturityLevel (milestone_id) -> TestSet
+    RelDefinition(
+        "REQUIRES_FLAWLESS_TEST_SET",
+        _MILESTONE_FILE,
+        "MaturityLevel",
+        "TestSet",
+        ("milestone_id", "test_set_id"),
+        """
+        UNWIND $batch AS row
+        MATCH (ml:MaturityLevel {name: row['milestone_id']})
+        MATCH (ts:TestSet {test_set_id: row['test_set_id']})
+        MERGE (ml)-[:REQUIRES_FLAWLESS_TEST_SET]->(ts)
+        """,
+    ),
+    # (MaturityLevel)-[:ML_FOR_REQ]->(Requirement)
+    # Derived from requirements_test_sets_milestone.csv: MaturityLevel (milestone_id) -> Requirement
+    RelDefinition(
+        "ML_FOR_REQ",
+        _MILESTONE_FILE,
+        "MaturityLevel",
+        "Requirement",
+        ("milestone_id", "requirement_id"),
+        """
+        UNWIND $batch AS row
+        MATCH (ml:MaturityLevel {name: row['milestone_id']})
+        MATCH (r:Requirement {requirement_id: row['requirement_id']})
+        MERGE (ml)-[:ML_FOR_REQ]->(r)
+        """,
+    ),
+    # (TestCase)-[:REQUIRES]->(Resource)
+    RelDefinition(
+        "REQUIRES",
+        "test_cases.csv",
+        "TestCase",
+        "Resource",
+        ("test_case_id", "name"),
+        """
+        UNWIND $batch AS row
+        MATCH (tc:TestCase {test_case_id: row['test_case_id']})
+        MATCH (r:Resource {name: row['name']})
+        MERGE (tc)-[:REQUIRES]->(r)
+        """,
+        _test_case_resources,
+    ),
+    # (Milestone)-[:NEXT]->(Milestone) chain
+    RelDefinition(
+        "NEXT",
+        "milestones.csv",
+        "Milestone",
+        "Milestone",
+        ("milestone_id", "next_id"),
+        """
+        UNWIND $batch AS row
+        MATCH (m:Milestone {milestone_id: row['milestone_id']})
+        MATCH (next:Milestone {milestone_id: row['next_id']})
+        MERGE (m)-[:NEXT]->(next)
+        """,
+        _milestone_next_rows,
+    ),
+]
 
 # ---------------------------------------------------------------------------
-# Public API
+# Load steps
 # ---------------------------------------------------------------------------
 
 
-def load_nodes(driver: Driver, data_dir: Path) -> None:
-    """Load all node types from CSV files."""
-    for label, filename, query in _NODE_DEFINITIONS:
-        print(f"Loading {label} nodes...")
-        records = read_csv(data_dir, filename)
-        _run_in_batches(driver, records, query)
-        print(f"  [OK] Loaded {len(records)} {label} nodes.")
+# The MERGE clause _create_variant rewrites, on a line of its own: a node
+# keyed by one property map, or a relationship between two matched nodes.
+_MERGE_CLAUSE = re.compile(
+    r"^([ \t]*)MERGE (\(\w+:\w+ \{[^{}]*\}\)|\(\w+\)-\[:\w+\]->\(\w+\))[ \t]*$",
+    re.MULTILINE,
+)
+
+
+def _create_variant(query: str) -> str:
+    """Rewrite a MERGE-based load query to CREATE for an empty database.
+
+    The query must contain exactly one MERGE, of the shape _MERGE_CLAUSE
+    matches, and no ON CREATE / ON MATCH; anything else raises ValueError
+    rather than being rewritten into a query that means something else.
+    """
+    if (
+        len(re.findall(r"\bMERGE\b", query)) != 1
+        or len(_MERGE_CLAUSE.findall(query)) != 1
+        or re.search(r"\bON\s+(?:CREATE|MATCH)\b", query)
+    ):
+        raise ValueError(f"Load query is not a single plain MERGE:\n{query}")
+    return _MERGE_CLAUSE.sub(r"\1CREATE \2", query)
+
+
+# Graph key property per label, e.g. TestCase -> test_case_id.
+_KEY_PROPS = dict(CONSTRAINTS)
+
+
+@dataclass
+class LoadState:
+    """Shared state for a load: row hashes for incremental loads, checkpoints for others.
+
+    incremental=True records row hashes in the manifest and writes only
+    rows whose hash is new or changed; keys that disappeared from the CSVs
+    are reported, or deleted when prune=True. load_graph saves the
+    manifest once every step has finished.
+    Relationship rows are also rewritten when an endpoint node is new in
+    this run, since a pruned and re-added node lost its relationships.
+
+    A checkpoint records committed row offsets per step so an interrupted
+    load can be resumed. Offsets count input rows, so it is only used for
+    loads that write every row (not incremental ones).
+    """
+
+    manifest: LoadManifest | None = None
+    incremental: bool = False
+    prune: bool = False
+    checkpoint: LoadCheckpoint | None = None
+    removed: dict[str, int] = field(default_factory=dict)
+    new_keys: dict[str, set[str]] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, step: str, removed: int, new_keys: set[str]) -> None:
+        with self._lock:
+            if removed:
+                self.removed[step] = removed
+            self.new_keys[step] = new_keys
+
+    def has_new_endpoint(self, row: dict, endpoints: tuple[tuple[str, str], ...]) -> bool:
+        """True if any (label, column) endpoint of row is a node new in this run."""
+        return any(row[col] in self.new_keys.get(label, ()) for label, col in endpoints)
+
+
+def _node_key(d: NodeDefinition) -> Callable[[dict], str]:
+    return lambda row: row[d.key]
+
 
-    # Derived nodes
-    print("Creating MaturityLevel nodes (from requirements_test_sets_milestone.csv)...")
-    milestone_records = read_csv(data_dir, "requirements_test_sets_milestone.csv")
-    # Deduplicate by milestone_id before creating nodes
-    unique_milestones = {r['milestone_id']: r for r in milestone_records}.values()
-    _run_in_batches(driver, list(unique_milestones), _DERIVED_MATURITY_LEVEL_QUERY)
-    records, _, _ = driver.execute_query(_COUNT_MATURITY_LEVELS)
-    print(f"  [OK] Created {records[0]['created']} MaturityLevel nodes.")
+def _pair_key(keys: tuple[str, str]) -> Callable[[dict], str]:
+    return lambda row: f"{row[keys[0]]}{KEY_SEP}{row[keys[1]]}"
 
-    print("Creating Resource nodes (from TestCase.resources)...")
-    records, _, _ = driver.execute_query(_DERIVED_RESOURCE)
-    print(f"  [OK] Created {records[0]['created']} Resource nodes.")
 
+def _pair_hash(keys: tuple[str, str]) -> Callable[[dict], str]:
+    # Relationships carry no properties: only the endpoint ids matter.
+    return lambda row: row_hash({k: row[k] for k in keys})
 
-def load_relationships(driver: Driver, data_dir: Path) -> None:
-    """Load all relationship types from CSV files and derived relationships."""
-    for rel_type, filename, query in _REL_DEFINITIONS:
-        print(f"Loading {rel_type} relationships...")
-        records = read_csv(data_dir, filename)
-        _run_in_batches(driver, records, query)
-        print(f"  [OK] Loaded {len(records)} {rel_type} relationships.")
 
-    # Derived relationships from requirements_test_sets_milestone.csv
-    milestone_records = read_csv(data_dir, "requirements_test_sets_milestone.csv")
+def _node_delete_params(key: str) -> dict:
+    return {"key": key}
 
-    print("Creating Milestone → MaturityLevel relationships (REQUIRES_ML)...")
-    driver.execute_query(_MILESTONE_MATURITY)
-    print("  [OK] Created REQUIRES_ML relationships.")
 
-    print("Creating MaturityLevel → TestSet relationships (REQUIRES_FLAWLESS_TEST_SET)...")
-    _run_in_batches(driver, milestone_records, _MATURITY_TESTSET_QUERY)
-    print("  [OK] Created REQUIRES_FLAWLESS_TEST_SET relationships.")
+def _pair_delete_params(key: str) -> dict:
+    source, target = key.split(KEY_SEP)
+    return {"source": source, "target": target}
 
-    print("Creating MaturityLevel → Requirement relationships (ML_FOR_REQ)...")
-    _run_in_batches(driver, milestone_records, _MATURITY_REQUIREMENT_QUERY)
-    print("  [OK] Created ML_FOR_REQ relationships.")
 
-    print("Creating TestCase → Resource relationships...")
-    driver.execute_query(_TESTCASE_RESOURCE)
-    print("  [OK] Created REQUIRES relationships.")
+def _delete_nodes_query(label: str) -> str:
+    return (
+        f"UNWIND $batch AS row "
+        f"MATCH (n:{label} {{{_KEY_PROPS[label]}: row.key}}) DETACH DELETE n"
+    )
+
 
-    print("Creating Milestone NEXT chain...")
-    driver.execute_query(_MILESTONE_NEXT)
-    print("  [OK] Created NEXT chain between milestones.")
+def _delete_rels_query(d: RelDefinition) -> str:
+    return (
+        f"UNWIND $batch AS row "
+        f"MATCH (a:{d.source} {{{_KEY_PROPS[d.source]}: row.source}})"
+        f"-[r:{d.rel_type}]->(b:{d.target} {{{_KEY_PROPS[d.target]}: row.target}}) "
+        f"DELETE r"
+    )
+
+
+def _load_tracked(
+    driver: Driver,
+    step: str,
+    rows: Callable[[], Iterable[dict]],
+    query: str,
+    progress: bool,
+    key_fn: Callable[[dict], str],
+    delete_query: str,
+    delete_params: Callable[[str], dict],
+    state: LoadState | None,
+    endpoints: tuple[tuple[str, str], ...] = (),
+    hash_fn: Callable[[dict], str] = row_hash,
+    idempotent: bool = True,
+) -> int:
+    """Stream rows through a batched UNWIND query, tracking row hashes.
+
+    Without a state every row is written. In incremental mode the step's
+    row hashes are recorded in the manifest, unchanged rows are skipped and
+    keys missing from the CSV are reported or pruned; other loads hash
+    nothing. With a checkpoint, finished steps are skipped, the committed
+    prefix of an interrupted step is not written again, and progress is
+    saved per batch.
+    """
+    if state is None:
+        return _run_in_batches(driver, rows(), query, progress, idempotent=idempotent)
+
+    checkpoint = state.checkpoint
+    if checkpoint is not None and checkpoint.finished(step) is not None:
+        return 0
+    skip = checkpoint.offset(step) if checkpoint is not None else 0
+    on_commit = None if checkpoint is None else (lambda n: checkpoint.advance(step, skip + n))
+
+    if not state.incremental:
+        written = _run_in_batches(
+            driver, islice(rows(), skip, None), query, progress, on_commit, idempotent
+        )
+        if checkpoint is not None:
+            checkpoint.finish(step, skip + written)
+        return written
+
+    previous = state.manifest.previous(step)
+    current: dict[str, str] = {}
+    new_keys: set[str] = set()
+
+    def _changed() -> Iterator[dict]:
+        for row in rows():
+            key, digest = key_fn(row), hash_fn(row)
+            current[key] = digest
+            if key not in previous:
+                new_keys.add(key)
+            if previous.get(key) != digest or state.has_new_endpoint(row, endpoints):
+                yield row
+
+    written = _run_in_batches(driver, _changed(), query, progress, idempotent=idempotent)
+
+    removed = sorted(previous.keys() - current.keys())
+    if removed and state.prune:
+        batch = [delete_params(k) for k in removed]
+        _run_in_batches(driver, batch, delete_query, progress=False)
+    elif removed:
+        # Keep reporting missing keys until they are pruned.
+        current.update({k: previous[k] for k in removed})
+
+    state.manifest.commit(step, current)
+    state.record(step, len(removed), new_keys)
+    return written
+
+
+class LoadStep(NamedTuple):
+    """One node or relationship load: where its rows come from and how they are written."""
+
+    name: str
+    rows: Callable[[], Iterable[dict]]
+    query: str
+    requires: tuple[str, ...]
+    key_fn: Callable[[dict], str]
+    hash_fn: Callable[[dict], str]
+    delete_query: str
+    delete_params: Callable[[str], dict]
+    endpoints: tuple[tuple[str, str], ...] = ()
+    idempotent: bool = True
+
+
+def plan_load_steps(data: Dataset, fresh: bool = False) -> list[LoadStep]:
+    """Return every node and relationship load with its dependencies.
+
+    Node labels, derived ones included, depend on nothing; each relationship
+    type depends only on its two endpoint labels.
+
+    With fresh=True every query uses CREATE instead of MERGE and rows are
+    de-duplicated on the client instead: the last row per node key wins (as
+    MERGE + SET would) and each relationship key pair is written once. Only
+    valid against a database where none of the labels exist yet, and the
+    steps are marked non-idempotent so a write is never resubmitted after a
+    commit whose outcome is unknown.
+    """
+    q = _create_variant if fresh else (lambda query: query)
+
+    def _node_rows(d: NodeDefinition) -> Callable[[], Iterable[dict]]:
+        if d.rows is not None:
+            # Derived rows are already unique per key.
+            return partial(d.rows, data)
+        if fresh:
+            return partial(data.last_rows, d.filename, d.key)
+        return partial(data.rows, d.filename)
+
+    def _rel_rows(d: RelDefinition) -> Callable[[], Iterable[dict]]:
+        if d.rows is not None:
+            rows = partial(d.rows, data)
+        else:
+            rows = partial(data.rows, d.filename)
+        if fresh:
+            return lambda: _unique_pairs(rows(), d.keys)
+        return rows
+
+    steps = [
+        LoadStep(
+            d.label, _node_rows(d), q(d.query), (),
+            _node_key(d), row_hash, _delete_nodes_query(d.label), _node_delete_params,
+            idempotent=not fresh,
+        )
+        for d in _NODE_DEFINITIONS + _DERIVED_NODE_DEFINITIONS
+    ]
+    steps += [
+        LoadStep(
+            d.rel_type, _rel_rows(d), q(d.query), tuple(dict.fromkeys((d.source, d.target))),
+            _pair_key(d.keys), _pair_hash(d.keys), _delete_rels_query(d), _pair_delete_params,
+            ((d.source, d.keys[0]), (d.target, d.keys[1])), idempotent=not fresh,
+        )
+        for d in _REL_DEFINITIONS + _DERIVED_REL_DEFINITIONS
+    ]
+    return steps
+
+
+def build_load_steps(
+    driver: Driver,
+    data: Dataset,
+    progress: bool = True,
+    fresh: bool = False,
+    state: LoadState | None = None,
+) -> list[Task]:
+    """Return the steps of plan_load_steps as scheduler tasks writing through driver.
+
+    With a state, row hashes are recorded for incremental loads (see
+    LoadState).
+    """
+    return [
+        Task(
+            s.name,
+            partial(
+                _load_tracked, driver, s.name, s.rows, s.query, progress,
+                s.key_fn, s.delete_query, s.delete_params, state, s.endpoints, s.hash_fn,
+                s.idempotent,
+            ),
+            s.requires,
+        )
+        for s in plan_load_steps(data, fresh)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+
+def load_graph(
+    driver: Driver,
+    data: Dataset,
+    workers: int = 1,
+    fresh: bool = False,
+    state: LoadState | None = None,
+) -> None:
+    """Load all nodes and relationships, running independent steps in parallel.
+
+    With workers=1 steps run one at a time in definition order (nodes first)
+    with per-batch progress; with more workers, node loads run concurrently
+    and each relationship load starts as soon as its endpoint labels finish.
+    fresh=True selects the CREATE fast path (see build_load_steps); a state
+    enables incremental loading or checkpoints (see LoadState).
+    """
+    mode = "CREATE" if fresh else "MERGE"
+    if state is not None and state.incremental:
+        mode += ", incremental"
+    print(f"Loading nodes and relationships ({mode}, {workers} worker(s))...")
+    steps = build_load_steps(driver, data, progress=workers == 1, fresh=fresh, state=state)
+    start = time.monotonic()
+    results = run_dag(steps, workers)
+    if state is not None and state.manifest is not None:
+        state.manifest.save()
+    print()
+    print_timings(results, time.monotonic() - start)
+
+    if state is not None and state.removed:
+        action = "Deleted" if state.prune else "No longer in the CSVs (use --prune to delete)"
+        print(f"\n  {action}:")
+        for step, count in sorted(state.removed.items()):
+            print(f"    {step}: {count:,}")
+
+
+def find_existing_labels(driver: Driver) -> dict[str, int]:
+    """Return {label: count} for every loaded label that already has nodes."""
+    unions = " UNION ALL ".join(
+        f"MATCH (n:{label}) RETURN '{label}' AS label, count(n) AS count"
+        for label in _NODE_LABELS
+    )
+    records, _, _ = driver.execute_query(f"CALL () {{ {unions} }} RETURN label, count")
+    return {r["label"]: r["count"] for r in records if r["count"] > 0}
 
 
 def clear_database(driver: Driver) -> None:
@@ -395,8 +844,22 @@ _NODE_LABELS = [
 ]
 
 
-def verify(driver: Driver) -> None:
-    """Print node counts per label and total relationship count."""
+def expected_counts(data: Dataset) -> dict[str, int]:
+    """Return the number of distinct node keys per label in the CSVs."""
+    counts = {}
+    for d in _NODE_DEFINITIONS + _DERIVED_NODE_DEFINITIONS:
+        rows = d.rows(data) if d.rows is not None else data.rows(d.filename)
+        counts[d.label] = len({row[d.key] for row in rows})
+    return counts
+
+
+def verify(driver: Driver, data: Dataset | None = None) -> None:
+    """Print node counts per label and total relationship count.
+
+    With a dataset, each label's count is checked against the number of
+    distinct keys in the CSVs and mismatches are flagged.
+    """
+    expected = expected_counts(data) if data is not None else {}
     unions = " UNION ALL ".join(
         f"MATCH (n:{label}) RETURN '{label}' AS label, count(n) AS count"
         for label in _NODE_LABELS
@@ -409,10 +872,16 @@ def verify(driver: Driver) -> None:
     print("=" * 50)
     print("Node Counts:")
     total_nodes = 0
+    mismatches = 0
     for row in node_counts:
-        if row["count"] > 0:
-            print(f"  {row['label']}: {row['count']:,}")
-            total_nodes += row["count"]
+        label, count = row["label"], row["count"]
+        want = expected.get(label)
+        if want is not None and want != count:
+            mismatches += 1
+            print(f"  [WARN] {label}: {count:,} (expected {want:,} from CSV)")
+        elif count > 0:
+            print(f"  {label}: {count:,}")
+        total_nodes += count
     print(f"  ---------------------")
     print(f"  Total Nodes: {total_nodes:,}")
 
@@ -421,4 +890,9 @@ def verify(driver: Driver) -> None:
     )
     rel_count = rel_records[0]["count"]
     print(f"\nTotal Relationships: {rel_count:,}")
+    if expected:
+        if mismatches:
+            print(f"\n[WARN] {mismatches} label(s) differ from CSV")
+        else:
+            print("\n[OK] Matches CSV")
     print("=" * 50)
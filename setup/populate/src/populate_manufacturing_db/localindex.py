@@ -0,0 +1,214 @@
+"""In-process mirror of the Requirement and Defect vector indexes.
+
+The mirror holds the embeddings stored in Neo4j as normalized float32
+arrays in this process, so similarity lookups take microseconds instead of
+a database round trip. It is kept on disk under cache_dir/vector_mirror and
+synced by fingerprint: a sync reads only (id, fingerprint, model) for each
+embedded node and fetches vectors just for nodes that are new or changed.
+Nodes without a fingerprint (embeddings written before fingerprints were
+stored) cannot be compared, so their vectors are fetched on every sync.
+
+Search is NumPy brute force, or HNSW via hnswlib for large sets (`uv sync
+--extra hnsw`). Scores use Neo4j's cosine scale, (1 + cos) / 2. Needs NumPy
+(`uv sync --extra snapshot`).
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+from neo4j import Driver
+
+from .embedder import _CSV_SOURCES
+from .schema import VECTOR_INDEXES
+from .vectors import decode
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+try:
+    import hnswlib
+except ImportError:  # optional dependency
+    hnswlib = None
+
+MIRROR_DIRNAME = "vector_mirror"
+
+# With backend "auto", sets larger than this use HNSW when hnswlib is installed.
+HNSW_MIN_ROWS = 50_000
+
+# HNSW build and query parameters.
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 100
+
+# Ids per request when fetching changed vectors.
+_FETCH_CHUNK = 1000
+
+
+class LocalVectorIndex:
+    """Embeddings of one label, searchable in process.
+
+    ids[i] is the node id of row i of vectors (L2-normalized float32);
+    state maps each id to the (fingerprint, model) it was fetched with.
+    """
+
+    def __init__(self, name: str, label: str, id_prop: str, backend: str = "auto") -> None:
+        if np is None:
+            raise ImportError("The local vector index needs NumPy: uv sync --extra snapshot")
+        if backend == "hnsw" and hnswlib is None:
+            raise ImportError("The hnsw backend needs hnswlib: uv sync --extra hnsw")
+        self.name = name
+        self.label = label
+        self.id_prop = id_prop
+        self.backend = backend
+        self.ids: list[str] = []
+        self.state: dict[str, tuple[str | None, str | None]] = {}
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self._hnsw = None
+
+    # -- persistence --------------------------------------------------------
+
+    def load(self, directory: Path) -> None:
+        meta_path = directory / f"{self.name}.json"
+        if not meta_path.is_file():
+            return
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        self.ids = meta["ids"]
+        self.state = {i: (fp, model) for i, fp, model in meta["state"]}
+        self.vectors = np.load(directory / f"{self.name}.npy")
+        self._build()
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / f"{self.name}.npy", self.vectors)
+        state = [[i, *self.state[i]] for i in self.ids]
+        meta = {"ids": self.ids, "state": state}
+        (directory / f"{self.name}.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    # -- sync ---------------------------------------------------------------
+
+    def sync(self, driver: Driver) -> tuple[int, int]:
+        """Bring the mirror up to date; return (vectors fetched, vectors dropped).
+
+        A node whose embedding has no fingerprint always counts as changed.
+        """
+        records, _, _ = driver.execute_query(
+            f"MATCH (n:{self.label}) WHERE n.embedding IS NOT NULL "
+            f"RETURN n.{self.id_prop} AS id, "
+            f"n.embedding_fingerprint AS fingerprint, n.embedding_model AS model"
+        )
+        current = {r["id"]: (r["fingerprint"], r["model"]) for r in records}
+        changed = [
+            i for i, state in current.items() if state[0] is None or self.state.get(i) != state
+        ]
+        dropped = len(set(self.state) - set(current))
+        if not changed and not dropped:
+            return 0, 0
+
+        stale = set(changed)
+        keep = [row for row, i in enumerate(self.ids) if i in current and i not in stale]
+        ids = [self.ids[row] for row in keep]
+        parts = [self.vectors[keep]] if keep else []
+        for start in range(0, len(changed), _FETCH_CHUNK):
+            fetched, _, _ = driver.execute_query(
+                f"UNWIND $ids AS id MATCH (n:{self.label} {{{self.id_prop}: id}}) "
+                f"WHERE n.embedding IS NOT NULL "
+                f"RETURN n.{self.id_prop} AS id, n.embedding AS embedding",
+                ids=changed[start : start + _FETCH_CHUNK],
+            )
+            for r in fetched:
+                ids.append(r["id"])
+                parts.append(_normalize(np.asarray(decode(r["embedding"]), dtype=np.float32)))
+        widths = {p.shape[-1] for p in parts}
+        if len(widths) > 1:
+            raise ValueError(
+                f"{self.label} embeddings have mixed dimensions {sorted(widths)}; "
+                f"re-run 'load' to finish re-embedding."
+            )
+        self.vectors = (
+            np.vstack([p.reshape(-1, p.shape[-1]) for p in parts])
+            if parts
+            else np.zeros((0, 0), dtype=np.float32)
+        )
+        self.ids = ids
+        self.state = {i: current[i] for i in ids}
+        self._build()
+        return len(changed), dropped
+
+    # -- search -------------------------------------------------------------
+
+    @property
+    def kind(self) -> str:
+        return "hnsw" if self._hnsw is not None else "numpy"
+
+    def _use_hnsw(self) -> bool:
+        if self.backend == "auto":
+            return hnswlib is not None and len(self.ids) > HNSW_MIN_ROWS
+        return self.backend == "hnsw"
+
+    def _build(self) -> None:
+        self._hnsw = None
+        if not self._use_hnsw() or not self.ids:
+            return
+        index = hnswlib.Index(space="cosine", dim=self.vectors.shape[1])
+        index.init_index(
+            max_elements=len(self.ids), M=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION
+        )
+        index.add_items(self.vectors, np.arange(len(self.ids)))
+        index.set_ef(HNSW_EF_SEARCH)
+        self._hnsw = index
+
+    def search(self, vector: list[float], k: int) -> list[tuple[str, float]]:
+        """Return the k nearest (id, score) pairs, best first."""
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return []
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        if self._hnsw is not None:
+            rows, distances = self._hnsw.knn_query(query, k=k)
+            cosines = 1.0 - distances[0]
+            rows = rows[0]
+        else:
+            sims = self.vectors @ query
+            rows = np.argpartition(-sims, k - 1)[:k]
+            rows = rows[np.argsort(-sims[rows])]
+            cosines = sims[rows]
+        return [(self.ids[r], float((1.0 + c) / 2.0)) for r, c in zip(rows, cosines)]
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class VectorMirror:
+    """Local copies of every vector index in schema.VECTOR_INDEXES, by index name."""
+
+    def __init__(self, cache_dir: Path, backend: str = "auto") -> None:
+        self.directory = cache_dir / MIRROR_DIRNAME
+        self.indexes = {
+            name: LocalVectorIndex(name, label, _CSV_SOURCES[label][1], backend)
+            for name, label, _ in VECTOR_INDEXES
+        }
+        for index in self.indexes.values():
+            index.load(self.directory)
+
+    def sync(self, driver: Driver) -> None:
+        """Refresh every index from Neo4j by fingerprint and save the result."""
+        start = time.monotonic()
+        for index in self.indexes.values():
+            fetched, dropped = index.sync(driver)
+            if fetched or dropped:
+                index.save(self.directory)
+            print(
+                f"  [OK] Local index {index.name}: {len(index.ids):,} vectors ({index.kind}), "
+                f"{fetched:,} fetched, {dropped:,} dropped"
+            )
+        print(f"  Synced in {time.monotonic() - start:.1f}s\n")
+
+    def search(self, name: str, vector: list[float], k: int) -> list[tuple[str, float]]:
+        return self.indexes[name].search(vector, k)
@@ -6,14 +6,20 @@ import sys
 import time
 from collections.abc import Generator
 from contextlib import contextmanager
+from pathlib import Path
 
 import typer
 from neo4j import Driver, GraphDatabase
 from neo4j.exceptions import ServiceUnavailable
 
+from .checkpoint import LoadCheckpoint
 from .config import Settings
-from .loader import clear_database, load_nodes, load_relationships, verify
-from .schema import create_constraints, create_indexes, create_vector_indexes
+from .dataset import Dataset
+from .loader import LoadState, clear_database, find_existing_labels, load_graph, verify
+from .manifest import LoadManifest
+from .providers import EmbeddingProvider, get_provider
+from .schema import reconcile_schema
+from .tablecache import TableCache
 
 app = typer.Typer(
     name="populate-manufacturing-db",
@@ -22,6 +28,37 @@ app = typer.Typer(
 )
 
 
+def _dataset(settings: Settings, stream: bool = False) -> Dataset:
+    """Open the run's dataset, reusing tables parsed by earlier runs."""
+    cache = TableCache(settings.cache_dir / "tables")
+    return Dataset(settings.data_dir, stream=stream, cache=cache)
+
+
+def _provider(settings: Settings) -> EmbeddingProvider:
+    """Build the configured embedding provider, or exit if it cannot be set up."""
+    try:
+        return get_provider(settings)
+    except (ImportError, ValueError) as exc:
+        print(f"[FAIL] {exc}")
+        sys.exit(1)
+
+
+def _reconcile_schema(driver: Driver, settings: Settings, dims: int | None) -> None:
+    """Bring the schema up to date and wait for its indexes, or exit on timeout."""
+    try:
+        reconcile_schema(
+            driver,
+            dims,
+            quantization=settings.vector_quantization,
+            hnsw_m=settings.vector_hnsw_m,
+            hnsw_ef_construction=settings.vector_hnsw_ef_construction,
+            timeout=settings.schema_await_timeout,
+        )
+    except TimeoutError as exc:
+        print(f"[FAIL] {exc}")
+        sys.exit(1)
+
+
 def _fmt_elapsed(seconds: float) -> str:
     m, s = divmod(int(seconds), 60)
     if m:
@@ -52,32 +89,122 @@ def _connect(settings: Settings) -> Generator[Driver, None, None]:
 
 
 @app.command()
-def load() -> None:
-    """Load all CSV data, generate embeddings, and create indexes in a single pipeline."""
+def load(
+    workers: int = typer.Option(4, help="Parallel load workers (1 = sequential)."),
+    fresh: bool = typer.Option(
+        False, "--fresh", help="Use CREATE instead of MERGE; the database must be empty."
+    ),
+    stream: bool = typer.Option(
+        False, "--stream", help="Re-read CSVs per step in constant memory instead of caching them."
+    ),
+    incremental: bool = typer.Option(
+        False, "--incremental", help="Write only rows that changed since the last load."
+    ),
+    prune: bool = typer.Option(
+        False, "--prune", help="With --incremental, delete rows no longer in the CSVs."
+    ),
+    resume: bool = typer.Option(
+        False, "--resume", help="Continue an interrupted load from its last committed batch."
+    ),
+    use_async: bool = typer.Option(
+        False, "--async", help="Overlap CSV parsing, embedding and writes in an async pipeline."
+    ),
+    skip_embeddings: bool = typer.Option(
+        False, "--skip-embeddings", help="Skip the embedding phase (see import-embeddings)."
+    ),
+) -> None:
+    """Reconcile the schema, load all CSV data and generate embeddings in a single pipeline."""
     from .embedder import embed_descriptions
 
+    if fresh and incremental:
+        print("[FAIL] --fresh and --incremental cannot be combined.")
+        sys.exit(1)
+    if prune and not incremental:
+        print("[FAIL] --prune requires --incremental.")
+        sys.exit(1)
+    if use_async and (incremental or resume):
+        print("[FAIL] --async cannot be combined with --incremental or --resume.")
+        sys.exit(1)
+    if resume and incremental:
+        print("[FAIL] --resume and --incremental cannot be combined.")
+        print("       An incremental load only rewrites changed rows; just run it again.")
+        sys.exit(1)
+    if resume and fresh:
+        print("[FAIL] --resume and --fresh cannot be combined.")
+        print("       A batch may have committed after the last checkpoint; CREATE would")
+        print("       write it twice. Finish an interrupted --fresh load with plain 'load'.")
+        sys.exit(1)
+
     settings = Settings()  # type: ignore[call-arg]
+    provider = None if skip_embeddings else _provider(settings)
     start = time.monotonic()
+    data = _dataset(settings, stream=stream)
+    checkpoint = None
+    if not (incremental or fresh):
+        checkpoint = LoadCheckpoint(settings.cache_dir, {
+            "neo4j_uri": settings.neo4j_uri,
+            "mode": "merge",
+            "data": data.fingerprint(),
+        })
+    if resume:
+        if not checkpoint.resume():
+            print("[FAIL] No checkpoint matches this load.")
+            print("       The database or the CSV files differ from the interrupted run.")
+            sys.exit(1)
+        print("Resuming interrupted load.")
+        for step, offset in sorted(checkpoint.pending.items()):
+            print(f"  {step}: {offset:,} rows already committed")
+        print()
+    else:
+        LoadCheckpoint.discard(settings.cache_dir)
+    manifest = None
+    if incremental:
+        manifest = LoadManifest(settings.cache_dir, settings.neo4j_uri)
+    else:
+        # Only incremental loads keep row hashes; after any other load the
+        # manifest no longer describes the database.
+        LoadManifest.discard(settings.cache_dir)
+    state = LoadState(
+        manifest,
+        incremental=incremental,
+        prune=prune,
+        checkpoint=checkpoint,
+    )
 
     print(f"Connecting to {settings.neo4j_uri}...")
     with _connect(settings) as driver:
-        print("Creating constraints...")
-        create_constraints(driver)
-        print("\nCreating indexes...")
-        create_indexes(driver)
+        if fresh:
+            existing = find_existing_labels(driver)
+            if existing:
+                print("[FAIL] --fresh requires empty target labels, but found:")
+                for label, count in existing.items():
+                    print(f"       {label}: {count:,} nodes")
+                print("\nRun 'clean' first, or load without --fresh.")
+                sys.exit(1)
+
+        print("Reconciling schema...")
+        _reconcile_schema(driver, settings, provider.dims if provider else None)
         print()
 
-        load_nodes(driver, settings.data_dir)
-        print()
-        load_relationships(driver, settings.data_dir)
-        print()
+        if use_async:
+            from .pipeline import load_graph_async
 
-        embed_descriptions(driver, settings)
+            load_graph_async(
+                settings, data, workers=workers, fresh=fresh, provider=provider
+            )
+        else:
+            load_graph(driver, data, workers=workers, fresh=fresh, state=state)
+        if not stream:
+            print(f"  CSV tables: {data.cache.hits} from cache, {data.cache.misses} parsed")
+        print()
 
-        print("\nCreating vector indexes...")
-        create_vector_indexes(driver)
+        if provider is None:
+            print("Skipping embeddings and vector indexes (--skip-embeddings).")
+        elif not use_async:
+            embed_descriptions(driver, settings, data, checkpoint, provider)
+        LoadCheckpoint.discard(settings.cache_dir)
 
-        verify(driver)
+        verify(driver, data)
 
     elapsed = time.monotonic() - start
     print(f"\nDone in {_fmt_elapsed(elapsed)}.")
@@ -85,12 +212,12 @@ def load() -> None:
 
 @app.command("verify")
 def verify_cmd() -> None:
-    """Print node and relationship counts (read-only)."""
+    """Print node and relationship counts and check them against the CSVs (read-only)."""
     settings = Settings()  # type: ignore[call-arg]
 
     print(f"Connecting to {settings.neo4j_uri}...")
     with _connect(settings) as driver:
-        verify(driver)
+        verify(driver, _dataset(settings))
 
 
 @app.command("clean")
@@ -101,12 +228,16 @@ def clean_cmd() -> None:
     print(f"Connecting to {settings.neo4j_uri}...")
     with _connect(settings) as driver:
         clear_database(driver)
+    LoadManifest.discard(settings.cache_dir)
+    LoadCheckpoint.discard(settings.cache_dir)
 
     print("\nDone.")
 
 
 @app.command("samples")
-def samples_cmd() -> None:
+def samples_cmd(
+    workers: int = typer.Option(9, help="Sections run concurrently (1 = sequential)."),
+) -> None:
     """Run sample queries showcasing the knowledge graph (read-only)."""
     from .samples import run_all_samples
 
@@ -114,26 +245,156 @@ def samples_cmd() -> None:
 
     print(f"Connecting to {settings.neo4j_uri}...")
     with _connect(settings) as driver:
-        run_all_samples(driver, settings, sample_size=settings.sample_size)
+        try:
+            run_all_samples(driver, settings, sample_size=settings.sample_size, workers=workers)
+        except (ImportError, ValueError) as exc:
+            print(f"[FAIL] {exc}")
+            sys.exit(1)
 
 
 @app.command("test-queries")
 def test_queries_cmd(
     top_k: int = typer.Option(5, help="Number of results per query."),
+    recall: bool = typer.Option(
+        False, "--recall", help="Report vector index recall and latency against exact search."
+    ),
+    workers: int = typer.Option(8, help="Test queries run concurrently (1 = sequential)."),
 ) -> None:
-    """Run semantic similarity and hybrid search test queries (requires OpenAI API key)."""
-    from .test_queries import run_test_queries
+    """Run semantic similarity and hybrid search test queries (embeds the query texts once)."""
+    from .test_queries import run_recall_report, run_test_queries
 
     settings = Settings()  # type: ignore[call-arg]
     start = time.monotonic()
 
     print(f"Connecting to {settings.neo4j_uri}...")
     with _connect(settings) as driver:
-        run_test_queries(driver, settings, top_k=top_k)
+        try:
+            if recall:
+                run_recall_report(driver, settings, top_k=top_k)
+            else:
+                run_test_queries(driver, settings, top_k=top_k, workers=workers)
+        except (ImportError, ValueError) as exc:
+            print(f"[FAIL] {exc}")
+            sys.exit(1)
 
     elapsed = time.monotonic() - start
     print(f"Done in {_fmt_elapsed(elapsed)}.")
 
 
+@app.command("export-embeddings")
+def export_embeddings_cmd(
+    directory: Path = typer.Option(
+        Path("embeddings-snapshot"), "--dir", help="Snapshot directory to write."
+    ),
+) -> None:
+    """Export Requirement and Defect embeddings to a NumPy snapshot (read-only)."""
+    from .snapshot import export_embeddings
+
+    settings = Settings()  # type: ignore[call-arg]
+    start = time.monotonic()
+
+    print(f"Connecting to {settings.neo4j_uri}...")
+    with _connect(settings) as driver:
+        print(f"Exporting embeddings to {directory}/...")
+        try:
+            count = export_embeddings(driver, directory)
+        except (ImportError, ValueError) as exc:
+            print(f"[FAIL] {exc}")
+            sys.exit(1)
+
+    print(f"\nExported {count:,} embeddings in {_fmt_elapsed(time.monotonic() - start)}.")
+
+
+@app.command("import-embeddings")
+def import_embeddings_cmd(
+    directory: Path = typer.Option(
+        Path("embeddings-snapshot"), "--dir", help="Snapshot directory to read."
+    ),
+) -> None:
+    """Create vector indexes for a snapshot and write its embeddings onto loaded nodes."""
+    from .snapshot import import_embeddings, snapshot_dims
+
+    settings = Settings()  # type: ignore[call-arg]
+    start = time.monotonic()
+
+    print(f"Connecting to {settings.neo4j_uri}...")
+    with _connect(settings) as driver:
+        try:
+            dims = snapshot_dims(directory)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"[FAIL] Cannot read snapshot in {directory}/: {exc}")
+            sys.exit(1)
+        print("Reconciling schema...")
+        _reconcile_schema(driver, settings, dims)
+
+        print(f"\nImporting embeddings from {directory}/...")
+        try:
+            count = import_embeddings(driver, directory)
+        except (ImportError, ValueError, OSError) as exc:
+            print(f"[FAIL] {exc}")
+            sys.exit(1)
+
+    print(f"\nImported {count:,} embeddings in {_fmt_elapsed(time.monotonic() - start)}.")
+
+
+@app.command("advise-indexes")
+def advise_indexes_cmd(
+    apply: bool = typer.Option(
+        False, "--apply", help="Create the proposed indexes and compare db hits before/after."
+    ),
+) -> None:
+    """Profile the sample and agent queries and propose indexes for their label scans."""
+    from .advisor import advise_indexes
+
+    settings = Settings()  # type: ignore[call-arg]
+
+    print(f"Connecting to {settings.neo4j_uri}...")
+    with _connect(settings) as driver:
+        try:
+            advise_indexes(driver, apply=apply, timeout=settings.schema_await_timeout)
+        except (ValueError, TimeoutError) as exc:
+            print(f"[FAIL] {exc}")
+            sys.exit(1)
+
+
+@app.command("bench-memory")
+def bench_memory_cmd(
+    rows: int = typer.Option(200_000, help="Rows in the largest synthetic CSV."),
+) -> None:
+    """Compare peak memory of list-based vs streaming CSV ingestion (offline)."""
+    from .benchmarks import bench_csv_memory
+
+    bench_csv_memory(rows)
+
+
+@app.command("bench-load")
+def bench_load_cmd(
+    rows: int = typer.Option(50_000, help="Synthetic requirements (and links) to write."),
+) -> None:
+    """Compare MERGE and CREATE load throughput on scratch Bench* labels."""
+    from .benchmarks import bench_merge_vs_create
+
+    settings = Settings()  # type: ignore[call-arg]
+
+    print(f"Connecting to {settings.neo4j_uri}...")
+    with _connect(settings) as driver:
+        bench_merge_vs_create(driver, rows)
+
+
+@app.command("bench-vectors")
+def bench_vectors_cmd(
+    rows: int = typer.Option(5_000, help="Synthetic embeddings to write."),
+    dims: int = typer.Option(1536, help="Dimensions per embedding."),
+) -> None:
+    """Compare float64 and float32 embedding writes on a scratch BenchVector label."""
+    from .benchmarks import bench_vector_storage
+
+    settings = Settings()  # type: ignore[call-arg]
+
+    print(f"Connecting to {settings.neo4j_uri}...")
+    with _connect(settings) as driver:
+        bench_vector_storage(driver, rows, dims)
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,83 @@
+"""Local manifest of per-row content hashes, used for incremental loads.
+
+For every load step the manifest maps each row key (a node id, or a
+source/target id pair for relationships) to a hash of the CSV row that was
+last written. An incremental load streams the CSVs again, writes only rows
+whose hash is new or different, and reports keys that disappeared.
+
+Steps commit their hashes in memory; the load saves the manifest once,
+after every step finished. An interrupted load leaves the previous
+manifest in place, so the next incremental load rewrites what it changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+MANIFEST_FILENAME = "load_manifest.json"
+_VERSION = 1
+
+# Separates the source and target ids of a relationship key.
+KEY_SEP = "\x1f"
+
+
+def row_hash(row: dict[str, str]) -> str:
+    """Return a short, order-independent content hash of a CSV row."""
+    h = hashlib.blake2b(digest_size=12)
+    for key in sorted(row):
+        h.update(key.encode())
+        h.update(b"\x1f")
+        h.update(str(row[key]).encode())
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+class LoadManifest:
+    """Row hashes per load step, persisted as JSON in the cache directory.
+
+    The manifest belongs to one database: if it was written for a different
+    NEO4J_URI it is ignored, so the next incremental load writes every row.
+    Safe to update from several worker threads.
+    """
+
+    def __init__(self, cache_dir: Path, neo4j_uri: str) -> None:
+        self.path = cache_dir / MANIFEST_FILENAME
+        self.neo4j_uri = neo4j_uri
+        self._lock = threading.Lock()
+        self._steps: dict[str, dict[str, str]] = {}
+        if self.path.is_file():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == _VERSION and data.get("neo4j_uri") == neo4j_uri:
+                self._steps = data.get("steps", {})
+
+    def previous(self, step: str) -> dict[str, str]:
+        """Return {row key: hash} recorded for a step by the last load."""
+        with self._lock:
+            return dict(self._steps.get(step, {}))
+
+    def commit(self, step: str, hashes: dict[str, str]) -> None:
+        """Replace a step's hashes after its rows were written; see save()."""
+        with self._lock:
+            self._steps[step] = hashes
+
+    def save(self) -> None:
+        """Write the manifest, with the hashes of every step, to the cache directory."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(
+                json.dumps(
+                    {"version": _VERSION, "neo4j_uri": self.neo4j_uri, "steps": self._steps}
+                ),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.path)
+
+    @staticmethod
+    def discard(cache_dir: Path) -> None:
+        """Delete the manifest, e.g. after the database was cleared."""
+        (cache_dir / MANIFEST_FILENAME).unlink(missing_ok=True)
@@ -0,0 +1,284 @@
+"""Async load pipeline: CSV parsing, embedding calls and Neo4j writes overlap.
+
+Every load step gets a parser thread that feeds row chunks through a
+bounded queue to an async writer. Requirement and Defect descriptions are
+embedded straight from the parsed CSVs while the other labels are still
+being written; each label's embedding writer starts once its nodes exist.
+The bounded queues keep a fast stage from running ahead of a slow one, so
+the whole load takes about as long as its slowest stage.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
+
+from neo4j import AsyncDriver, AsyncGraphDatabase
+
+from .batching import AdaptiveBatcher
+from .config import Settings
+from .dataset import Dataset
+from .embedcache import EmbeddingCache
+from .embedder import (
+    _CSV_SOURCES,
+    EMBED_BATCH_SIZE,
+    DedupStats,
+    embed_texts_async,
+    fan_out,
+    make_limiter,
+    make_packer,
+    orphaned_embeddings_query,
+    stale_reason,
+)
+from .loader import BATCH_SIZE, LoadStep, iter_batches, plan_load_steps
+from .providers import EmbeddingProvider
+from .scheduler import TaskResult, print_timings
+from .vectors import apacked_supported, write_query
+
+# Chunks buffered between a stage and the next one.
+QUEUE_DEPTH = 4
+
+# Rows per chunk handed from a parser thread to a writer.
+CHUNK_ROWS = 500
+
+# Labels embedded during the load: (label, id property).
+_EMBEDDED = (("Requirement", "requirement_id"), ("Defect", "defect_id"))
+
+_DONE = None  # end-of-stream marker on every queue
+
+
+# ---------------------------------------------------------------------------
+# Queue helpers
+# ---------------------------------------------------------------------------
+
+
+async def _produce(
+    chunks: Callable[[], Iterable[list]],
+    queue: asyncio.Queue,
+    stop: threading.Event,
+) -> None:
+    """Iterate chunks in a worker thread and put them on queue.
+
+    The thread blocks while the queue is full, which is what bounds memory.
+    It gives up as soon as stop is set, so a failed pipeline never leaves a
+    thread waiting on a queue nobody drains.
+    """
+    loop = asyncio.get_running_loop()
+
+    def _put(item: list | None) -> bool:
+        fut = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                fut.result(timeout=0.2)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    fut.cancel()
+                    return False
+
+    def _fill() -> None:
+        for chunk in chunks():
+            if not _put(chunk):
+                return
+        _put(_DONE)
+
+    await asyncio.to_thread(_fill)
+
+
+async def _drain(queue: asyncio.Queue, producers: int = 1) -> AsyncIterator:
+    """Yield items from queued chunks until every producer has finished."""
+    remaining = producers
+    while remaining:
+        chunk = await queue.get()
+        if chunk is _DONE:
+            remaining -= 1
+            continue
+        for item in chunk:
+            yield item
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+
+class _Pipeline:
+    def __init__(
+        self,
+        driver: AsyncDriver,
+        settings: Settings,
+        data: Dataset,
+        workers: int,
+        provider: EmbeddingProvider,
+    ) -> None:
+        self.driver = driver
+        self.settings = settings
+        self.data = data
+        self.write_slots = asyncio.Semaphore(max(workers, 1))
+        self.loaded: dict[str, asyncio.Event] = {}
+        self.results: list[TaskResult] = []
+        self.cache = EmbeddingCache(settings.cache_dir)
+        # One provider and one rate budget shared by every label's embedding workers.
+        self.provider = provider
+        self.limiter = make_limiter(provider, settings)
+        self.embed_concurrency = max(settings.embed_concurrency, 1) if provider.remote else 1
+        self.dedup = DedupStats()
+        self.packer = make_packer(provider, settings)
+        self.packed = False  # set by run() once the server has been probed
+        self.stop = threading.Event()
+        self.t0 = time.monotonic()
+
+    def _finish(self, name: str, rows: int, started: float) -> None:
+        elapsed = time.monotonic() - started
+        print(f"  [OK] {name}: {rows:,} rows in {elapsed:.1f}s")
+        self.results.append(TaskResult(name, rows, started - self.t0, elapsed))
+
+    async def load_step(self, step: LoadStep) -> None:
+        """Parse and write one step once its endpoint labels are loaded."""
+        for dep in step.requires:
+            await self.loaded[dep].wait()
+        async with self.write_slots:
+            print(f"Loading {step.name}...")
+            started = time.monotonic()
+            queue: asyncio.Queue = asyncio.Queue(QUEUE_DEPTH)
+            batcher = AdaptiveBatcher(BATCH_SIZE, idempotent=step.idempotent)
+            # A failing parser cancels the writer instead of leaving it waiting for _DONE.
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(
+                    _produce(lambda: iter_batches(step.rows(), CHUNK_ROWS), queue, self.stop)
+                )
+                writer = tg.create_task(batcher.arun(self.driver, step.query, _drain(queue)))
+        self.loaded[step.name].set()
+        self._finish(step.name, writer.result(), started)
+
+    async def embed_label(self, label: str, id_prop: str) -> None:
+        """Embed a label's descriptions from the CSV and write them once its nodes exist."""
+        filename, key_col, text_col = _CSV_SOURCES[label]
+        model_id = self.provider.model_id
+        records, _, _ = await self.driver.execute_query(
+            f"MATCH (n:{label}) WHERE n.embedding IS NOT NULL "
+            f"RETURN n.{id_prop} AS id, true AS embedded, "
+            f"n.embedding_fingerprint AS fingerprint, n.embedding_model AS model"
+        )
+        embedded = {r["id"]: r for r in records}
+        started = time.monotonic()
+
+        def _pending() -> Iterable[tuple[str, str]]:
+            # The last row per id is the one whose description MERGE + SET keeps.
+            for row in self.data.last_rows(filename, key_col):
+                key, text = row[key_col], row[text_col]
+                node = embedded.get(key)
+                if text and (node is None or stale_reason(node, text, model_id)):
+                    yield key, text
+
+        # Each distinct (normalized) text is embedded once and fanned out to its nodes.
+        groups: dict[str, list[str]] = {}
+
+        def _requests() -> Iterable[list[tuple[str, str]]]:
+            groups.update(self.dedup.group(list(_pending()), self.packer))
+            return self.packer.pack((text, text) for text in groups)
+
+        texts: asyncio.Queue = asyncio.Queue(QUEUE_DEPTH)
+        updates: asyncio.Queue = asyncio.Queue(QUEUE_DEPTH)
+
+        async def _embed_worker() -> None:
+            while (chunk := await texts.get()) is not _DONE:
+                vectors = await embed_texts_async(
+                    self.provider, [text for _, text in chunk], self.cache, self.limiter
+                )
+                await updates.put(list(fan_out(groups, chunk, vectors, model_id, self.packed)))
+            await texts.put(_DONE)  # let the other workers see the end too
+            await updates.put(_DONE)
+
+        async def _write() -> int:
+            await self.loaded[label].wait()
+            await self.driver.execute_query(orphaned_embeddings_query(label, "description"))
+            return await AdaptiveBatcher(EMBED_BATCH_SIZE).arun(
+                self.driver,
+                write_query(label, id_prop, self.packed),
+                _drain(updates, self.embed_concurrency),
+            )
+
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(_produce(_requests, texts, self.stop))
+            for _ in range(self.embed_concurrency):
+                tg.create_task(_embed_worker())
+            writer = tg.create_task(_write())
+        self._finish(f"embed:{label}", writer.result(), started)
+
+    async def run(self, steps: list[LoadStep], embed: bool) -> None:
+        self.loaded = {s.name: asyncio.Event() for s in steps}
+        if embed:
+            self.packed = await apacked_supported(self.driver)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for step in steps:
+                    tg.create_task(self.load_step(step))
+                if embed:
+                    for label, id_prop in _EMBEDDED:
+                        tg.create_task(self.embed_label(label, id_prop))
+        finally:
+            self.stop.set()
+
+
+async def _run(
+    settings: Settings,
+    data: Dataset,
+    workers: int,
+    fresh: bool,
+    provider: EmbeddingProvider | None,
+) -> list[TaskResult]:
+    driver = AsyncGraphDatabase.driver(
+        settings.neo4j_uri,
+        auth=(settings.neo4j_username, settings.neo4j_password.get_secret_value()),
+    )
+    try:
+        embed = provider is not None
+        pipeline = _Pipeline(driver, settings, data, workers, provider)
+        try:
+            await pipeline.run(plan_load_steps(data, fresh), embed)
+        finally:
+            pipeline.cache.close()
+        if embed:
+            print(f"  Deduplicated: {pipeline.dedup.summary()}")
+            print(f"  Embedding cache: {pipeline.cache.summary()}")
+            packer = pipeline.packer
+            print(f"  Requests: {packer.requests:,} packed, {packer.truncated:,} text(s) truncated")
+            if pipeline.limiter is not None and pipeline.limiter.throttled:
+                print(f"  [WARN] Rate limited {pipeline.limiter.throttled} time(s).")
+        return pipeline.results
+    finally:
+        await driver.close()
+
+
+def load_graph_async(
+    settings: Settings,
+    data: Dataset,
+    workers: int = 4,
+    fresh: bool = False,
+    provider: EmbeddingProvider | None = None,
+) -> None:
+    """Load nodes, relationships and description embeddings in one async pipeline.
+
+    workers bounds how many load steps write at the same time; embedding
+    writes run alongside them. Without a provider, descriptions are not embedded.
+    """
+    mode = "CREATE" if fresh else "MERGE"
+    print(f"Loading nodes, relationships and embeddings ({mode}, async, {workers} writer(s))...")
+    if provider is not None:
+        print(f"Using provider: {provider.describe()}")
+    start = time.monotonic()
+    try:
+        results = asyncio.run(_run(settings, data, workers, fresh, provider))
+    except ExceptionGroup as group:
+        # Surface the first real error rather than the TaskGroup wrapper.
+        first = group.exceptions[0]
+        while isinstance(first, ExceptionGroup):
+            first = first.exceptions[0]
+        print(f"  [FAIL] {first}")
+        raise first from None
+    print()
+    print_timings(results, time.monotonic() - start)
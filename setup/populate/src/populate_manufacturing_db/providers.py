@@ -0,0 +1,318 @@
+"""Embedding providers: OpenAI, Amazon Bedrock Titan, a local CPU model, and hashing.
+
+Every provider turns a list of texts into vectors of a fixed dimension and
+reports transient failures as EmbeddingRateLimited / EmbeddingUnavailable,
+so caching, packing, rate limiting and retries work the same for all of
+them. Bedrock and the local model need optional extras (`uv sync --extra
+bedrock` or `--extra local`); the hashing provider needs nothing and runs
+offline, which makes it the choice for CI.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import re
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .config import Settings
+
+
+class EmbeddingRateLimited(Exception):
+    """The provider asked us to slow down; retry_after is in seconds if it said."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class EmbeddingUnavailable(Exception):
+    """A transient failure (timeout, connection, 5xx) worth retrying."""
+
+
+class EmbeddingProvider:
+    """Base class: name, model, dims and embed(); override aembed() for native async.
+
+    remote providers are called through the shared rate limiter with
+    several requests in flight; local ones run one batch at a time.
+    max_batch_items caps the texts per call where the API takes only one.
+    """
+
+    name = "base"
+    remote = True
+    max_batch_items: int | None = None
+
+    def __init__(self, model: str, dims: int) -> None:
+        self.model = model
+        self.dims = dims
+
+    @property
+    def model_id(self) -> str:
+        """Identifies the vector space; stored on each node next to its embedding."""
+        return f"{self.name}:{self.model}:{self.dims}"
+
+    def describe(self) -> str:
+        return f"{self.name} {self.model} ({self.dims} dims)"
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        raise NotImplementedError
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.to_thread(self.embed, texts)
+
+
+# ---------------------------------------------------------------------------
+# OpenAI
+# ---------------------------------------------------------------------------
+
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+OPENAI_EMBEDDING_DIMS = 1536
+
+# Native output size of the OpenAI embedding models. The text-embedding-3
+# models can also return fewer dimensions (the `dimensions` parameter).
+_OPENAI_NATIVE_DIMS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+
+class OpenAIProvider(EmbeddingProvider):
+    """OpenAI embeddings API; the client's own retries are disabled in favour of ours.
+
+    dims defaults to the model's native size. Smaller values are sent as the
+    `dimensions` parameter, which only the text-embedding-3 models accept.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self, api_key: str, model: str = OPENAI_EMBEDDING_MODEL, dims: int | None = None
+    ) -> None:
+        from openai import AsyncOpenAI, OpenAI
+
+        native = _OPENAI_NATIVE_DIMS.get(model, OPENAI_EMBEDDING_DIMS)
+        dims = dims or native
+        if dims != native and not model.startswith("text-embedding-3"):
+            raise ValueError(f"{model} does not support EMBEDDING_DIMS (always {native} dims)")
+        super().__init__(model, dims)
+        self._options = {"dimensions": dims} if dims != native else {}
+        self.client = OpenAI(api_key=api_key, max_retries=0)
+        self.async_client = AsyncOpenAI(api_key=api_key, max_retries=0)
+
+    @staticmethod
+    def _translate(exc: Exception) -> Exception:
+        from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+        if isinstance(exc, RateLimitError):
+            return EmbeddingRateLimited(str(exc), _retry_after(exc))
+        if isinstance(exc, (APIConnectionError, APITimeoutError, InternalServerError)):
+            return EmbeddingUnavailable(str(exc))
+        return exc
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        try:
+            response = self.client.embeddings.create(
+                model=self.model, input=texts, **self._options
+            )
+        except Exception as exc:
+            raise self._translate(exc) from exc
+        return [item.embedding for item in response.data]
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        try:
+            response = await self.async_client.embeddings.create(
+                model=self.model, input=texts, **self._options
+            )
+        except Exception as exc:
+            raise self._translate(exc) from exc
+        return [item.embedding for item in response.data]
+
+
+def _retry_after(exc: Exception) -> float | None:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[header]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Amazon Bedrock Titan
+# ---------------------------------------------------------------------------
+
+BEDROCK_EMBEDDING_MODEL = "amazon.titan-embed-text-v2:0"
+BEDROCK_EMBEDDING_DIMS = 1024
+
+# Output sizes Titan v2 accepts (the `dimensions` field); v1 always returns 1536.
+_TITAN_V2_DIMS = (256, 512, 1024)
+_TITAN_V1_DIMS = 1536
+
+_BEDROCK_THROTTLED = {"ThrottlingException", "TooManyRequestsException"}
+_BEDROCK_TRANSIENT = {
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+}
+
+
+class BedrockTitanProvider(EmbeddingProvider):
+    """Titan text embeddings on Amazon Bedrock (one text per InvokeModel call).
+
+    Titan v2 accepts 256, 512 or 1024 dimensions (default 1024); v1 always
+    returns 1536. Other dims raise ValueError. Credentials come from the
+    usual AWS environment / profile chain.
+    """
+
+    name = "bedrock"
+    max_batch_items = 1
+
+    def __init__(
+        self, region: str, model: str = BEDROCK_EMBEDDING_MODEL, dims: int | None = None
+    ) -> None:
+        if model.startswith("amazon.titan-embed-text-v1"):
+            if dims and dims != _TITAN_V1_DIMS:
+                raise ValueError(
+                    f"{model} does not support EMBEDDING_DIMS (always {_TITAN_V1_DIMS} dims)"
+                )
+            dims = _TITAN_V1_DIMS
+        else:
+            dims = dims or BEDROCK_EMBEDDING_DIMS
+            if dims not in _TITAN_V2_DIMS:
+                raise ValueError(
+                    f"{model} supports EMBEDDING_DIMS of "
+                    f"{', '.join(map(str, _TITAN_V2_DIMS))} only, not {dims}"
+                )
+        try:
+            import boto3
+        except ImportError as exc:
+            raise ImportError("The bedrock provider needs boto3: uv sync --extra bedrock") from exc
+        super().__init__(model, dims)
+        self.client = boto3.client("bedrock-runtime", region_name=region)
+
+    def _invoke(self, text: str) -> list[float]:
+        from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+
+        body: dict[str, Any] = {"inputText": text}
+        if not self.model.startswith("amazon.titan-embed-text-v1"):
+            body.update(dimensions=self.dims, normalize=True)
+        try:
+            response = self.client.invoke_model(modelId=self.model, body=json.dumps(body))
+        except ClientError as exc:
+            code = exc.response.get("Error", {}).get("Code", "")
+            if code in _BEDROCK_THROTTLED:
+                raise EmbeddingRateLimited(str(exc)) from exc
+            if code in _BEDROCK_TRANSIENT:
+                raise EmbeddingUnavailable(str(exc)) from exc
+            raise
+        except (EndpointConnectionError, ReadTimeoutError) as exc:
+            raise EmbeddingUnavailable(str(exc)) from exc
+        return json.loads(response["body"].read())["embedding"]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self._invoke(t) for t in texts]
+
+
+# ---------------------------------------------------------------------------
+# Local CPU model (sentence-transformers)
+# ---------------------------------------------------------------------------
+
+LOCAL_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class LocalProvider(EmbeddingProvider):
+    """A sentence-transformers model run in-process on the CPU; no network after download.
+
+    Dimensions come from the model itself; dims, if given, must match them.
+    Texts longer than the model's sequence length are truncated by the model.
+    """
+
+    name = "local"
+    remote = False
+
+    def __init__(self, model: str = LOCAL_EMBEDDING_MODEL, dims: int | None = None) -> None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as exc:
+            raise ImportError(
+                "The local provider needs sentence-transformers: uv sync --extra local"
+            ) from exc
+        self._model = SentenceTransformer(model, device="cpu")
+        native = self._model.get_sentence_embedding_dimension()
+        if dims and dims != native:
+            raise ValueError(f"{model} does not support EMBEDDING_DIMS (always {native} dims)")
+        super().__init__(model, native)
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        vectors = self._model.encode(texts, batch_size=64, normalize_embeddings=True)
+        return vectors.tolist()
+
+
+# ---------------------------------------------------------------------------
+# Hashing (deterministic, dependency-free)
+# ---------------------------------------------------------------------------
+
+HASHING_EMBEDDING_DIMS = 256
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingProvider(EmbeddingProvider):
+    """Feature-hashed bag of words and word bigrams, L2-normalized.
+
+    Deterministic across machines and runs, instant, and free: texts that
+    share words get similar vectors, which is enough to exercise the whole
+    pipeline and the vector indexes offline. Not a semantic model.
+    """
+
+    name = "hashing"
+    remote = False
+
+    def __init__(self, dims: int = HASHING_EMBEDDING_DIMS) -> None:
+        super().__init__("feature-hashing-v1", dims)
+
+    def _vector(self, text: str) -> list[float]:
+        words = _WORD.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vec = [0.0] * self.dims
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vec[value % self.dims] += 1.0 if value >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self._vector(t) for t in texts]
+
+
+# ---------------------------------------------------------------------------
+# Selection
+# ---------------------------------------------------------------------------
+
+
+def get_provider(settings: Settings) -> EmbeddingProvider:
+    """Build the provider selected by EMBEDDING_PROVIDER (and EMBEDDING_MODEL / _DIMS)."""
+    kind = settings.embedding_provider
+    model = settings.embedding_model
+    dims = settings.embedding_dims
+    if kind == "openai":
+        assert settings.openai_api_key is not None  # checked by Settings
+        return OpenAIProvider(
+            settings.openai_api_key.get_secret_value(),
+            model or OPENAI_EMBEDDING_MODEL,
+            dims,
+        )
+    if kind == "bedrock":
+        return BedrockTitanProvider(settings.aws_region, model or BEDROCK_EMBEDDING_MODEL, dims)
+    if kind == "local":
+        return LocalProvider(model or LOCAL_EMBEDDING_MODEL, dims)
+    if kind == "hashing":
+        return HashingProvider(dims or HASHING_EMBEDDING_DIMS)
+    raise ValueError(f"Unknown embedding provider: {kind}")
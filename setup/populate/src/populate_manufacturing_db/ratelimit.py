@@ -0,0 +1,66 @@
+"""Token-bucket rate limiting for API requests.
+
+A RateLimiter enforces a requests-per-minute and a tokens-per-minute budget
+across every thread and coroutine that shares it. reserve() never blocks:
+it books the capacity and returns how long the caller must wait, so the
+same limiter serves time.sleep() in worker threads and asyncio.sleep() in
+the async pipeline.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 units per second, up to per_minute units.
+
+    Reservations may drive the balance negative; the caller then waits until
+    the debt has been refilled. That keeps reservations first come, first
+    served without a queue.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Book amount units; return the seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            # A single request larger than the whole bucket can still go, once full.
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+
+class RateLimiter:
+    """Requests/min and tokens/min budgets plus a shared pause after a 429.
+
+    Safe to share between threads and coroutines. throttled counts how many
+    times the server asked callers to slow down.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.throttled = 0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """Book one request of tokens tokens; return the seconds to wait first."""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self._lock:
+            return max(wait, self._blocked_until - time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for seconds, e.g. as told by Retry-After."""
+        with self._lock:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
+import time
+from functools import partial
+from typing import TextIO
+
 from neo4j import Driver
-from openai import OpenAI
 
 from .config import Settings
-from .embedder import embed_text, get_openai_client, OPENAI_EMBEDDING_MODEL, OPENAI_EMBEDDING_DIMS
-from .formatting import _W, banner, cypher, header, table, val
+from .embedder import embed_text
+from .formatting import _W, banner, cypher, header, run_sections, table, val
+from .providers import EmbeddingProvider, get_provider
+from .search import VectorSearch, make_search
 
 
 # ---------------------------------------------------------------------------
@@ -22,21 +27,22 @@ WITH p, collect({domain: td.name, components: components}) AS domains
 RETURN p.name AS product, p.description AS description, domains"""
 
 
-def _product_overview(driver: Driver) -> None:
+def _product_overview(driver: Driver, out: TextIO | None = None) -> None:
     header(
         "1. Product Overview",
         "Product with its Technology Domains and Component counts.",
+        out=out,
     )
-    cypher(_PRODUCT_Q)
+    cypher(_PRODUCT_Q, out=out)
     rows, _, _ = driver.execute_query(_PRODUCT_Q)
     if not rows:
-        print("  (no results)\n")
+        print("  (no results)\n", file=out)
         return
     for r in rows:
-        print(f"  Product: {r['product']} ({r['description']})")
+        print(f"  Product: {r['product']} ({r['description']})", file=out)
         for d in r["domains"]:
-            print(f"    \u251c\u2500\u2500 {d['domain']} ({d['components']} components)")
-    print()
+            print(f"    \u251c\u2500\u2500 {d['domain']} ({d['components']} components)", file=out)
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -56,17 +62,19 @@ ORDER BY defects DESC, component, requirement
 LIMIT $limit"""
 
 
-def _requirement_traceability(driver: Driver, limit: int) -> None:
+def _requirement_traceability(driver: Driver, limit: int, out: TextIO | None = None) -> None:
     header(
         "2. Requirement Traceability",
         "Requirements traced from Component through TestSets, TestCases, to Defects.",
+        out=out,
     )
-    cypher(_TRACE_Q)
+    cypher(_TRACE_Q, out=out)
     rows, _, _ = driver.execute_query(_TRACE_Q, limit=limit)
     table(
         ["Component", "Requirement", "Type", "TestSets", "TestCases", "Defects"],
         [[r["component"], val(r["requirement"], 25), r["type"],
           r["test_sets"], r["test_cases"], r["defects"]] for r in rows],
+        out=out,
     )
 
 
@@ -87,19 +95,20 @@ ORDER BY ch.change_proposal_id
 LIMIT $limit"""
 
 
-def _change_impact(driver: Driver, limit: int) -> None:
+def _change_impact(driver: Driver, limit: int, out: TextIO | None = None) -> None:
     header(
         "3. Change Impact Analysis",
         "Change proposals with the requirements and test sets they affect.",
+        out=out,
     )
-    cypher(_CHANGE_Q)
+    cypher(_CHANGE_Q, out=out)
     rows, _, _ = driver.execute_query(_CHANGE_Q, limit=limit)
     for r in rows:
         tests = ", ".join(r["affected_test_sets"]) if r["affected_test_sets"] else "(none)"
-        print(f"  {r['change_id']} [{r['criticality']}/{r['status']}]")
-        print(f"    Requirement: {val(r['requirement'], 50)}")
-        print(f"    Test Sets:   {tests}")
-    print()
+        print(f"  {r['change_id']} [{r['criticality']}/{r['status']}]", file=out)
+        print(f"    Requirement: {val(r['requirement'], 50)}", file=out)
+        print(f"    Test Sets:   {tests}", file=out)
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -117,17 +126,19 @@ RETURN m.milestone_id AS milestone, m.deadline AS deadline,
 ORDER BY m.deadline"""
 
 
-def _milestone_timeline(driver: Driver) -> None:
+def _milestone_timeline(driver: Driver, out: TextIO | None = None) -> None:
     header(
         "4. Milestone Timeline",
         "Milestones in order with requirement counts and NEXT chain.",
+        out=out,
     )
-    cypher(_MILESTONE_Q)
+    cypher(_MILESTONE_Q, out=out)
     rows, _, _ = driver.execute_query(_MILESTONE_Q)
     table(
         ["Milestone", "Deadline", "Requirements", "Next"],
         [[r["milestone"], r["deadline"], r["requirements"],
           val(r["next_milestone"])] for r in rows],
+        out=out,
     )
 
 
@@ -147,19 +158,20 @@ ORDER BY d.severity, d.defect_id
 LIMIT $limit"""
 
 
-def _defect_summary(driver: Driver, limit: int) -> None:
+def _defect_summary(driver: Driver, limit: int, out: TextIO | None = None) -> None:
     header(
         "5. Defect Summary",
         "Defects traced back through TestCase \u2192 TestSet \u2192 Requirement \u2192 Component.",
+        out=out,
     )
-    cypher(_DEFECT_Q)
+    cypher(_DEFECT_Q, out=out)
     rows, _, _ = driver.execute_query(_DEFECT_Q, limit=limit)
     for r in rows:
         comps = ", ".join(r["components"]) if r["components"] else "(unknown)"
-        print(f"  {r['defect_id']} [{r['severity']}/{r['status']}]")
-        print(f"    {val(r['description'], 60)}")
-        print(f"    Components: {comps}")
-    print()
+        print(f"  {r['defect_id']} [{r['severity']}/{r['status']}]", file=out)
+        print(f"    {val(r['description'], 60)}", file=out)
+        print(f"    Components: {comps}", file=out)
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -180,17 +192,19 @@ ORDER BY failed DESC, planned DESC, r.requirement_id
 LIMIT $limit"""
 
 
-def _test_coverage(driver: Driver, limit: int) -> None:
+def _test_coverage(driver: Driver, limit: int, out: TextIO | None = None) -> None:
     header(
         "6. Test Coverage",
         "Requirements with their test case counts by status.",
+        out=out,
     )
-    cypher(_COVERAGE_Q)
+    cypher(_COVERAGE_Q, out=out)
     rows, _, _ = driver.execute_query(_COVERAGE_Q, limit=limit)
     table(
         ["Req ID", "Requirement", "Total", "Passed", "Failed", "Planned"],
         [[r["req_id"], val(r["requirement"], 25), r["total_cases"],
           r["passed"], r["failed"], r["planned"]] for r in rows],
+        out=out,
     )
 
 
@@ -214,28 +228,29 @@ RETURN seed.name AS seed_name,
        substring(node.description, 0, 80) AS match_desc"""
 
 
-def _vector_requirements(driver: Driver, limit: int) -> None:
+def _vector_requirements(driver: Driver, limit: int, out: TextIO | None = None) -> None:
     header(
         "7. Semantic Search: Requirements",
         "Picks a random requirement and finds the most similar ones using\n"
         "  the vector index (reuses stored embeddings \u2014 no API key needed).",
+        out=out,
     )
-    cypher(_REQ_VECTOR_Q)
+    cypher(_REQ_VECTOR_Q, out=out)
     try:
         rows, _, _ = driver.execute_query(_REQ_VECTOR_Q, limit=limit, top_k=limit + 1)
     except Exception:
-        print("  (vector index not available \u2014 run 'load' first)\n")
+        print("  (vector index not available \u2014 run 'load' first)\n", file=out)
         return
     if not rows:
-        print("  (no requirements with embeddings \u2014 run 'load' first)\n")
+        print("  (no requirements with embeddings \u2014 run 'load' first)\n", file=out)
         return
-    print(f"  Seed: \"{rows[0]['seed_name']}\"")
-    print(f"        {rows[0]['seed_desc']}\u2026\n")
-    print(f"  {'Score':<8}  Similar requirement")
-    print(f"  {'\u2500' * 8}  {'\u2500' * 56}")
+    print(f"  Seed: \"{rows[0]['seed_name']}\"", file=out)
+    print(f"        {rows[0]['seed_desc']}\u2026\n", file=out)
+    print(f"  {'Score':<8}  Similar requirement", file=out)
+    print(f"  {'\u2500' * 8}  {'\u2500' * 56}", file=out)
     for r in rows:
-        print(f"  {r['similarity']:.4f}    {r['match_name']}: {val(r['match_desc'], 45)}")
-    print()
+        print(f"  {r['similarity']:.4f}    {r['match_name']}: {val(r['match_desc'], 45)}", file=out)
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -258,31 +273,32 @@ RETURN seed.defect_id AS seed_id,
        node.description AS match_desc"""
 
 
-def _vector_defects(driver: Driver, limit: int) -> None:
+def _vector_defects(driver: Driver, limit: int, out: TextIO | None = None) -> None:
     header(
         "8. Semantic Search: Defects",
         "Picks a random defect and finds the most similar ones using\n"
         "  the vector index (reuses stored embeddings \u2014 no API key needed).",
+        out=out,
     )
-    cypher(_DEFECT_VECTOR_Q)
+    cypher(_DEFECT_VECTOR_Q, out=out)
     try:
         rows, _, _ = driver.execute_query(_DEFECT_VECTOR_Q, limit=limit, top_k=limit + 1)
     except Exception:
-        print("  (vector index not available \u2014 run 'load' first)\n")
+        print("  (vector index not available \u2014 run 'load' first)\n", file=out)
         return
     if not rows:
-        print("  (no defects with embeddings \u2014 run 'load' first)\n")
+        print("  (no defects with embeddings \u2014 run 'load' first)\n", file=out)
         return
-    print(f"  Seed: {rows[0]['seed_id']} \u2014 \"{rows[0]['seed_desc']}\"\n")
-    print(f"  {'Score':<8}  Similar defect")
-    print(f"  {'\u2500' * 8}  {'\u2500' * 56}")
+    print(f"  Seed: {rows[0]['seed_id']} \u2014 \"{rows[0]['seed_desc']}\"\n", file=out)
+    print(f"  {'Score':<8}  Similar defect", file=out)
+    print(f"  {'\u2500' * 8}  {'\u2500' * 56}", file=out)
     for r in rows:
-        print(f"  {r['similarity']:.4f}    {r['match_id']}: {val(r['match_desc'], 50)}")
-    print()
+        print(f"  {r['similarity']:.4f}    {r['match_id']}: {val(r['match_desc'], 50)}", file=out)
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
-# 9. Semantic search with OpenAI embeddings
+# 9. Semantic search with query embeddings
 # ---------------------------------------------------------------------------
 
 _SEMANTIC_Q = """\
@@ -297,29 +313,31 @@ ORDER BY score DESC
 LIMIT $limit"""
 
 
-def _semantic_search(driver: Driver, client: OpenAI, limit: int) -> None:
+def _semantic_search(
+    search: VectorSearch, provider: EmbeddingProvider, limit: int, out: TextIO | None = None
+) -> None:
     query = "battery thermal protection"
     header(
-        "9. Semantic Search (OpenAI Embeddings)",
-        f'Embed a text query with OpenAI and find the most similar requirements.\n'
+        "9. Semantic Search (Query Embeddings)",
+        f'Embed a text query and find the most similar requirements.\n'
         f'  Query: "{query}"',
+        out=out,
     )
-    cypher(_SEMANTIC_Q)
-    embedding = embed_text(client, query)
+    cypher(search.query_text(_SEMANTIC_Q), out=out)
+    embedding = embed_text(provider, query)
     try:
-        rows, _, _ = driver.execute_query(
-            _SEMANTIC_Q, embedding=embedding, top_k=limit + 1, limit=limit,
-        )
+        rows = search.run(_SEMANTIC_Q, embedding, limit + 1, limit=limit)
     except Exception:
-        print("  (vector index not available — run 'load' first)\n")
+        print("  (vector index not available — run 'load' first)\n", file=out)
         return
     if not rows:
-        print("  (no results — run 'load' first)\n")
+        print("  (no results — run 'load' first)\n", file=out)
         return
     table(
         ["Similarity", "Requirement", "Type", "Description"],
         [[f"{r['similarity']:.4f}", val(r["requirement"], 25),
           r["type"], val(r["description"], 40)] for r in rows],
+        out=out,
     )
 
 
@@ -328,24 +346,38 @@ def _semantic_search(driver: Driver, client: OpenAI, limit: int) -> None:
 # ---------------------------------------------------------------------------
 
 
-def run_all_samples(driver: Driver, settings: Settings, sample_size: int = 10) -> None:
-    """Run all sample queries with formatted output."""
-    client = get_openai_client(settings)
+def run_all_samples(
+    driver: Driver, settings: Settings, sample_size: int = 10, workers: int = 9
+) -> None:
+    """Run all sample queries with formatted output.
+
+    The sections run concurrently on workers threads (1 = one after the
+    other); their output is printed in section order either way.
+    """
+    provider = get_provider(settings)
+    search = make_search(driver, settings)
 
     banner("Manufacturing Product Development \u2014 Sample Queries")
     print(f"\n  Sample size: {sample_size} rows per section")
-    print(f"  Embedding model: {OPENAI_EMBEDDING_MODEL} ({OPENAI_EMBEDDING_DIMS} dims)\n")
-
-    _product_overview(driver)
-    _requirement_traceability(driver, sample_size)
-    _change_impact(driver, sample_size)
-    _milestone_timeline(driver)
-    _defect_summary(driver, sample_size)
-    _test_coverage(driver, sample_size)
-    _vector_requirements(driver, sample_size)
-    _vector_defects(driver, sample_size)
-    _semantic_search(driver, client, sample_size)
+    print(f"  Embedding provider: {provider.describe()}")
+    print(f"  Vector search: {search.describe()}\n")
+
+    start = time.monotonic()
+    run_sections(
+        [
+            partial(_product_overview, driver),
+            partial(_requirement_traceability, driver, sample_size),
+            partial(_change_impact, driver, sample_size),
+            partial(_milestone_timeline, driver),
+            partial(_defect_summary, driver, sample_size),
+            partial(_test_coverage, driver, sample_size),
+            partial(_vector_requirements, driver, sample_size),
+            partial(_vector_defects, driver, sample_size),
+            partial(_semantic_search, search, provider, sample_size),
+        ],
+        workers,
+    )
 
     print(f"{'#' * _W}")
-    print("  All samples complete.")
+    print(f"  All samples complete in {time.monotonic() - start:.1f}s.")
     print(f"{'#' * _W}\n")
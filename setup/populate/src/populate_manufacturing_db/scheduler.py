@@ -0,0 +1,123 @@
+"""Dependency-aware task scheduler for the load pipeline.
+
+Tasks name the tasks they depend on; each task is submitted to a worker
+pool as soon as all of its dependencies have finished.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from .formatting import table
+
+
+@dataclass(frozen=True)
+class Task:
+    """A unit of work; run() returns the number of rows it wrote."""
+
+    name: str
+    run: Callable[[], int]
+    requires: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class TaskResult:
+    """Timing of a finished task, relative to the start of the schedule."""
+
+    name: str
+    rows: int
+    started: float
+    elapsed: float
+
+
+def _check_graph(tasks: list[Task]) -> None:
+    """Raise ValueError on duplicate names, unknown dependencies, or cycles."""
+    names = [t.name for t in tasks]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate task names in {names}")
+    known = set(names)
+    for t in tasks:
+        missing = set(t.requires) - known
+        if missing:
+            raise ValueError(f"Task {t.name} depends on unknown tasks: {sorted(missing)}")
+
+    remaining = {t.name: set(t.requires) for t in tasks}
+    while remaining:
+        ready = [n for n, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle among tasks: {sorted(remaining)}")
+        for n in ready:
+            del remaining[n]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def run_dag(tasks: list[Task], workers: int = 1) -> list[TaskResult]:
+    """Run tasks on a pool of workers, respecting their dependencies.
+
+    Ready tasks are submitted in list order. If a task fails, no further
+    tasks are started; tasks already running are allowed to finish and the
+    first error is re-raised.
+    """
+    _check_graph(tasks)
+    by_name = {t.name: t for t in tasks}
+    waiting = {t.name: set(t.requires) for t in tasks}
+    results: list[TaskResult] = []
+    lock = threading.Lock()
+    t0 = time.monotonic()
+
+    def _timed(task: Task) -> TaskResult:
+        with lock:
+            print(f"Loading {task.name}...")
+        started = time.monotonic()
+        rows = task.run()
+        elapsed = time.monotonic() - started
+        with lock:
+            print(f"  [OK] {task.name}: {rows:,} rows in {elapsed:.1f}s")
+        return TaskResult(task.name, rows, started - t0, elapsed)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        running: dict[Future[TaskResult], str] = {}
+
+        def _submit_ready() -> None:
+            for name in [n for n, deps in waiting.items() if not deps]:
+                del waiting[name]
+                running[pool.submit(_timed, by_name[name])] = name
+
+        _submit_ready()
+        error: BaseException | None = None
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                exc = fut.exception()
+                if exc is not None:
+                    with lock:
+                        print(f"  [FAIL] {name}: {exc}")
+                    error = error or exc
+                    continue
+                results.append(fut.result())
+                for deps in waiting.values():
+                    deps.discard(name)
+            if error is None:
+                _submit_ready()
+        if error is not None:
+            raise error
+
+    return results
+
+
+def print_timings(results: list[TaskResult], wall: float) -> None:
+    """Print per-task timings and the overall parallel speedup."""
+    ordered = sorted(results, key=lambda r: r.started)
+    table(
+        ["Task", "Rows", "Start (s)", "Elapsed (s)"],
+        [[r.name, f"{r.rows:,}", f"{r.started:.1f}", f"{r.elapsed:.1f}"] for r in ordered],
+    )
+    busy = sum(r.elapsed for r in results)
+    speedup = busy / wall if wall > 0 else 1.0
+    print(f"  Wall clock: {wall:.1f}s  Task time: {busy:.1f}s  Speedup: {speedup:.1f}x")
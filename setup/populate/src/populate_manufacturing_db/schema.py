@@ -1,8 +1,15 @@
-"""Constraint and index definitions for the Manufacturing Product Development graph."""
+"""Constraint and index definitions for the Manufacturing Product Development graph.
+
+reconcile_schema compares them with the database in one SHOW INDEXES round
+trip and runs only the DDL that is missing or out of date.
+"""
 
 from __future__ import annotations
 
+import time
+
 from neo4j import Driver
+from neo4j.exceptions import Neo4jError
 
 # (label, property) pairs — one uniqueness constraint each.
 CONSTRAINTS: list[tuple[str, str]] = [
@@ -28,41 +35,183 @@ INDEXES: list[tuple[str, str]] = [
     ("Change", "status"),
 ]
 
-# Vector index definitions: (index_name, label, property, dimensions).
-VECTOR_INDEXES: list[tuple[str, str, str, int]] = [
-    ("requirementEmbeddings", "Requirement", "embedding", 1536),
-    ("defectEmbeddings", "Defect", "embedding", 1536),
+# Vector index definitions: (index_name, label, property). Dimensions come
+# from the embedding provider.
+VECTOR_INDEXES: list[tuple[str, str, str]] = [
+    ("requirementEmbeddings", "Requirement", "embedding"),
+    ("defectEmbeddings", "Defect", "embedding"),
 ]
 
 
-def create_constraints(driver: Driver) -> None:
-    """Create uniqueness constraints (idempotent)."""
-    for label, prop in CONSTRAINTS:
-        driver.execute_query(
-            f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
-        )
-        print(f"  [OK] Constraint: {label}.{prop}")
+def vector_index_config(
+    dims: int,
+    quantization: bool | None = None,
+    hnsw_m: int | None = None,
+    hnsw_ef_construction: int | None = None,
+) -> dict[str, object]:
+    """indexConfig for a vector index; options left as None keep the server default."""
+    config: dict[str, object] = {
+        "vector.dimensions": dims,
+        "vector.similarity_function": "cosine",
+    }
+    if quantization is not None:
+        config["vector.quantization.enabled"] = quantization
+    if hnsw_m is not None:
+        config["vector.hnsw.m"] = hnsw_m
+    if hnsw_ef_construction is not None:
+        config["vector.hnsw.ef_construction"] = hnsw_ef_construction
+    return config
+
+
+def _cypher_literal(value: object) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return f"'{value}'"
+    return str(value)
+
+
+def _config_differs(existing: dict, wanted: dict[str, object]) -> bool:
+    for key, value in wanted.items():
+        current = existing.get(key)
+        if isinstance(value, str) and isinstance(current, str):
+            if current.lower() != value.lower():
+                return True
+        elif current != value:
+            return True
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------------------------
+
+# One round trip describes the whole schema: uniqueness constraints show up
+# as the RANGE indexes they own.
+_SHOW_INDEXES = """\
+SHOW INDEXES YIELD name, type, state, labelsOrTypes, properties, owningConstraint, options
+RETURN name, type, state, labelsOrTypes, properties, owningConstraint, options"""
+
+# Seconds to wait for new or populating indexes when no timeout is given.
+AWAIT_TIMEOUT = 300
+
+
+def show_indexes(driver: Driver) -> list:
+    """Every index (including those owned by constraints), with its state and options."""
+    records, _, _ = driver.execute_query(_SHOW_INDEXES)
+    return records
 
 
-def create_indexes(driver: Driver) -> None:
-    """Create property indexes (idempotent)."""
+def _schema_key(record) -> tuple[str, ...]:
+    labels = record["labelsOrTypes"] or [""]
+    return (labels[0], *(record["properties"] or []))
+
+
+def _plan(existing: list, config: dict[str, object] | None) -> list[tuple[str, str | None]]:
+    """DDL statements that bring existing in line with the definitions, with a label each.
+
+    Drops carry no label; the CREATE that follows them reports the change.
+    """
+    constrained = {
+        _schema_key(r) for r in existing if r["type"] == "RANGE" and r["owningConstraint"]
+    }
+    ranged = {
+        _schema_key(r): r
+        for r in existing
+        if r["type"] == "RANGE" and not r["owningConstraint"]
+    }
+    vectors = {r["name"]: r for r in existing if r["type"] == "VECTOR"}
+
+    plan: list[tuple[str, str | None]] = []
+    for label, prop in CONSTRAINTS:
+        if (label, prop) not in constrained:
+            plan.append((
+                f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE",
+                f"Constraint: {label}.{prop}",
+            ))
     for label, prop in INDEXES:
+        current = ranged.get((label, prop))
+        if current is not None and current["state"] != "FAILED":
+            continue
+        note = ""
+        if current is not None:
+            plan.append((f"DROP INDEX {current['name']} IF EXISTS", None))
+            note = " (failed, recreated)"
         index_name = f"idx_{label.lower()}_{prop.lower()}"
-        driver.execute_query(
-            f"CREATE INDEX {index_name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
-        )
-        print(f"  [OK] Index: {label}.{prop}")
-
+        plan.append((
+            f"CREATE INDEX {index_name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})",
+            f"Index: {label}.{prop}{note}",
+        ))
+    if config is None:
+        return plan
 
-def create_vector_indexes(driver: Driver) -> None:
-    """Create vector indexes for embedding similarity search (idempotent)."""
-    for name, label, prop, dims in VECTOR_INDEXES:
-        driver.execute_query(
+    options = ", ".join(f"`{k}`: {_cypher_literal(v)}" for k, v in config.items())
+    for name, label, prop in VECTOR_INDEXES:
+        current = vectors.get(name)
+        note = ""
+        if current is not None:
+            index_config = (current["options"] or {}).get("indexConfig", {})
+            if current["state"] != "FAILED" and not _config_differs(index_config, config):
+                continue
+            plan.append((f"DROP INDEX {name} IF EXISTS", None))
+            note = ", recreated"
+        plan.append((
             f"CREATE VECTOR INDEX {name} IF NOT EXISTS "
             f"FOR (n:{label}) ON (n.{prop}) "
-            f"OPTIONS {{indexConfig: {{"
-            f"  `vector.dimensions`: {dims},"
-            f"  `vector.similarity_function`: 'cosine'"
-            f"}}}}"
+            f"OPTIONS {{indexConfig: {{{options}}}}}",
+            f"Vector index: {name} on {label}.{prop} "
+            f"({config['vector.dimensions']} dims{note})",
+        ))
+    return plan
+
+
+def await_indexes(driver: Driver, timeout: int = AWAIT_TIMEOUT) -> None:
+    """Block until every index is ONLINE; raise TimeoutError after timeout seconds."""
+    start = time.monotonic()
+    try:
+        driver.execute_query("CALL db.awaitIndexes($timeout)", timeout=timeout)
+    except Neo4jError as exc:
+        raise TimeoutError(
+            f"Indexes were not online after {timeout}s (SCHEMA_AWAIT_TIMEOUT): {exc}"
+        ) from exc
+    print(f"  [OK] Indexes online ({time.monotonic() - start:.1f}s)")
+
+
+def reconcile_schema(
+    driver: Driver,
+    dims: int | None = None,
+    quantization: bool | None = None,
+    hnsw_m: int | None = None,
+    hnsw_ef_construction: int | None = None,
+    timeout: int = AWAIT_TIMEOUT,
+) -> int:
+    """Create missing constraints and indexes; return the number of DDL statements run.
+
+    Reads the schema once with SHOW INDEXES and compares it with
+    CONSTRAINTS, INDEXES and VECTOR_INDEXES. Vector indexes (only when dims
+    is given) whose dimensions or `vector.*` options differ are dropped and
+    recreated, as are FAILED indexes. If anything was created or an index
+    is still populating, waits for all indexes to come online before
+    returning, so no write runs against a populating index.
+    """
+    existing = show_indexes(driver)
+    config = None
+    if dims is not None:
+        config = vector_index_config(dims, quantization, hnsw_m, hnsw_ef_construction)
+    plan = _plan(existing, config)
+
+    for query, description in plan:
+        driver.execute_query(query)
+        if description is not None:
+            print(f"  [OK] {description}")
+
+    populating = [r["name"] for r in existing if r["state"] == "POPULATING"]
+    if plan or populating:
+        await_indexes(driver, timeout)
+    else:
+        vector_note = f", {len(VECTOR_INDEXES)} vector indexes" if config is not None else ""
+        print(
+            f"  [OK] Schema up to date: {len(CONSTRAINTS)} constraints, "
+            f"{len(INDEXES)} indexes{vector_note}"
         )
-        print(f"  [OK] Vector index: {name} on {label}.{prop} ({dims} dims)")
+    return len(plan)
@@ -0,0 +1,244 @@
+"""Vector search for the query commands, in Neo4j or against the local mirror.
+
+Queries are written for Neo4j's vector index:
+
+    CALL db.index.vector.queryNodes('requirementEmbeddings', $top_k, $embedding)
+    YIELD node AS req, score
+    ...
+
+With a VectorMirror (VECTOR_SEARCH=local) the nearest neighbours are found
+in process and the CALL is rewritten to match those candidates by id, so
+Neo4j only runs the graph expansion that follows it.
+
+search_many answers a list of query embeddings against one index with a
+single UNWIND ... CALL db.index.vector.queryNodes round trip per batch;
+PrefetchedSearch then runs a query's graph expansion over the hits it found
+for that query, rewritten the same way as for the local mirror.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import NamedTuple
+
+from neo4j import Driver
+
+from .config import Settings
+from .embedder import _CSV_SOURCES
+from .localindex import VectorMirror
+from .schema import VECTOR_INDEXES
+
+_VECTOR_CALL = re.compile(
+    r"CALL\s+db\.index\.vector\.queryNodes\(\s*'(?P<index>\w+)'\s*,\s*\$top_k\s*,"
+    r"\s*\$embedding\s*\)\s*YIELD\s+node(?:\s+AS\s+(?P<node>\w+))?\s*,"
+    r"\s*score(?:\s+AS\s+(?P<score>\w+))?"
+)
+
+# Label and id property behind each vector index.
+_INDEX_NODES = {name: (label, _CSV_SOURCES[label][1]) for name, label, _ in VECTOR_INDEXES}
+
+# Query embeddings per round trip in search_many.
+SEARCH_BATCH_SIZE = 100
+
+_SEARCH_MANY_Q = """\
+UNWIND range(0, size($embeddings) - 1) AS i
+CALL db.index.vector.queryNodes($index, $top_k, $embeddings[i])
+YIELD node, score
+RETURN i, node.{id_prop} AS id, score, {properties} AS properties
+ORDER BY i, score DESC"""
+
+_PROPERTIES_Q = """\
+UNWIND $ids AS id
+MATCH (n:{label} {{{id_prop}: id}})
+RETURN id, {properties} AS properties"""
+
+
+class SearchHit(NamedTuple):
+    id: str
+    score: float
+    properties: dict
+
+
+def _projection(var: str, properties: tuple[str, ...]) -> str:
+    if not properties:
+        return "{}"
+    return f"{var} {{{', '.join('.' + p for p in properties)}}}"
+
+
+def _candidates_clause(match: re.Match) -> str:
+    label, id_prop = _INDEX_NODES[match["index"]]
+    node = match["node"] or "node"
+    score = match["score"] or "score"
+    return (
+        f"UNWIND $candidates AS candidate\n"
+        f"MATCH ({node}:{label} {{{id_prop}: candidate.id}})\n"
+        f"WITH {node}, candidate.score AS {score}"
+    )
+
+
+def _vector_index(query: str) -> str:
+    match = _VECTOR_CALL.search(query)
+    if match is None:
+        raise ValueError("Query has no db.index.vector.queryNodes call to replace")
+    return match["index"]
+
+
+class VectorSearch:
+    """Runs vector queries for a query embedding computed by the caller.
+
+    Without a mirror the query goes to Neo4j unchanged; with one, the
+    queryNodes CALL is replaced by an UNWIND over the local candidates.
+    """
+
+    def __init__(self, driver: Driver, mirror: VectorMirror | None = None) -> None:
+        self.driver = driver
+        self.mirror = mirror
+
+    def describe(self) -> str:
+        if self.mirror is None:
+            return "Neo4j vector index"
+        kinds = sorted({index.kind for index in self.mirror.indexes.values()})
+        return f"local mirror ({', '.join(kinds)})"
+
+    def query_text(self, query: str) -> str:
+        """The Cypher that run() sends for query."""
+        if self.mirror is None:
+            return query
+        return _VECTOR_CALL.sub(_candidates_clause, query, count=1)
+
+    def run(self, query: str, embedding: list[float], top_k: int, **params) -> list:
+        """Run query with $embedding / $top_k; return the records."""
+        if self.mirror is None:
+            rows, _, _ = self.driver.execute_query(
+                query, embedding=embedding, top_k=top_k, **params
+            )
+            return rows
+        hits = self.mirror.search(_vector_index(query), embedding, top_k)
+        rows, _, _ = self.driver.execute_query(
+            self.query_text(query),
+            candidates=[{"id": node_id, "score": score} for node_id, score in hits],
+            top_k=top_k,
+            **params,
+        )
+        return rows
+
+    def search_many(
+        self,
+        index: str,
+        embeddings: list[list[float]],
+        top_k: int,
+        properties: tuple[str, ...] = (),
+        exclude: list[str | None] | None = None,
+    ) -> list[list[SearchHit]]:
+        """Top-k hits for each embedding, best first, in the order of embeddings.
+
+        All embeddings go to Neo4j in one round trip per SEARCH_BATCH_SIZE
+        (or are searched in the local mirror, with one round trip for the
+        properties). properties names node properties to return with each
+        hit. exclude[i], if set, is a node id left out of query i's hits,
+        e.g. the node whose own embedding is the query.
+        """
+        label, id_prop = _INDEX_NODES[index]
+        k = top_k + 1 if exclude else top_k
+        if self.mirror is None:
+            groups = self._search_neo4j(index, id_prop, embeddings, k, properties)
+        else:
+            groups = self._search_local(index, label, id_prop, embeddings, k, properties)
+        if exclude:
+            groups = [
+                [hit for hit in hits if hit.id != skip][:top_k]
+                for hits, skip in zip(groups, exclude)
+            ]
+        return groups
+
+    def _search_neo4j(
+        self,
+        index: str,
+        id_prop: str,
+        embeddings: list[list[float]],
+        k: int,
+        properties: tuple[str, ...],
+    ) -> list[list[SearchHit]]:
+        query = _SEARCH_MANY_Q.format(id_prop=id_prop, properties=_projection("node", properties))
+        groups: list[list[SearchHit]] = [[] for _ in embeddings]
+        for start in range(0, len(embeddings), SEARCH_BATCH_SIZE):
+            rows, _, _ = self.driver.execute_query(
+                query,
+                index=index,
+                top_k=k,
+                embeddings=embeddings[start : start + SEARCH_BATCH_SIZE],
+            )
+            for r in rows:
+                groups[start + r["i"]].append(SearchHit(r["id"], r["score"], r["properties"]))
+        return groups
+
+    def _search_local(
+        self,
+        index: str,
+        label: str,
+        id_prop: str,
+        embeddings: list[list[float]],
+        k: int,
+        properties: tuple[str, ...],
+    ) -> list[list[SearchHit]]:
+        found = [self.mirror.search(index, embedding, k) for embedding in embeddings]
+        props: dict[str, dict] = {}
+        if properties:
+            ids = list({node_id for hits in found for node_id, _ in hits})
+            rows, _, _ = self.driver.execute_query(
+                _PROPERTIES_Q.format(
+                    label=label, id_prop=id_prop, properties=_projection("n", properties)
+                ),
+                ids=ids,
+            )
+            props = {r["id"]: r["properties"] for r in rows}
+        return [
+            [SearchHit(node_id, score, props.get(node_id, {})) for node_id, score in hits]
+            for hits in found
+        ]
+
+
+class PrefetchedSearch(VectorSearch):
+    """A VectorSearch for one query embedding whose hits search_many already found.
+
+    run() only sends the graph expansion: the queryNodes CALL is replaced
+    by an UNWIND over the prefetched hits, as for the local mirror. The
+    query must search the same index with the same top_k.
+    """
+
+    def __init__(self, driver: Driver, index: str, top_k: int, hits: list[SearchHit]) -> None:
+        super().__init__(driver)
+        self.index = index
+        self.top_k = top_k
+        self.hits = hits
+
+    def describe(self) -> str:
+        return f"prefetched {self.index} hits"
+
+    def query_text(self, query: str) -> str:
+        return _VECTOR_CALL.sub(_candidates_clause, query, count=1)
+
+    def run(self, query: str, embedding: list[float], top_k: int, **params) -> list:
+        index = _vector_index(query)
+        if (index, top_k) != (self.index, self.top_k):
+            raise ValueError(
+                f"Hits were prefetched from {self.index} with top_k={self.top_k}, "
+                f"not {index} with top_k={top_k}"
+            )
+        rows, _, _ = self.driver.execute_query(
+            self.query_text(query),
+            candidates=[{"id": hit.id, "score": hit.score} for hit in self.hits],
+            top_k=top_k,
+            **params,
+        )
+        return rows
+
+
+def make_search(driver: Driver, settings: Settings) -> VectorSearch:
+    """VectorSearch as configured by VECTOR_SEARCH, syncing the local mirror first."""
+    if settings.vector_search != "local":
+        return VectorSearch(driver)
+    print("Syncing local vector indexes...")
+    mirror = VectorMirror(settings.cache_dir, settings.local_index_backend)
+    mirror.sync(driver)
+    return VectorSearch(driver, mirror)
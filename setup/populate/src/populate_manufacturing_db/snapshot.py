@@ -0,0 +1,161 @@
+"""Embedding snapshots: export stored vectors to a NumPy memmap and load them back.
+
+A snapshot is a directory with two files:
+
+  embeddings.npy        float32 array, one row per node
+  embeddings.index.json label, id, text fingerprint and model of each row
+
+Importing one into a freshly loaded database writes the vectors back in
+UNWIND batches and creates the vector indexes, with no embedding API calls.
+Needs NumPy (`uv sync --extra snapshot`).
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from neo4j import Driver
+
+from .batching import AdaptiveBatcher
+from .embedder import _CSV_SOURCES, EMBED_BATCH_SIZE
+from .vectors import decode, encode, packed_supported, write_query
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+VECTORS_FILENAME = "embeddings.npy"
+INDEX_FILENAME = "embeddings.index.json"
+SNAPSHOT_FORMAT = 1
+
+# Embedded labels and their id property.
+_LABELS = [(label, id_prop) for label, (_, id_prop, _) in _CSV_SOURCES.items()]
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Embedding snapshots need NumPy: uv sync --extra snapshot")
+
+
+def export_embeddings(driver: Driver, directory: Path) -> int:
+    """Write every Requirement and Defect embedding to a snapshot in directory.
+
+    Vectors are streamed from Neo4j straight into the memory-mapped array,
+    so memory use does not grow with the number of nodes. Dimensions are
+    taken from the first vector and checked on every other one after
+    decoding, since size() does not accept native VECTOR values. Returns
+    the number of vectors written.
+    """
+    _require_numpy()
+    counts = {}
+    for label, _ in _LABELS:
+        records, _, _ = driver.execute_query(
+            f"MATCH (n:{label}) WHERE n.embedding IS NOT NULL RETURN count(n) AS n"
+        )
+        counts[label] = records[0]["n"]
+    total = sum(counts.values())
+    if total == 0:
+        raise ValueError("No embeddings to export; run 'load' first.")
+    first = next(label for label, n in counts.items() if n)
+    records, _, _ = driver.execute_query(
+        f"MATCH (n:{first}) WHERE n.embedding IS NOT NULL RETURN n.embedding AS embedding LIMIT 1"
+    )
+    if not records:
+        raise ValueError("Embeddings were removed during the export; run it again.")
+    width = len(decode(records[0]["embedding"]))
+
+    directory.mkdir(parents=True, exist_ok=True)
+    vectors = np.lib.format.open_memmap(
+        directory / VECTORS_FILENAME, mode="w+", dtype=np.float32, shape=(total, width)
+    )
+    rows: list[list] = []
+    with driver.session() as session:
+        for label, id_prop in _LABELS:
+            result = session.run(
+                f"MATCH (n:{label}) WHERE n.embedding IS NOT NULL "
+                f"RETURN n.{id_prop} AS id, n.embedding AS embedding, "
+                f"n.embedding_fingerprint AS fingerprint, n.embedding_model AS model"
+            )
+            for record in result:
+                if len(rows) == total:
+                    break  # nodes embedded since the count are left for the next export
+                vector = decode(record["embedding"])
+                if len(vector) != width:
+                    raise ValueError(
+                        f"Embeddings have mixed dimensions ({width} and {len(vector)}); "
+                        "re-run 'load' first."
+                    )
+                vectors[len(rows)] = vector
+                rows.append([label, record["id"], record["fingerprint"], record["model"]])
+            print(f"  [OK] {label}: {counts[label]:,} embeddings")
+    vectors.flush()
+    del vectors
+    if len(rows) < total:
+        raise ValueError("Embeddings were removed during the export; run it again.")
+
+    index = {"format": SNAPSHOT_FORMAT, "dims": width, "rows": rows}
+    (directory / INDEX_FILENAME).write_text(json.dumps(index), encoding="utf-8")
+    return len(rows)
+
+
+def snapshot_dims(directory: Path) -> int:
+    """Dimensions of the vectors in a snapshot."""
+    return json.loads((directory / INDEX_FILENAME).read_text(encoding="utf-8"))["dims"]
+
+
+_EXISTING_IDS_Q = """\
+UNWIND $ids AS id
+MATCH (n:{label} {{{id_prop}: id}})
+RETURN collect(id) AS ids"""
+
+
+def import_embeddings(driver: Driver, directory: Path) -> int:
+    """Write a snapshot's embeddings onto the matching nodes; return vectors written.
+
+    Vectors are read from the memory-mapped array one batch at a time.
+    Rows whose node does not exist in this database are not sent; they are
+    reported per label as skipped.
+    """
+    _require_numpy()
+    index = json.loads((directory / INDEX_FILENAME).read_text(encoding="utf-8"))
+    if index.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format: {index.get('format')}")
+    vectors = np.load(directory / VECTORS_FILENAME, mmap_mode="r")
+    rows = index["rows"]
+    if vectors.shape != (len(rows), index["dims"]):
+        raise ValueError(
+            f"{VECTORS_FILENAME} has shape {vectors.shape}, "
+            f"expected ({len(rows)}, {index['dims']})"
+        )
+    packed = packed_supported(driver)
+
+    def _updates(label: str, existing: set[str]) -> Iterator[dict]:
+        for i, (row_label, node_id, fingerprint, model) in enumerate(rows):
+            if row_label == label and node_id in existing:
+                yield {
+                    "id": node_id,
+                    "embedding": encode(vectors[i].tolist(), packed),
+                    "fingerprint": fingerprint,
+                    "model": model,
+                }
+
+    written = 0
+    for label, id_prop in _LABELS:
+        ids = [node_id for row_label, node_id, _, _ in rows if row_label == label]
+        records, _, _ = driver.execute_query(
+            _EXISTING_IDS_Q.format(label=label, id_prop=id_prop), ids=ids
+        )
+        existing = set(records[0]["ids"])
+        start = time.monotonic()
+        n = AdaptiveBatcher(EMBED_BATCH_SIZE).run(
+            driver, write_query(label, id_prop, packed), _updates(label, existing)
+        )
+        print(f"  [OK] {label}: {n:,} embeddings in {time.monotonic() - start:.1f}s")
+        if skipped := len(ids) - n:
+            print(f"  [WARN] {label}: {skipped:,} snapshot row(s) have no matching node (skipped)")
+        written += n
+    return written
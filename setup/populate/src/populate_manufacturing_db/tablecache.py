@@ -0,0 +1,231 @@
+"""On-disk cache of parsed CSV tables, read back through mmap.
+
+Parsing a CSV means sniffing its encoding, decoding it, splitting records
+and stripping every cell. The cache stores the result once per source file
+in a small binary format, so later runs map the file and decode only the
+columns they touch.
+
+File layout (all integers little-endian):
+
+    magic      8 bytes   b"PMDTBL01"
+    meta_len   uint32    length of the JSON metadata that follows
+    meta       JSON      source fingerprint, columns, row count, section offsets
+    sections   per column: uint64 character offsets (rows + 1), then the
+               column's values concatenated as utf-8; each section starts
+               on an 8-byte boundary
+
+A cache entry is valid for a source file with the same size and content
+hash. When size and mtime both match, the hash is not recomputed (the same
+shortcut git uses for its index); otherwise the file is hashed and the
+entry is reused if the content is unchanged, with the new mtime recorded
+so later runs take the shortcut again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+
+from .dataset import _INTERN_MAX, Table
+
+_MAGIC = b"PMDTBL01"
+_VERSION = 1
+_HEADER = struct.Struct("<8sI")
+_ALIGN = 8
+
+# Bytes read per chunk while hashing a source file.
+_HASH_CHUNK = 1 << 20
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _pad(n: int) -> int:
+    return -n % _ALIGN
+
+
+class _MappedColumns(Mapping[str, tuple[str, ...]]):
+    """Columns of a cached table, decoded from the mapped file on first access."""
+
+    def __init__(self, mm: mmap.mmap, sections: dict[str, list[int]], rows: int) -> None:
+        self._mm = mm
+        self._view = memoryview(mm)
+        self._sections = sections
+        self._rows = rows
+        self._decoded: dict[str, tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> tuple[str, ...]:
+        with self._lock:
+            if name not in self._decoded:
+                self._decoded[name] = self._decode(*self._sections[name])
+            return self._decoded[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sections)
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def _decode(self, offsets_at: int, text_at: int, text_len: int) -> tuple[str, ...]:
+        offsets = self._view[offsets_at : offsets_at + 8 * (self._rows + 1)].cast("Q")
+        text = str(self._view[text_at : text_at + text_len], "utf-8")
+        values = []
+        for i in range(self._rows):
+            v = text[offsets[i] : offsets[i + 1]]
+            values.append(sys.intern(v) if len(v) <= _INTERN_MAX else v)
+        return tuple(values)
+
+
+class TableCache:
+    """Parsed CSV tables cached under cache_dir, one file per source CSV.
+
+    Safe to use from several worker threads. hits and misses count how many
+    tables were mapped from the cache and how many had to be parsed.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _entry(self, path: Path) -> Path:
+        digest = hashlib.sha1(str(path.resolve()).encode()).hexdigest()[:16]
+        return self.cache_dir / f"{path.stem}-{digest}.tbl"
+
+    def load(self, path: Path) -> Table:
+        """Return the parsed table for a CSV file, from the cache when still valid."""
+        entry = self._entry(path)
+        st = path.stat()
+        table = self._open(entry, path, st)
+        if table is not None:
+            with self._lock:
+                self.hits += 1
+            return table
+
+        table = Table.parse(path)
+        source = {
+            "path": str(path.resolve()),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": _sha256(path),
+        }
+        self._write(entry, table, source)
+        with self._lock:
+            self.misses += 1
+        return table
+
+    def _open(self, entry: Path, path: Path, st: os.stat_result) -> Table | None:
+        """Map a cache entry, or return None if it is missing, stale or unreadable."""
+        try:
+            with open(entry, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, meta_len = _HEADER.unpack_from(mm)
+            if magic != _MAGIC:
+                raise ValueError("bad magic")
+            meta = json.loads(mm[_HEADER.size : _HEADER.size + meta_len])
+            if meta.get("version") != _VERSION:
+                raise ValueError("old version")
+            source = meta["source"]
+            if source["size"] != st.st_size:
+                raise ValueError("size changed")
+            if source["mtime_ns"] != st.st_mtime_ns:
+                if source["sha256"] != _sha256(path):
+                    raise ValueError("content changed")
+                self._refresh_mtime(entry, meta, meta_len, st.st_mtime_ns)
+        except (ValueError, KeyError, struct.error):
+            mm.close()
+            return None
+        columns = _MappedColumns(mm, meta["sections"], meta["rows"])
+        return Table(meta["name"], meta["columns"], columns, meta["rows"])
+
+    def _refresh_mtime(self, entry: Path, meta: dict, meta_len: int, mtime_ns: int) -> None:
+        """Record a touched but unchanged source's new mtime in the entry's metadata.
+
+        The metadata is rewritten in place, padded with spaces to its old
+        length so no section moves. If it no longer fits, or the entry is
+        not writable, the next run just hashes the source again.
+        """
+        meta["source"]["mtime_ns"] = mtime_ns
+        encoded = json.dumps(meta).encode()
+        if len(encoded) > meta_len:
+            return
+        try:
+            with open(entry, "r+b") as f:
+                f.seek(_HEADER.size)
+                f.write(encoded.ljust(meta_len))
+        except OSError:
+            pass
+
+    def _write(self, entry: Path, table: Table, source: dict) -> None:
+        """Serialize a table; written to a temp file and renamed into place."""
+        rows = len(table)
+        blobs: list[tuple[bytes, bytes]] = []
+        for name in table.columns:
+            values = table.column(name)
+            offsets = [0] * (rows + 1)
+            pos = 0
+            for i, v in enumerate(values):
+                pos += len(v)
+                offsets[i + 1] = pos
+            blobs.append((struct.pack(f"<{rows + 1}Q", *offsets), "".join(values).encode()))
+
+        def layout(meta_len: int) -> dict[str, list[int]]:
+            at = _HEADER.size + meta_len
+            at += _pad(at)
+            sections = {}
+            for name, (offsets, text) in zip(table.columns, blobs):
+                sections[name] = [at, at + len(offsets), len(text)]
+                at += len(offsets) + len(text)
+                at += _pad(at)
+            return sections
+
+        meta = {
+            "version": _VERSION,
+            "source": source,
+            "name": table.name,
+            "columns": list(table.columns),
+            "rows": rows,
+        }
+        # Section offsets depend on the metadata length, which in turn
+        # contains them; iterate until the encoded length is stable.
+        meta_len = 0
+        while True:
+            meta["sections"] = layout(meta_len)
+            encoded = json.dumps(meta).encode()
+            if len(encoded) == meta_len:
+                break
+            meta_len = len(encoded)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, meta_len))
+            f.write(encoded)
+            f.write(b"\0" * _pad(f.tell()))
+            for offsets, text in blobs:
+                f.write(offsets)
+                f.write(text)
+                f.write(b"\0" * _pad(f.tell()))
+        os.replace(tmp, entry)
+
+    def clear(self) -> None:
+        """Delete every cached table."""
+        for entry in self.cache_dir.glob("*.tbl"):
+            entry.unlink(missing_ok=True)
@@ -9,15 +9,19 @@ Run via:  uv run populate-manufacturing-db test-queries
 
 from __future__ import annotations
 
+import statistics
 import time
+from functools import partial
+from typing import TextIO
 
 from neo4j import Driver
 
-from openai import OpenAI
-
 from .config import Settings
-from .embedder import embed_text, get_openai_client, OPENAI_EMBEDDING_MODEL, OPENAI_EMBEDDING_DIMS
-from .formatting import _W, banner, cypher, header, val
+from .embedcache import EmbeddingCache
+from .embedder import embed_texts, make_limiter
+from .formatting import _W, banner, cypher, header, run_sections, table, val
+from .providers import EmbeddingProvider, get_provider
+from .search import PrefetchedSearch, VectorSearch, make_search
 
 
 # ---------------------------------------------------------------------------
@@ -35,23 +39,26 @@ ORDER BY score DESC"""
 
 
 def _vector_requirement_search(
-    driver: Driver, client: OpenAI, query: str, top_k: int
+    search: VectorSearch, query: str, embedding: list[float], top_k: int, out: TextIO | None = None
 ) -> None:
     header(
         "1. Vector Similarity — Requirements",
         f'Find requirements semantically similar to: "{query}"',
+        out=out,
     )
-    cypher(_VEC_REQ_Q)
-    embedding = embed_text(client, query)
-    rows, _, _ = driver.execute_query(_VEC_REQ_Q, embedding=embedding, top_k=top_k)
+    cypher(search.query_text(_VEC_REQ_Q), out=out)
+    rows = search.run(_VEC_REQ_Q, embedding, top_k)
     if not rows:
-        print("  (no results — run 'load' first)\n")
+        print("  (no results — run 'load' first)\n", file=out)
         return
-    print(f"  {'Score':<8}  {'Requirement':<30}  Description")
-    print(f"  {'\u2500' * 8}  {'\u2500' * 30}  {'\u2500' * 28}")
+    print(f"  {'Score':<8}  {'Requirement':<30}  Description", file=out)
+    print(f"  {'\u2500' * 8}  {'\u2500' * 30}  {'\u2500' * 28}", file=out)
     for r in rows:
-        print(f"  {r['score']:.4f}    {val(r['name'], 28):<30}  {val(r['description'], 40)}")
-    print()
+        print(
+            f"  {r['score']:.4f}    {val(r['name'], 28):<30}  {val(r['description'], 40)}",
+            file=out,
+        )
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -70,26 +77,27 @@ ORDER BY score DESC"""
 
 
 def _vector_defect_search(
-    driver: Driver, client: OpenAI, query: str, top_k: int
+    search: VectorSearch, query: str, embedding: list[float], top_k: int, out: TextIO | None = None
 ) -> None:
     header(
         "2. Vector Similarity — Defects",
         f'Find defects semantically similar to: "{query}"',
+        out=out,
     )
-    cypher(_VEC_DEF_Q)
-    embedding = embed_text(client, query)
-    rows, _, _ = driver.execute_query(_VEC_DEF_Q, embedding=embedding, top_k=top_k)
+    cypher(search.query_text(_VEC_DEF_Q), out=out)
+    rows = search.run(_VEC_DEF_Q, embedding, top_k)
     if not rows:
-        print("  (no results — run 'load' first)\n")
+        print("  (no results — run 'load' first)\n", file=out)
         return
-    print(f"  {'Score':<8}  {'Defect':<10}  {'Severity':<10}  Description")
-    print(f"  {'\u2500' * 8}  {'\u2500' * 10}  {'\u2500' * 10}  {'\u2500' * 36}")
+    print(f"  {'Score':<8}  {'Defect':<10}  {'Severity':<10}  Description", file=out)
+    print(f"  {'\u2500' * 8}  {'\u2500' * 10}  {'\u2500' * 10}  {'\u2500' * 36}", file=out)
     for r in rows:
         print(
             f"  {r['score']:.4f}    {r['defect_id']:<10}  {val(r['severity'], 10):<10}  "
-            f"{val(r['description'], 40)}"
+            f"{val(r['description'], 40)}",
+            file=out,
         )
-    print()
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -113,23 +121,23 @@ ORDER BY score DESC"""
 
 
 def _vector_graph_requirement(
-    driver: Driver, client: OpenAI, query: str, top_k: int
+    search: VectorSearch, query: str, embedding: list[float], top_k: int, out: TextIO | None = None
 ) -> None:
     header(
         "3. Vector + Graph Context — Requirements",
         f'Semantic search with component and test set context.\n  Query: "{query}"',
+        out=out,
     )
-    cypher(_VEC_GRAPH_REQ_Q)
-    embedding = embed_text(client, query)
-    rows, _, _ = driver.execute_query(_VEC_GRAPH_REQ_Q, embedding=embedding, top_k=top_k)
+    cypher(search.query_text(_VEC_GRAPH_REQ_Q), out=out)
+    rows = search.run(_VEC_GRAPH_REQ_Q, embedding, top_k)
     if not rows:
-        print("  (no results)\n")
+        print("  (no results)\n", file=out)
         return
     for r in rows:
-        print(f"  [{r['score']:.4f}] {r['name']} ({r['component']})")
-        print(f"           {val(r['description'], 60)}")
-        print(f"           Test sets: {r['test_sets']}")
-    print()
+        print(f"  [{r['score']:.4f}] {r['name']} ({r['component']})", file=out)
+        print(f"           {val(r['description'], 60)}", file=out)
+        print(f"           Test sets: {r['test_sets']}", file=out)
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -159,28 +167,28 @@ ORDER BY score DESC"""
 
 
 def _vector_graph_defect(
-    driver: Driver, client: OpenAI, query: str, top_k: int
+    search: VectorSearch, query: str, embedding: list[float], top_k: int, out: TextIO | None = None
 ) -> None:
     header(
         "4. Vector + Graph Context — Defect Traceability",
         f'Semantic defect search with full traceability chain.\n  Query: "{query}"',
+        out=out,
     )
-    cypher(_VEC_GRAPH_DEF_Q)
-    embedding = embed_text(client, query)
-    rows, _, _ = driver.execute_query(_VEC_GRAPH_DEF_Q, embedding=embedding, top_k=top_k)
+    cypher(search.query_text(_VEC_GRAPH_DEF_Q), out=out)
+    rows = search.run(_VEC_GRAPH_DEF_Q, embedding, top_k)
     if not rows:
-        print("  (no results)\n")
+        print("  (no results)\n", file=out)
         return
     for r in rows:
         comps = ", ".join(r["components"]) if r["components"] else "(unknown)"
         reqs = ", ".join(r["requirements"][:3]) if r["requirements"] else "(none)"
         tests = ", ".join(r["test_cases"][:3]) if r["test_cases"] else "(none)"
-        print(f"  [{r['score']:.4f}] {r['defect_id']} — {r['description']}")
-        print(f"           Severity: {r['severity']}  Status: {r['status']}")
-        print(f"           Components: {comps}")
-        print(f"           Requirements: {val(reqs, 60)}")
-        print(f"           Test cases: {val(tests, 60)}")
-    print()
+        print(f"  [{r['score']:.4f}] {r['defect_id']} — {r['description']}", file=out)
+        print(f"           Severity: {r['severity']}  Status: {r['status']}", file=out)
+        print(f"           Components: {comps}", file=out)
+        print(f"           Requirements: {val(reqs, 60)}", file=out)
+        print(f"           Test cases: {val(tests, 60)}", file=out)
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -208,24 +216,28 @@ ORDER BY req_score DESC"""
 
 
 def _cross_domain_search(
-    driver: Driver, client: OpenAI, query: str, top_k: int
+    search: VectorSearch, query: str, embedding: list[float], top_k: int, out: TextIO | None = None
 ) -> None:
     header(
         "5. Cross-Domain — Requirements → Defects",
         f'Find requirements matching "{query}", then traverse\n'
         "  the graph to surface related defects.",
+        out=out,
     )
-    cypher(_CROSS_Q)
-    embedding = embed_text(client, query)
-    rows, _, _ = driver.execute_query(_CROSS_Q, embedding=embedding, top_k=top_k)
+    cypher(search.query_text(_CROSS_Q), out=out)
+    rows = search.run(_CROSS_Q, embedding, top_k)
     if not rows:
-        print("  (no matching requirements with defects)\n")
+        print("  (no matching requirements with defects)\n", file=out)
         return
     for r in rows:
-        print(f"  [{r['req_score']:.4f}] {r['requirement']} ({r['component']})")
+        print(f"  [{r['req_score']:.4f}] {r['requirement']} ({r['component']})", file=out)
         for d in r["defects"]:
-            print(f"           \u2514\u2500 {d['defect_id']} [{d['severity']}/{d['status']}] {d['description']}")
-    print()
+            print(
+                f"           \u2514\u2500 {d['defect_id']} [{d['severity']}/{d['status']}] "
+                f"{d['description']}",
+                file=out,
+            )
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -247,28 +259,38 @@ ORDER BY score DESC"""
 
 
 def _hybrid_type_filter(
-    driver: Driver, client: OpenAI, query: str, req_type: str, top_k: int
+    search: VectorSearch,
+    query: str,
+    embedding: list[float],
+    req_type: str,
+    top_k: int,
+    out: TextIO | None = None,
 ) -> None:
     header(
         "6. Hybrid — Vector + Property Filter",
         f'Semantic search filtered to type="{req_type}".\n  Query: "{query}"',
+        out=out,
     )
-    cypher(_HYBRID_Q)
-    embedding = embed_text(client, query)
-    rows, _, _ = driver.execute_query(
-        _HYBRID_Q, embedding=embedding, top_k=top_k, req_type=req_type
-    )
+    cypher(search.query_text(_HYBRID_Q), out=out)
+    rows = search.run(_HYBRID_Q, embedding, top_k, req_type=req_type)
     if not rows:
-        print(f"  (no {req_type} requirements match)\n")
+        print(f"  (no {req_type} requirements match)\n", file=out)
         return
-    print(f"  {'Score':<8}  {'Type':<6}  {'Component':<12}  {'Requirement':<25}  Description")
-    print(f"  {'\u2500' * 8}  {'\u2500' * 6}  {'\u2500' * 12}  {'\u2500' * 25}  {'\u2500' * 20}")
+    print(
+        f"  {'Score':<8}  {'Type':<6}  {'Component':<12}  {'Requirement':<25}  Description",
+        file=out,
+    )
+    print(
+        f"  {'\u2500' * 8}  {'\u2500' * 6}  {'\u2500' * 12}  {'\u2500' * 25}  {'\u2500' * 20}",
+        file=out,
+    )
     for r in rows:
         print(
             f"  {r['score']:.4f}    {r['type']:<6}  {val(r['component'], 12):<12}  "
-            f"{val(r['name'], 25):<25}  {val(r['description'], 35)}"
+            f"{val(r['name'], 25):<25}  {val(r['description'], 35)}",
+            file=out,
         )
-    print()
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -292,26 +314,29 @@ ORDER BY score DESC"""
 
 
 def _hybrid_severity_filter(
-    driver: Driver, client: OpenAI, query: str, severity: str, top_k: int
+    search: VectorSearch,
+    query: str,
+    embedding: list[float],
+    severity: str,
+    top_k: int,
+    out: TextIO | None = None,
 ) -> None:
     header(
         "7. Hybrid — Vector + Severity Filter",
         f'Find {severity}-severity defects matching: "{query}"',
+        out=out,
     )
-    cypher(_HYBRID_SEV_Q)
-    embedding = embed_text(client, query)
-    rows, _, _ = driver.execute_query(
-        _HYBRID_SEV_Q, embedding=embedding, top_k=top_k, severity=severity
-    )
+    cypher(search.query_text(_HYBRID_SEV_Q), out=out)
+    rows = search.run(_HYBRID_SEV_Q, embedding, top_k, severity=severity)
     if not rows:
-        print(f"  (no {severity} defects match)\n")
+        print(f"  (no {severity} defects match)\n", file=out)
         return
     for r in rows:
         reqs = ", ".join(r["affected_requirements"]) if r["affected_requirements"] else "(none)"
-        print(f"  [{r['score']:.4f}] {r['defect_id']} [{r['severity']}/{r['status']}]")
-        print(f"           {r['description']}")
-        print(f"           Affected: {val(reqs, 60)}")
-    print()
+        print(f"  [{r['score']:.4f}] {r['defect_id']} [{r['severity']}/{r['status']}]", file=out)
+        print(f"           {r['description']}", file=out)
+        print(f"           Affected: {val(reqs, 60)}", file=out)
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -338,27 +363,28 @@ ORDER BY score DESC"""
 
 
 def _change_impact_search(
-    driver: Driver, client: OpenAI, query: str, top_k: int
+    search: VectorSearch, query: str, embedding: list[float], top_k: int, out: TextIO | None = None
 ) -> None:
     header(
         "8. Multi-Hop — Semantic Search → Change Impact",
         f'Find requirements matching "{query}", then\n'
         "  traverse to active change proposals affecting them.",
+        out=out,
     )
-    cypher(_CHANGE_IMPACT_Q)
-    embedding = embed_text(client, query)
-    rows, _, _ = driver.execute_query(_CHANGE_IMPACT_Q, embedding=embedding, top_k=top_k)
+    cypher(search.query_text(_CHANGE_IMPACT_Q), out=out)
+    rows = search.run(_CHANGE_IMPACT_Q, embedding, top_k)
     if not rows:
-        print("  (no matching requirements with change proposals)\n")
+        print("  (no matching requirements with change proposals)\n", file=out)
         return
     for r in rows:
-        print(f"  [{r['score']:.4f}] {r['requirement']} ({r['component']})")
+        print(f"  [{r['score']:.4f}] {r['requirement']} ({r['component']})", file=out)
         for ch in r["changes"]:
             print(
                 f"           \u2514\u2500 {ch['change_id']} [{ch['criticality']}/{ch['status']}] "
-                f"{val(ch['description'], 45)}"
+                f"{val(ch['description'], 45)}",
+                file=out,
             )
-    print()
+    print(file=out)
 
 
 # ---------------------------------------------------------------------------
@@ -377,26 +403,214 @@ _TEST_CASES: list[tuple] = [
     (_change_impact_search, "charging system and power delivery", {}),
 ]
 
+# Vector index and label each test case searches.
+_CASE_INDEXES = {
+    _vector_requirement_search: ("requirementEmbeddings", "Requirement"),
+    _vector_defect_search: ("defectEmbeddings", "Defect"),
+    _vector_graph_requirement: ("requirementEmbeddings", "Requirement"),
+    _vector_graph_defect: ("defectEmbeddings", "Defect"),
+    _cross_domain_search: ("requirementEmbeddings", "Requirement"),
+    _hybrid_type_filter: ("requirementEmbeddings", "Requirement"),
+    _hybrid_severity_filter: ("defectEmbeddings", "Defect"),
+    _change_impact_search: ("requirementEmbeddings", "Requirement"),
+}
+
+
+def _embed_queries(provider: EmbeddingProvider, settings: Settings) -> dict[str, list[float]]:
+    """Embed every test query text in one request, reusing cached vectors.
+
+    The request goes through the configured rate limit, so a 429 or a
+    transient error is retried like during the load.
+    """
+    texts = list(dict.fromkeys(query for _, query, _ in _TEST_CASES))
+    cache = EmbeddingCache(settings.cache_dir)
+    start = time.monotonic()
+    try:
+        vectors = embed_texts(provider, texts, cache, make_limiter(provider, settings))
+    finally:
+        cache.close()
+    print(
+        f"  Query embeddings: {len(texts)} texts, {cache.hits} cached, "
+        f"{cache.misses} embedded in {time.monotonic() - start:.2f}s\n"
+    )
+    return dict(zip(texts, vectors))
+
+
+def _prefetch(
+    search: VectorSearch, embeddings: dict[str, list[float]], top_k: int
+) -> dict[tuple[str, str], VectorSearch]:
+    """Find every case's nearest neighbours with one search_many call per index.
+
+    All cases share top_k, so grouping by (index, top_k) is grouping by
+    index. Returns a PrefetchedSearch per (index, query text).
+    """
+    by_index: dict[str, list[str]] = {}
+    for fn, query, _ in _TEST_CASES:
+        queries = by_index.setdefault(_CASE_INDEXES[fn][0], [])
+        if query not in queries:
+            queries.append(query)
+    start = time.monotonic()
+    searches: dict[tuple[str, str], VectorSearch] = {}
+    for index, queries in by_index.items():
+        hits = search.search_many(index, [embeddings[q] for q in queries], top_k)
+        for query, found in zip(queries, hits):
+            searches[index, query] = PrefetchedSearch(search.driver, index, top_k, found)
+    print(
+        f"  Nearest neighbours: {len(searches)} queries in {len(by_index)} search_many "
+        f"call(s) in {time.monotonic() - start:.2f}s\n"
+    )
+    return searches
+
 
-def run_test_queries(driver: Driver, settings: Settings, top_k: int = 5) -> None:
-    """Run all test queries with live OpenAI embeddings."""
-    client = get_openai_client(settings)
+def run_test_queries(
+    driver: Driver, settings: Settings, top_k: int = 5, workers: int = 8
+) -> None:
+    """Run all test queries, embedding the query texts with the configured provider.
+
+    The texts are embedded up front in a single request and the nearest
+    neighbours of all cases that search the same index are found with one
+    search_many call. The cases then run only their graph expansion,
+    concurrently on workers threads (1 = one after the other), with their
+    output printed in case order. With VECTOR_SEARCH=local the nearest
+    neighbours come from the local mirror (synced first).
+    """
+    provider = get_provider(settings)
+    search = make_search(driver, settings)
 
     banner("Semantic Similarity & Hybrid Search — Test Queries")
-    print(f"\n  Model: {OPENAI_EMBEDDING_MODEL} ({OPENAI_EMBEDDING_DIMS} dims)")
+    print(f"\n  Provider: {provider.describe()}")
+    print(f"  Search: {search.describe()}")
     print(f"  Top-K: {top_k}\n")
 
     start = time.monotonic()
-    passed = 0
-
-    for fn, query, kwargs in _TEST_CASES:
+    embeddings = _embed_queries(provider, settings)
+    try:
+        searches = _prefetch(search, embeddings, top_k)
+    except Exception as exc:
+        print(f"  [WARN] Batched search failed ({exc}); running each query on its own.\n")
+        searches = {}
+    passed: list[str] = []
+
+    def _case(fn, query: str, kwargs: dict, out: TextIO) -> None:
+        case_search = searches.get((_CASE_INDEXES[fn][0], query), search)
         try:
-            fn(driver, client, query, top_k=top_k, **kwargs)
-            passed += 1
+            fn(case_search, query, embeddings[query], top_k=top_k, out=out, **kwargs)
+            passed.append(query)
         except Exception as exc:
-            print(f"  [FAIL] {exc}\n")
+            print(f"  [FAIL] {exc}\n", file=out)
+
+    run_sections([partial(_case, fn, query, kwargs) for fn, query, kwargs in _TEST_CASES], workers)
 
     elapsed = time.monotonic() - start
     print(f"{'#' * _W}")
-    print(f"  {passed}/{len(_TEST_CASES)} test queries completed in {elapsed:.1f}s.")
+    print(f"  {len(passed)}/{len(_TEST_CASES)} test queries completed in {elapsed:.1f}s.")
     print(f"{'#' * _W}\n")
+
+
+# ---------------------------------------------------------------------------
+# Recall vs latency of the vector indexes
+# ---------------------------------------------------------------------------
+
+_ANN_Q = """\
+CALL db.index.vector.queryNodes($index, $top_k, $embedding)
+YIELD node
+RETURN elementId(node) AS id"""
+
+_EXACT_Q = """\
+MATCH (n:{label}) WHERE n.embedding IS NOT NULL
+WITH n, vector.similarity.cosine(n.embedding, $embedding) AS score
+ORDER BY score DESC LIMIT $top_k
+RETURN elementId(n) AS id"""
+
+_INDEX_CONFIG_Q = """\
+SHOW INDEXES YIELD name, type, options
+WHERE type = 'VECTOR' AND name IN $names
+RETURN name, options.indexConfig AS config"""
+
+
+def _timed_ids(driver: Driver, query: str, repeats: int, **params) -> tuple[set[str], float]:
+    """Run query repeats times; return its result ids and the median latency in ms."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows, _, _ = driver.execute_query(query, **params)
+        timings.append(1000 * (time.perf_counter() - start))
+    return {r["id"] for r in rows}, statistics.median(timings)
+
+
+def _timed_search_many(
+    search: VectorSearch, embeddings: dict[str, list[float]], top_k: int, repeats: int
+) -> dict[str, float]:
+    """Median ms to answer every test query of each index with one search_many call."""
+    by_index: dict[str, list[list[float]]] = {}
+    for fn, query, _ in _TEST_CASES:
+        by_index.setdefault(_CASE_INDEXES[fn][0], []).append(embeddings[query])
+    timings = {}
+    for index, vectors in sorted(by_index.items()):
+        runs = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            search.search_many(index, vectors, top_k)
+            runs.append(1000 * (time.perf_counter() - start))
+        timings[index] = statistics.median(runs)
+    return timings
+
+
+def run_recall_report(
+    driver: Driver, settings: Settings, top_k: int = 5, repeats: int = 5
+) -> None:
+    """Compare vector index (ANN) results with exact cosine search for every test query.
+
+    Recall@k is the share of the exact top-k that the index returned;
+    latencies are medians over repeats runs. Re-run after changing
+    EMBEDDING_DIMS or the VECTOR_* index settings to see the trade-off.
+    Finally times the same queries batched through search_many.
+    """
+    provider = get_provider(settings)
+
+    banner("Vector Index Recall vs Latency")
+    print(f"\n  Provider: {provider.describe()}")
+    print(f"  Top-K: {top_k}, median of {repeats} runs\n")
+    embeddings = _embed_queries(provider, settings)
+
+    names = sorted({index for index, _ in _CASE_INDEXES.values()})
+    configs, _, _ = driver.execute_query(_INDEX_CONFIG_Q, names=names)
+    for r in configs:
+        config = r["config"] or {}
+        print(
+            f"  {r['name']}: {config.get('vector.dimensions')} dims, "
+            f"quantization {config.get('vector.quantization.enabled', 'default')}, "
+            f"m {config.get('vector.hnsw.m', 'default')}, "
+            f"ef_construction {config.get('vector.hnsw.ef_construction', 'default')}"
+        )
+    print()
+
+    rows, recalls, ann_ms, exact_ms = [], [], [], []
+    for fn, query, _ in _TEST_CASES:
+        index, label = _CASE_INDEXES[fn]
+        embedding = embeddings[query]
+        ann, ann_t = _timed_ids(
+            driver, _ANN_Q, repeats, index=index, top_k=top_k, embedding=embedding
+        )
+        exact, exact_t = _timed_ids(
+            driver, _EXACT_Q.format(label=label), repeats, top_k=top_k, embedding=embedding
+        )
+        recall = len(ann & exact) / len(exact) if exact else 1.0
+        recalls.append(recall)
+        ann_ms.append(ann_t)
+        exact_ms.append(exact_t)
+        rows.append([val(query, 40), index, f"{recall:.2f}", f"{ann_t:.1f}", f"{exact_t:.1f}"])
+
+    table(["Query", "Index", f"Recall@{top_k}", "ANN ms", "Exact ms"], rows)
+    print(
+        f"  Mean recall@{top_k}: {statistics.mean(recalls):.3f}   "
+        f"median ANN {statistics.median(ann_ms):.1f} ms vs exact "
+        f"{statistics.median(exact_ms):.1f} ms\n"
+    )
+
+    batched_ms = _timed_search_many(VectorSearch(driver), embeddings, top_k, repeats)
+    print(
+        f"  Batched: all {len(_TEST_CASES)} queries in {len(batched_ms)} round trips "
+        f"(one per index) took {sum(batched_ms.values()):.1f} ms, vs {sum(ann_ms):.1f} ms "
+        f"one query at a time\n"
+    )
@@ -0,0 +1,126 @@
+"""Token counting, truncation and request packing for embedding inputs.
+
+Counts come from tiktoken's encoding for the embedding model when tiktoken
+is installed (`uv sync --extra tokenizer`). Without it every utf-8 byte
+counts as a token. A byte-level BPE token is never shorter than one byte,
+so this is an upper bound and never produces an oversized request or an
+input over the limit; a per-byte ratio above one would undercount short
+tokens such as digits or umlauts. The price is smaller requests.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from typing import Any
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+# Per-input limit of the OpenAI embedding models.
+MAX_INPUT_TOKENS = 8191
+
+# Defaults for one embeddings request: total tokens and number of inputs.
+MAX_REQUEST_TOKENS = 100_000
+MAX_REQUEST_ITEMS = 512
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> Any:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def tokenizer_name(model: str) -> str:
+    enc = _encoding(model)
+    return f"tiktoken {enc.name}" if enc is not None else "upper bound (1 per utf-8 byte)"
+
+
+def count_tokens(text: str, model: str) -> int:
+    enc = _encoding(model)
+    if enc is None:
+        return len(text.encode())
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate(text: str, max_tokens: int, model: str) -> str:
+    """Return text cut to at most max_tokens tokens, always at the same place."""
+    enc = _encoding(model)
+    if enc is None:
+        cut = text.encode()[:max_tokens]
+        return cut.decode(errors="ignore")
+    return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+
+class BatchPacker:
+    """Packs (id, text) items into embedding requests by token count.
+
+    Each request holds at most max_items inputs and max_tokens tokens in
+    total; texts longer than MAX_INPUT_TOKENS are truncated first. Items
+    keep their order. truncated and requests count what pack() did.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_tokens: int = MAX_REQUEST_TOKENS,
+        max_items: int = MAX_REQUEST_ITEMS,
+    ) -> None:
+        self.model = model
+        self.max_tokens = max(max_tokens, MAX_INPUT_TOKENS)
+        self.max_items = max(max_items, 1)
+        self.truncated = 0
+        self.requests = 0
+
+    def _fit(self, text: str) -> tuple[str, int]:
+        """Return text truncated to MAX_INPUT_TOKENS if needed, and its token count."""
+        tokens = count_tokens(text, self.model)
+        if tokens > MAX_INPUT_TOKENS:
+            text = truncate(text, MAX_INPUT_TOKENS, self.model)
+            tokens = count_tokens(text, self.model)
+        return text, tokens
+
+    def _full(self, items: int, budget: int, tokens: int) -> bool:
+        return items >= self.max_items or budget + tokens > self.max_tokens
+
+    def input_tokens(self, text: str) -> int:
+        """Tokens text takes up in a request, after truncation."""
+        return self._fit(text)[1]
+
+    def count_requests(self, tokens: Iterable[int]) -> int:
+        """Requests pack() would make for inputs of these token counts, in order.
+
+        Does not add to requests.
+        """
+        requests = items = budget = 0
+        for n in tokens:
+            if items and self._full(items, budget, n):
+                requests += 1
+                items = budget = 0
+            items += 1
+            budget += n
+        return requests + 1 if items else 0
+
+    def pack(self, items: Iterable[tuple[str, str]]) -> Iterator[list[tuple[str, str]]]:
+        """Yield lists of (id, text), each fitting in one embeddings request."""
+        batch: list[tuple[str, str]] = []
+        budget = 0
+        for key, original in items:
+            text, tokens = self._fit(original)
+            if text is not original:
+                self.truncated += 1
+            if batch and self._full(len(batch), budget, tokens):
+                self.requests += 1
+                yield batch
+                batch, budget = [], 0
+            batch.append((key, text))
+            budget += tokens
+        if batch:
+            self.requests += 1
+            yield batch
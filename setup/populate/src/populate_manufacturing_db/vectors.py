@@ -0,0 +1,89 @@
+"""Compact float32 storage and transfer for node embeddings.
+
+Embeddings are written with db.create.setNodeVectorProperty, which stores
+them as float32 arrays (4 bytes per dimension) instead of the float64 lists
+a plain SET stores (8 bytes per dimension). With a driver and server that
+support the native VECTOR type (neo4j driver 6, Neo4j 2025.10+), vectors
+also travel as packed float32 instead of a list of 9-byte floats.
+"""
+
+from __future__ import annotations
+
+from neo4j import AsyncDriver, Driver
+
+try:
+    from neo4j.vector import Vector
+except ImportError:  # driver without the VECTOR type
+    Vector = None
+
+# Bytes per dimension: PackStream float in a list, float64 and float32 storage.
+WIRE_FLOAT_BYTES = 9
+FLOAT64_BYTES = 8
+FLOAT32_BYTES = 4
+
+_PROBE = "RETURN $vector IS NOT NULL AS ok"
+
+
+def write_query(label: str, id_prop: str, packed: bool = False) -> str:
+    """UNWIND query storing row.embedding on each node as float32.
+
+    Packed rows carry a native float32 VECTOR, which a plain SET keeps as
+    is; list rows go through setNodeVectorProperty to be stored as float32.
+    row.fingerprint and row.model are stored alongside.
+    """
+    match = f"UNWIND $batch AS row MATCH (n:{label} {{{id_prop}: row.id}}) "
+    meta = "n.embedding_fingerprint = row.fingerprint, n.embedding_model = row.model"
+    if packed:
+        return match + f"SET n.embedding = row.embedding, {meta}"
+    return (
+        match
+        + "CALL db.create.setNodeVectorProperty(n, 'embedding', row.embedding) "
+        + f"SET {meta}"
+    )
+
+
+def encode(vector: list[float], packed: bool) -> object:
+    """Query parameter for one embedding: a packed float32 Vector or the plain list."""
+    return Vector(vector, "f32") if packed else vector
+
+
+def decode(value: object) -> list[float]:
+    """A stored embedding as a list, whether it came back as a list or a packed VECTOR."""
+    to_native = getattr(value, "to_native", None)
+    return to_native() if to_native is not None else value  # type: ignore[return-value]
+
+
+def _probe_value() -> object | None:
+    return None if Vector is None else Vector([0.0], "f32")
+
+
+def packed_supported(driver: Driver) -> bool:
+    """True if both the driver and the server accept packed float32 vectors."""
+    value = _probe_value()
+    if value is None:
+        return False
+    try:
+        driver.execute_query(_PROBE, vector=value)
+    except Exception:
+        return False
+    return True
+
+
+async def apacked_supported(driver: AsyncDriver) -> bool:
+    """Async variant of packed_supported."""
+    value = _probe_value()
+    if value is None:
+        return False
+    try:
+        await driver.execute_query(_PROBE, vector=value)
+    except Exception:
+        return False
+    return True
+
+
+def wire_bytes(dims: int, packed: bool) -> int:
+    """Approximate PackStream size of one vector parameter."""
+    if packed:
+        return FLOAT32_BYTES * dims + 8  # struct header, dtype marker and byte-array header
+    header = 1 if dims < 16 else 2 if dims < 256 else 3 if dims < 65_536 else 5
+    return WIRE_FLOAT_BYTES * dims + header
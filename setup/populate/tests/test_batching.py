@@ -0,0 +1,50 @@
+import pytest
+from neo4j.exceptions import ServiceUnavailable, TransientError
+
+from populate_manufacturing_db import batching
+from populate_manufacturing_db.batching import AdaptiveBatcher
+
+
+class _Driver:
+    """Fails the first call with error, then commits every batch."""
+
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+        self.calls = 0
+        self.committed: list[dict] = []
+
+    def execute_query(self, query, batch):
+        self.calls += 1
+        if self.calls == 1:
+            raise self.error
+        self.committed.extend(batch)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(batching.time, "sleep", lambda seconds: None)
+
+
+_ROWS = [{"id": i} for i in range(50)]
+
+
+@pytest.mark.parametrize("idempotent", [True, False])
+def test_transient_error_is_retried(idempotent):
+    driver = _Driver(TransientError("deadlock"))
+    batcher = AdaptiveBatcher(20, min_size=1, idempotent=idempotent)
+    assert batcher.run(driver, "WRITE", _ROWS) == 50
+    assert driver.committed == _ROWS
+    assert batcher.retries == 1
+
+
+def test_lost_connection_is_retried_for_idempotent_queries():
+    driver = _Driver(ServiceUnavailable("connection lost"))
+    assert AdaptiveBatcher(20, min_size=1).run(driver, "MERGE", _ROWS) == 50
+    assert driver.committed == _ROWS
+
+
+def test_lost_connection_is_not_resubmitted_for_create():
+    driver = _Driver(ServiceUnavailable("connection lost"))
+    with pytest.raises(ServiceUnavailable):
+        AdaptiveBatcher(20, min_size=1, idempotent=False).run(driver, "CREATE", _ROWS)
+    assert driver.calls == 1
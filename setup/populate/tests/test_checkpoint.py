@@ -0,0 +1,62 @@
+from populate_manufacturing_db import loader
+from populate_manufacturing_db.checkpoint import CHECKPOINT_FILENAME, LoadCheckpoint
+
+_RUN = {"uri": "bolt://db", "mode": "merge", "data": "abc"}
+
+
+def test_round_trip(tmp_path):
+    checkpoint = LoadCheckpoint(tmp_path, _RUN)
+    checkpoint.advance("Product", 500)
+    checkpoint.advance("Requirement", 0)
+    checkpoint.advance("Machine", 1000)
+    checkpoint.finish("Machine", 1200)
+
+    resumed = LoadCheckpoint(tmp_path, dict(_RUN))
+    assert resumed.resume()
+    assert resumed.offset("Product") == 500
+    assert resumed.offset("Machine") == 0
+    assert resumed.finished("Machine") == 1200
+    assert resumed.finished("Product") is None
+    assert resumed.pending == {"Product": 500}
+
+
+def test_other_run_does_not_resume(tmp_path):
+    LoadCheckpoint(tmp_path, _RUN).advance("Product", 500)
+    other = LoadCheckpoint(tmp_path, {**_RUN, "data": "def"})
+    assert not other.resume()
+    assert other.offset("Product") == 0
+
+
+def test_missing_and_discarded(tmp_path):
+    assert not LoadCheckpoint(tmp_path, _RUN).resume()
+    LoadCheckpoint(tmp_path, _RUN).advance("Product", 500)
+    LoadCheckpoint.discard(tmp_path)
+    assert not (tmp_path / CHECKPOINT_FILENAME).exists()
+    assert not LoadCheckpoint(tmp_path, _RUN).resume()
+
+
+def test_load_skips_committed_rows(tmp_path, monkeypatch):
+    sent = []
+
+    def _run_in_batches(driver, rows, query, progress, on_commit=None, idempotent=True):
+        rows = list(rows)
+        sent.append(rows)
+        on_commit(len(rows))
+        return len(rows)
+
+    monkeypatch.setattr(loader, "_run_in_batches", _run_in_batches)
+    checkpoint = LoadCheckpoint(tmp_path, _RUN)
+    checkpoint.advance("Product", 2)
+    state = loader.LoadState(checkpoint=checkpoint)
+
+    def load():
+        return loader._load_tracked(
+            None, "Product", lambda: [{"product_id": f"P{i}"} for i in range(3)], "WRITE",
+            False, lambda row: row["product_id"], "DELETE", loader._node_delete_params, state,
+        )
+
+    assert load() == 1
+    assert sent == [[{"product_id": "P2"}]]
+    assert checkpoint.finished("Product") == 3
+    assert load() == 0
+    assert len(sent) == 1
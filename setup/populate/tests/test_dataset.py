@@ -0,0 +1,51 @@
+import pytest
+
+from populate_manufacturing_db.dataset import Dataset, Table, iter_csv
+
+_CSV = (
+    "id, name ,status\n"
+    "1, first ,open\n"
+    "2,short\n"
+    "\n"
+    "3,long,closed,extra\n"
+    "1,again,closed\n"
+)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / "items.csv").write_text(_CSV, encoding="utf-8")
+    (tmp_path / "umlauts.csv").write_bytes("id,name\n1,M\xfcller\n".encode("latin-1"))
+    return tmp_path
+
+
+def test_iter_csv_matches_table_parse(data_dir):
+    for name in ("items.csv", "umlauts.csv"):
+        assert list(iter_csv(data_dir, name)) == list(Table.parse(data_dir / name).rows())
+
+
+def test_rows_are_stripped_and_padded(data_dir):
+    rows = list(iter_csv(data_dir, "items.csv"))
+    assert rows[0] == {"id": "1", "name": "first", "status": "open"}
+    assert rows[1] == {"id": "2", "name": "short", "status": ""}
+    assert rows[2] == {"id": "3", "name": "long", "status": "closed"}
+    assert len(rows) == 4
+
+
+def test_latin1_fallback(data_dir):
+    assert list(iter_csv(data_dir, "umlauts.csv")) == [{"id": "1", "name": "M\xfcller"}]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_stream_and_parsed_datasets_agree(data_dir, stream):
+    data = Dataset(data_dir, stream=stream)
+    assert list(data.rows("items.csv")) == list(iter_csv(data_dir, "items.csv"))
+    last = list(data.last_rows("items.csv", "id"))
+    assert [(r["id"], r["name"]) for r in last] == [("2", "short"), ("3", "long"), ("1", "again")]
+
+
+def test_table_indexes(data_dir):
+    table = Table.parse(data_dir / "items.csv")
+    assert table.lookup("id", "1")["name"] == "again"
+    assert [r["name"] for r in table.find("id", "1")] == ["first", "again"]
+    assert table.lookup("id", "9") is None
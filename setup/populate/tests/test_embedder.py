@@ -0,0 +1,13 @@
+from populate_manufacturing_db.embedder import DedupStats
+from populate_manufacturing_db.tokenizer import BatchPacker
+
+
+def test_dedup_counts_requests_avoided():
+    packer = BatchPacker("text-embedding-3-small", max_items=2)
+    items = [("R1", "Housing  test"), ("R2", "Housing test"), ("R3", "Seal"), ("R4", "Seal ")]
+    stats = DedupStats()
+    groups = stats.group(items, packer)
+    assert groups == {"Housing test": ["R1", "R2"], "Seal": ["R3", "R4"]}
+    assert (stats.texts, stats.unique, stats.requests_avoided) == (4, 2, 1)
+    assert stats.summary() == "4 texts, 2 unique (2 duplicate(s) not sent, 1 request(s) avoided)"
+    assert packer.requests == 0
@@ -0,0 +1,42 @@
+import threading
+import time
+
+import pytest
+
+from populate_manufacturing_db.formatting import run_sections
+
+
+def _section(name, delay=0.0):
+    def section(out):
+        time.sleep(delay)
+        print(f"{name} start", file=out)
+        print(f"{name} end", file=out)
+
+    return section
+
+
+def _failing(out):
+    print("failing start", file=out)
+    raise RuntimeError("boom")
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_output_in_list_order(capsys, workers):
+    run_sections([_section("a", 0.05), _section("b"), _section("c", 0.02)], workers)
+    assert capsys.readouterr().out.split("\n")[:-1] == [
+        "a start", "a end", "b start", "b end", "c start", "c end",
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_error_raised_after_all_output(capsys, workers):
+    with pytest.raises(RuntimeError, match="boom"):
+        run_sections([_section("a"), _failing, _section("c", 0.02)], workers)
+    assert capsys.readouterr().out.split("\n")[:-1] == [
+        "a start", "a end", "failing start", "c start", "c end",
+    ]
+
+
+def test_sections_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    run_sections([lambda out: barrier.wait(), lambda out: barrier.wait()], workers=2)
@@ -0,0 +1,116 @@
+import pytest
+
+from populate_manufacturing_db import loader
+from populate_manufacturing_db.dataset import Dataset
+from populate_manufacturing_db.manifest import KEY_SEP, LoadManifest
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Replace Neo4j writes with a list of (query, rows) per call."""
+    sent: list[tuple[str, list[dict]]] = []
+
+    def _run_in_batches(driver, rows, query, progress, on_commit=None, idempotent=True):
+        rows = list(rows)
+        sent.append((query, rows))
+        if on_commit is not None:
+            on_commit(len(rows))
+        return len(rows)
+
+    monkeypatch.setattr(loader, "_run_in_batches", _run_in_batches)
+    return sent
+
+
+def _products(*ids):
+    return lambda: [{"product_id": i, "name": f"name {i}"} for i in ids]
+
+
+def _load_products(state, rows):
+    return loader._load_tracked(
+        None, "Product", rows, "WRITE", False, lambda row: row["product_id"],
+        "DELETE", loader._node_delete_params, state,
+    )
+
+
+def test_incremental_writes_only_changed_rows(tmp_path, batches):
+    state = loader.LoadState(LoadManifest(tmp_path, "bolt://db"), incremental=True)
+    assert _load_products(state, _products("P1", "P2")) == 2
+    state.manifest.save()
+
+    def rows():
+        return [{"product_id": "P1", "name": "name P1"}, {"product_id": "P2", "name": "new"}]
+
+    state = loader.LoadState(LoadManifest(tmp_path, "bolt://db"), incremental=True)
+    assert _load_products(state, rows) == 1
+    assert batches[-1] == ("WRITE", [{"product_id": "P2", "name": "new"}])
+
+
+def test_prune_deletes_node_keys_containing_the_separator(tmp_path, batches):
+    manifest = LoadManifest(tmp_path, "bolt://db")
+    manifest.commit("Product", {f"A{KEY_SEP}B": "h", "P1": "h"})
+    state = loader.LoadState(manifest, incremental=True, prune=True)
+    _load_products(state, _products("P1"))
+    assert batches[-1] == ("DELETE", [{"key": f"A{KEY_SEP}B"}])
+    assert state.removed == {"Product": 1}
+
+
+def test_relationship_prune_params():
+    assert loader._pair_delete_params(f"R1{KEY_SEP}T1") == {"source": "R1", "target": "T1"}
+
+
+def test_full_load_keeps_no_hashes(tmp_path, batches):
+    hashed = []
+    state = loader.LoadState()
+    written = loader._load_tracked(
+        None, "Product", _products("P1", "P2"), "WRITE", False, lambda row: row["product_id"],
+        "DELETE", loader._node_delete_params, state, hash_fn=hashed.append,
+    )
+    assert written == 2
+    assert hashed == []
+
+
+
+def test_create_variant_rewrites_every_definition():
+    for d in [*loader._NODE_DEFINITIONS, *loader._REL_DEFINITIONS]:
+        query = loader._create_variant(d.query)
+        assert "MERGE" not in query
+        assert query.count("CREATE ") == 1
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "UNWIND $batch AS row\nMERGE (a:A {id: row.a})\nMERGE (b:B {id: row.b})",
+        "UNWIND $batch AS row\nMERGE (p:Product {id: row.id})\nON CREATE SET p.new = true",
+        "UNWIND $batch AS row\nMATCH (a:A {id: row.a})\nMERGE (a)-[:X]->(:B {id: row.b})",
+        "UNWIND $batch AS row\nMATCH (a), (b), (c)\nMERGE (a)-[:X]->(b)-[:Y]->(c)",
+    ],
+)
+def test_create_variant_rejects_other_shapes(query):
+    with pytest.raises(ValueError):
+        loader._create_variant(query)
+
+
+@pytest.mark.parametrize("fresh", [False, True])
+def test_create_steps_are_not_idempotent(tmp_path, fresh):
+    steps = loader.plan_load_steps(Dataset(tmp_path), fresh)
+    assert {s.idempotent for s in steps} == {not fresh}
+
+
+def test_manifest_saved_only_after_every_step(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "build_load_steps", lambda *args, **kwargs: [])
+    manifest = LoadManifest(tmp_path, "bolt://db")
+    manifest.commit("Product", {"P1": "h"})
+    state = loader.LoadState(manifest, incremental=True)
+
+    def failing(steps, workers):
+        raise RuntimeError("step failed")
+
+    monkeypatch.setattr(loader, "run_dag", failing)
+    with pytest.raises(RuntimeError):
+        loader.load_graph(None, None, state=state)
+    assert LoadManifest(tmp_path, "bolt://db").previous("Product") == {}
+
+    monkeypatch.setattr(loader, "run_dag", lambda steps, workers: [])
+    loader.load_graph(None, None, state=state)
+    assert LoadManifest(tmp_path, "bolt://db").previous("Product") == {"P1": "h"}
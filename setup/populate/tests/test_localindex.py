@@ -0,0 +1,50 @@
+import pytest
+
+from populate_manufacturing_db.localindex import LocalVectorIndex
+
+np = pytest.importorskip("numpy")
+
+
+class _Driver:
+    """Serves nodes {id: (fingerprint, model, vector)}; counts vector fetches."""
+
+    def __init__(self, nodes: dict) -> None:
+        self.nodes = nodes
+        self.fetched: list[str] = []
+
+    def execute_query(self, query, ids=None):
+        if ids is None:
+            rows = [
+                {"id": i, "fingerprint": fp, "model": model}
+                for i, (fp, model, _) in self.nodes.items()
+            ]
+            return rows, None, None
+        self.fetched += ids
+        return [{"id": i, "embedding": self.nodes[i][2]} for i in ids], None, None
+
+
+def test_sync_fetches_only_changed_vectors():
+    driver = _Driver({"R1": ("f1", "m", [1.0, 0.0]), "R2": ("f2", "m", [0.0, 1.0])})
+    index = LocalVectorIndex("requirementEmbeddings", "Requirement", "requirement_id", "numpy")
+    assert index.sync(driver) == (2, 0)
+    assert index.sync(driver) == (0, 0)
+
+    driver.nodes["R2"] = ("f2b", "m", [1.0, 1.0])
+    del driver.nodes["R1"]
+    driver.fetched.clear()
+    assert index.sync(driver) == (1, 1)
+    assert driver.fetched == ["R2"]
+    assert index.ids == ["R2"]
+
+
+def test_nodes_without_fingerprint_are_always_refetched():
+    driver = _Driver({"R1": (None, "m", [1.0, 0.0]), "R2": ("f2", "m", [0.0, 1.0])})
+    index = LocalVectorIndex("requirementEmbeddings", "Requirement", "requirement_id", "numpy")
+    index.sync(driver)
+
+    driver.nodes["R1"] = (None, "m", [0.0, 1.0])
+    driver.fetched.clear()
+    assert index.sync(driver) == (1, 0)
+    assert driver.fetched == ["R1"]
+    row = index.ids.index("R1")
+    assert index.vectors[row].tolist() == pytest.approx([0.0, 1.0])
@@ -0,0 +1,48 @@
+from populate_manufacturing_db.manifest import MANIFEST_FILENAME, LoadManifest, row_hash
+
+
+def test_row_hash_ignores_column_order():
+    assert row_hash({"a": "1", "b": "2"}) == row_hash({"b": "2", "a": "1"})
+
+
+def test_row_hash_separates_values():
+    assert row_hash({"a": "1", "b": "23"}) != row_hash({"a": "12", "b": "3"})
+    assert row_hash({"a": "1"}) != row_hash({"a": "2"})
+
+
+def test_commit_round_trip(tmp_path):
+    manifest = LoadManifest(tmp_path, "bolt://db")
+    manifest.commit("Product", {"P1": "h1", "P2": "h2"})
+    manifest.commit("NEXT", {"M1\x1fM2": "h3"})
+    assert not (tmp_path / MANIFEST_FILENAME).exists()
+    manifest.save()
+
+    reloaded = LoadManifest(tmp_path, "bolt://db")
+    assert reloaded.previous("Product") == {"P1": "h1", "P2": "h2"}
+    assert reloaded.previous("NEXT") == {"M1\x1fM2": "h3"}
+    assert reloaded.previous("Defect") == {}
+
+
+def test_previous_returns_a_copy(tmp_path):
+    manifest = LoadManifest(tmp_path, "bolt://db")
+    manifest.commit("Product", {"P1": "h1"})
+    manifest.previous("Product")["P2"] = "h2"
+    assert manifest.previous("Product") == {"P1": "h1"}
+
+
+def _saved(tmp_path):
+    manifest = LoadManifest(tmp_path, "bolt://db")
+    manifest.commit("Product", {"P1": "h1"})
+    manifest.save()
+
+
+def test_other_database_is_ignored(tmp_path):
+    _saved(tmp_path)
+    assert LoadManifest(tmp_path, "bolt://other").previous("Product") == {}
+
+
+def test_discard(tmp_path):
+    _saved(tmp_path)
+    LoadManifest.discard(tmp_path)
+    assert not (tmp_path / MANIFEST_FILENAME).exists()
+    LoadManifest.discard(tmp_path)  # no manifest is fine too
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from populate_manufacturing_db import pipeline
+from populate_manufacturing_db.loader import LoadStep
+
+
+class _Driver:
+    def __init__(self) -> None:
+        self.batches: list[list[dict]] = []
+
+    async def execute_query(self, query, batch):
+        self.batches.append(batch)
+
+
+def _pipeline(driver):
+    p = pipeline._Pipeline.__new__(pipeline._Pipeline)
+    p.driver = driver
+    p.write_slots = asyncio.Semaphore(1)
+    p.stop = threading.Event()
+    p.results = []
+    p.t0 = time.monotonic()
+    return p
+
+
+def _step(rows):
+    return LoadStep("Product", rows, "WRITE", (), None, None, "DELETE", None)
+
+
+async def _load(p, step):
+    p.loaded = {step.name: asyncio.Event()}
+    await asyncio.wait_for(p.load_step(step), timeout=5)
+
+
+def test_load_step_writes_every_row():
+    driver = _Driver()
+    p = _pipeline(driver)
+    asyncio.run(_load(p, _step(lambda: ({"id": i} for i in range(1200)))))
+    assert sum(len(b) for b in driver.batches) == 1200
+    assert p.results[0].rows == 1200
+    assert p.loaded["Product"].is_set()
+
+
+def test_failing_rows_raise_instead_of_hanging():
+    def rows():
+        yield {"id": 1}
+        raise FileNotFoundError("products.csv")
+
+    p = _pipeline(_Driver())
+    with pytest.raises(ExceptionGroup) as info:
+        asyncio.run(_load(p, _step(rows)))
+    assert info.group_contains(FileNotFoundError)
+    assert not p.loaded["Product"].is_set()
@@ -0,0 +1,17 @@
+import pytest
+
+from populate_manufacturing_db.providers import BedrockTitanProvider
+
+
+@pytest.mark.parametrize(
+    ("model", "dims"),
+    [
+        ("amazon.titan-embed-text-v2:0", 1536),
+        ("amazon.titan-embed-text-v2:0", 300),
+        ("amazon.titan-embed-text-v1", 1024),
+    ],
+)
+def test_bedrock_rejects_unsupported_dims(model, dims):
+    with pytest.raises(ValueError, match="EMBEDDING_DIMS"):
+        BedrockTitanProvider("eu-central-1", model, dims)
+
@@ -0,0 +1,64 @@
+import pytest
+
+from populate_manufacturing_db import ratelimit
+from populate_manufacturing_db.ratelimit import RateLimiter, TokenBucket
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+
+def test_full_bucket_does_not_wait(clock):
+    bucket = TokenBucket(60)
+    assert [bucket.reserve(1) for _ in range(60)] == [0.0] * 60
+
+
+def test_debt_is_paid_at_the_refill_rate(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(3) == pytest.approx(3.0)
+    assert bucket.reserve(1) == pytest.approx(4.0)
+
+
+def test_refill_over_time_is_capped(clock):
+    bucket = TokenBucket(120)
+    bucket.reserve(120)
+    clock.now += 10
+    assert bucket.reserve(20) == 0.0
+    assert bucket.reserve(1) == pytest.approx(0.5)
+    clock.now += 3600
+    assert bucket.reserve(120) == 0.0
+    assert bucket.reserve(2) == pytest.approx(1.0)
+
+
+def test_oversized_request_takes_the_whole_bucket(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(1000) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_limiter_waits_for_the_tighter_budget(clock):
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+    assert limiter.reserve(6000) == 0.0
+    assert limiter.reserve(100) == pytest.approx(1.0)
+
+
+def test_pause_holds_back_callers(clock):
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+    limiter.pause(5)
+    limiter.pause(2)
+    assert limiter.throttled == 2
+    assert limiter.reserve(1) == pytest.approx(5.0)
+    clock.now += 5
+    assert limiter.reserve(1) == 0.0
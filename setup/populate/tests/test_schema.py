@@ -0,0 +1,82 @@
+from populate_manufacturing_db.schema import (
+    CONSTRAINTS,
+    INDEXES,
+    VECTOR_INDEXES,
+    _plan,
+    vector_index_config,
+)
+
+
+def _index(name, type_, labels, props, state="ONLINE", constraint=None, options=None):
+    return {
+        "name": name, "type": type_, "state": state, "labelsOrTypes": labels,
+        "properties": props, "owningConstraint": constraint, "options": options,
+    }
+
+
+def _up_to_date(config):
+    existing = [
+        _index(f"c_{label}", "RANGE", [label], [prop], constraint=f"c_{label}")
+        for label, prop in CONSTRAINTS
+    ]
+    existing += [_index(f"i_{label}_{prop}", "RANGE", [label], [prop]) for label, prop in INDEXES]
+    # The server reports the similarity function in upper case.
+    index_config = {**config, "vector.similarity_function": "COSINE"}
+    existing += [
+        _index(name, "VECTOR", [label], [prop], options={"indexConfig": index_config})
+        for name, label, prop in VECTOR_INDEXES
+    ]
+    return existing
+
+
+def test_empty_database_creates_everything():
+    plan = _plan([], vector_index_config(384))
+    assert len(plan) == len(CONSTRAINTS) + len(INDEXES) + len(VECTOR_INDEXES)
+    assert all(description is not None for _, description in plan)
+
+
+def test_vector_indexes_only_with_config():
+    assert not any("VECTOR" in query for query, _ in _plan([], None))
+
+
+def test_up_to_date_schema_needs_nothing():
+    config = vector_index_config(384, quantization=True)
+    assert _plan(_up_to_date(config), config) == []
+
+
+def test_changed_vector_config_recreates_the_index():
+    existing = _up_to_date(vector_index_config(384))
+    plan = _plan(existing, vector_index_config(1536))
+    name = VECTOR_INDEXES[0][0]
+    assert plan[0] == (f"DROP INDEX {name} IF EXISTS", None)
+    assert plan[1][0].startswith(f"CREATE VECTOR INDEX {name} IF NOT EXISTS")
+    assert "`vector.dimensions`: 1536" in plan[1][0]
+    assert plan[1][1].endswith("(1536 dims, recreated)")
+    assert len(plan) == 2 * len(VECTOR_INDEXES)
+
+
+def test_failed_index_is_dropped_and_recreated():
+    config = vector_index_config(384)
+    existing = _up_to_date(config)
+    label, prop = INDEXES[0]
+    failed = next(r for r in existing if r["name"] == f"i_{label}_{prop}")
+    failed["state"] = "FAILED"
+    assert _plan(existing, config) == [
+        (f"DROP INDEX i_{label}_{prop} IF EXISTS", None),
+        (
+            f"CREATE INDEX idx_{label.lower()}_{prop.lower()} IF NOT EXISTS "
+            f"FOR (n:{label}) ON (n.{prop})",
+            f"Index: {label}.{prop} (failed, recreated)",
+        ),
+    ]
+
+
+def test_plain_index_does_not_count_as_constraint():
+    config = vector_index_config(384)
+    existing = _up_to_date(config)
+    label, prop = CONSTRAINTS[0]
+    existing[0]["owningConstraint"] = None
+    assert _plan(existing, config) == [(
+        f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE",
+        f"Constraint: {label}.{prop}",
+    )]
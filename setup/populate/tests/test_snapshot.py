@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from populate_manufacturing_db import snapshot
+
+np = pytest.importorskip("numpy")
+
+
+class _Driver:
+    """Knows the nodes in existing; records the rows of every write."""
+
+    def __init__(self, existing: set[str]) -> None:
+        self.existing = existing
+        self.written: list[str] = []
+
+    def execute_query(self, query, **params):
+        if "collect(id)" in query:
+            return [{"ids": [i for i in params["ids"] if i in self.existing]}], None, None
+        self.written += [row["id"] for row in params["batch"]]
+        return [], None, None
+
+
+def _write_snapshot(directory, rows):
+    np.save(directory / snapshot.VECTORS_FILENAME, np.ones((len(rows), 4), dtype=np.float32))
+    index = {"format": snapshot.SNAPSHOT_FORMAT, "dims": 4, "rows": rows}
+    (directory / snapshot.INDEX_FILENAME).write_text(json.dumps(index), encoding="utf-8")
+
+
+def test_import_counts_only_matched_nodes(tmp_path, capsys):
+    _write_snapshot(tmp_path, [
+        ["Requirement", "R1", "f1", "m"],
+        ["Requirement", "R2", "f2", "m"],
+        ["Defect", "D1", "f3", "m"],
+    ])
+    driver = _Driver({"R1", "D1"})
+    assert snapshot.import_embeddings(driver, tmp_path) == 2
+    assert driver.written == ["R1", "D1"]
+    out = capsys.readouterr().out
+    assert "Requirement: 1 embeddings" in out
+    assert "[WARN] Requirement: 1 snapshot row(s) have no matching node (skipped)" in out
+    assert "[WARN] Defect" not in out
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from populate_manufacturing_db import tablecache
+from populate_manufacturing_db.dataset import Table
+from populate_manufacturing_db.tablecache import TableCache
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "items.csv"
+    path.write_text("id,name\n1, first \n2,second\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    calls = []
+    real = tablecache._sha256
+
+    def counting(path):
+        calls.append(path)
+        return real(path)
+
+    monkeypatch.setattr(tablecache, "_sha256", counting)
+    return calls
+
+
+def _touch(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_miss_then_hit(tmp_path, source):
+    cache = TableCache(tmp_path / "cache")
+    first = cache.load(source)
+    second = cache.load(source)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert list(second.rows()) == list(first.rows()) == list(Table.parse(source).rows())
+
+
+def test_touched_source_is_hashed_once(tmp_path, source, hashes):
+    cache = TableCache(tmp_path / "cache")
+    cache.load(source)
+    _touch(source)
+    cache.load(source)
+    cache.load(source)
+    assert (cache.misses, cache.hits) == (1, 2)
+    assert len(hashes) == 2  # once when written, once after the touch
+
+
+def test_changed_content_is_reparsed(tmp_path, source):
+    cache = TableCache(tmp_path / "cache")
+    cache.load(source)
+    source.write_text("id,name\n1, first \n2,SECOND\n", encoding="utf-8")
+    _touch(source)
+    table = cache.load(source)
+    assert (cache.misses, cache.hits) == (2, 0)
+    assert table.lookup("id", "2")["name"] == "SECOND"
+
+
+def test_corrupt_entry_is_rebuilt(tmp_path, source):
+    cache = TableCache(tmp_path / "cache")
+    cache.load(source)
+    entry = cache._entry(source)
+    entry.write_bytes(b"garbage")
+    assert cache.load(source).lookup("id", "1")["name"] == "first"
+    assert cache.misses == 2
+    assert cache.load(source).lookup("id", "1")["name"] == "first"
+    assert cache.hits == 1
+
+
+def test_clear(tmp_path, source):
+    cache = TableCache(tmp_path / "cache")
+    cache.load(source)
+    cache.clear()
+    cache.load(source)
+    assert cache.misses == 2
@@ -0,0 +1,67 @@
+from populate_manufacturing_db import tokenizer
+from populate_manufacturing_db.tokenizer import MAX_INPUT_TOKENS, BatchPacker, count_tokens
+
+_MODEL = "text-embedding-3-small"
+
+
+def _items(n, words):
+    return [(f"id{i}", f"item {i} " + "housing " * words) for i in range(n)]
+
+
+def test_max_items_and_order():
+    packer = BatchPacker(_MODEL, max_items=4)
+    items = _items(10, 1)
+    batches = list(packer.pack(items))
+    assert [len(b) for b in batches] == [4, 4, 2]
+    assert [item for batch in batches for item in batch] == items
+    assert (packer.requests, packer.truncated) == (3, 0)
+
+
+def test_token_budget():
+    packer = BatchPacker(_MODEL, max_tokens=1, max_items=100)
+    assert packer.max_tokens == MAX_INPUT_TOKENS
+    items = _items(12, 1000)
+    batches = list(packer.pack(items))
+    assert len(batches) > 1
+    for batch in batches:
+        assert sum(count_tokens(text, _MODEL) for _, text in batch) <= MAX_INPUT_TOKENS
+    assert [item for batch in batches for item in batch] == items
+    assert packer.requests == len(batches)
+
+
+def test_long_inputs_are_truncated():
+    packer = BatchPacker(_MODEL)
+    items = [("short", "a housing"), ("long", "housing " * (3 * MAX_INPUT_TOKENS))]
+    (batch,) = packer.pack(items)
+    assert batch[0] == items[0]
+    assert batch[1][0] == "long"
+    assert 0 < count_tokens(batch[1][1], _MODEL) <= MAX_INPUT_TOKENS
+    assert packer.truncated == 1
+
+
+def test_empty_input():
+    packer = BatchPacker(_MODEL)
+    assert list(packer.pack([])) == []
+    assert packer.requests == 0
+
+
+def test_count_requests_matches_pack():
+    packer = BatchPacker(_MODEL, max_tokens=1, max_items=5)
+    items = _items(12, 1000) + _items(7, 1)
+    expected = len(list(BatchPacker(_MODEL, max_tokens=1, max_items=5).pack(items)))
+    assert packer.count_requests(packer.input_tokens(text) for _, text in items) == expected
+    assert packer.requests == 0
+    assert packer.count_requests([]) == 0
+
+
+def test_fallback_never_undercounts(monkeypatch):
+    monkeypatch.setattr(tokenizer, "tiktoken", None)
+    tokenizer._encoding.cache_clear()
+    try:
+        text = "Prüfstand 12345 Gehäuse öäü " * 2000
+        assert count_tokens(text, _MODEL) == len(text.encode())
+        cut = tokenizer.truncate(text, MAX_INPUT_TOKENS, _MODEL)
+        assert len(cut.encode()) <= MAX_INPUT_TOKENS
+        assert text.startswith(cut)
+    finally:
+        tokenizer._encoding.cache_clear()